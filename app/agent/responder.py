@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from decimal import Decimal
 
 from app.engine.schemas import InvoiceResult
@@ -17,7 +18,27 @@ def _value(value: object | None) -> str:
     return str(value)
 
 
+DEFAULT_CACHE_SIZE = 1024
+
+
 class InvoiceResponder:
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, int, str | None], str] = OrderedDict()
+
+    def response_for(self, result: InvoiceResult) -> str:
+        # Corrections bump the version; a reprocess of the same document restarts it but gets a new processed_at.
+        key = (result.document_id, result.version, result.timings.processed_at if result.timings else None)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        text = self.render(result)
+        self._cache[key] = text
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return text
+
     def render(self, result: InvoiceResult) -> str:
         extraction = result.extraction
         if extraction is None:
@@ -1,28 +1,61 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import threading
+from functools import lru_cache, wraps
+from typing import Callable, TypeVar
 
+from app.agent.responder import InvoiceResponder
 from app.engine.batch import BatchProcessor
 from app.engine.corrections import CorrectionService
+from app.engine.profiling import RequestProfiler
 from app.engine.processor import InvoiceProcessor
 from app.persistence.repositories import InvoiceRepository
 
 
-@lru_cache
+T = TypeVar("T")
+
+# Reentrant because the factories build on each other (get_processor calls get_repository).
+_BUILD_LOCK = threading.RLock()
+
+
+def _build_once(factory: Callable[[], T]) -> Callable[[], T]:
+    # lru_cache alone lets concurrent first requests (or warm-up racing one) each run the factory.
+    cached = lru_cache(factory)
+
+    @wraps(factory)
+    def get() -> T:
+        with _BUILD_LOCK:
+            return cached()
+
+    get.cache_clear = cached.cache_clear
+    return get
+
+
+@_build_once
 def get_repository() -> InvoiceRepository:
     return InvoiceRepository()
 
 
-@lru_cache
+@_build_once
 def get_processor() -> InvoiceProcessor:
     return InvoiceProcessor(repository=get_repository())
 
 
-@lru_cache
+@_build_once
 def get_batch_processor() -> BatchProcessor:
     return BatchProcessor(get_processor())
 
 
-@lru_cache
+@_build_once
 def get_correction_service() -> CorrectionService:
     return CorrectionService(get_processor())
+
+
+@_build_once
+def get_responder() -> InvoiceResponder:
+    return get_processor().responder
+
+
+@_build_once
+def get_profiler() -> RequestProfiler:
+    return RequestProfiler.from_env()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from app.engine.tracing import REQUEST_ID_HEADER, bind, new_trace_id, span
+
+
+REQUEST_ID_HEADER_KEY = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+
+class RequestCorrelationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER_KEY:
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or new_trace_id()
+
+        with bind(request_id=request_id), span(
+            "http_request",
+            method=scope["method"],
+            path=scope["path"],
+        ) as request_span:
+
+            async def send_with_request_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (REQUEST_ID_HEADER_KEY, request_id.encode("latin-1")),
+                    ]
+                    request_span.set(status_code=message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_request_id)
@@ -1,24 +1,49 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from datetime import UTC, datetime
 
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+
+from app.agent.responder import InvoiceResponder
 from app.api.dependencies import (
     get_batch_processor,
     get_correction_service,
     get_processor,
+    get_profiler,
     get_repository,
+    get_responder,
 )
 from app.engine.batch import BatchProcessor
+from app.engine.circuit_breaker import llm_circuit_breaker
 from app.engine.corrections import CorrectionService
 from app.engine.parser import InvoiceParser
 from app.engine.processor import InvoiceProcessor
-from app.engine.schemas import BatchResult, CorrectionRequest, InvoiceResult
+from app.engine.profiling import PROFILE_HEADER, RequestProfiler
+from app.engine.schemas import (
+    BatchLLMUsage,
+    BatchResult,
+    BulkCorrectionRequest,
+    BulkCorrectionResponse,
+    CorrectionRequest,
+    InvoiceResponseText,
+    InvoiceResult,
+    LLMUsage,
+    SlowDocument,
+)
 from app.persistence.repositories import InvoiceRepository
 
 
 router = APIRouter()
 
 
+def _utc_iso(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.astimezone(UTC).isoformat()
+
+
 @router.get("/system/status")
 async def system_status() -> dict[str, object]:
     parser = InvoiceParser()
@@ -26,6 +51,7 @@ async def system_status() -> dict[str, object]:
         "status": "ok",
         "llm_enabled": parser.use_llm,
         "parser_mode": "llm" if parser.use_llm else "deterministic",
+        "llm_circuit": llm_circuit_breaker().snapshot(),
     }
 
 
@@ -33,15 +59,22 @@ async def system_status() -> dict[str, object]:
 async def process_invoice(
     file: UploadFile = File(...),
     processor: InvoiceProcessor = Depends(get_processor),
+    profiler: RequestProfiler = Depends(get_profiler),
+    profile: str | None = Header(None, alias=PROFILE_HEADER),
 ) -> InvoiceResult:
     content = await file.read()
-    return processor.process_pdf(file.filename or "invoice.pdf", file.content_type, content)
+    with profiler.capture(profile) as capture:
+        result = processor.process_pdf(file.filename or "invoice.pdf", file.content_type, content)
+        capture.key = result.document_id
+    return result
 
 
 @router.post("/batches/process", response_model=BatchResult)
 async def process_batch(
     files: list[UploadFile] = File(...),
     batch_processor: BatchProcessor = Depends(get_batch_processor),
+    profiler: RequestProfiler = Depends(get_profiler),
+    profile: str | None = Header(None, alias=PROFILE_HEADER),
 ) -> BatchResult:
     file_specs = []
     for file in files:
@@ -52,7 +85,18 @@ async def process_batch(
                 await file.read(),
             )
         )
-    return batch_processor.process_pdfs(file_specs)
+    with profiler.capture(profile) as capture:
+        batch = batch_processor.process_pdfs(file_specs)
+        capture.key = batch.batch_id
+    return batch
+
+
+@router.post("/invoices/corrections/bulk", response_model=BulkCorrectionResponse)
+async def apply_bulk_corrections(
+    request: BulkCorrectionRequest,
+    correction_service: CorrectionService = Depends(get_correction_service),
+) -> BulkCorrectionResponse:
+    return correction_service.apply_many(request.items)
 
 
 @router.patch("/invoices/{document_id}/corrections", response_model=InvoiceResult)
@@ -60,15 +104,31 @@ async def apply_correction(
     document_id: str,
     request: CorrectionRequest,
     correction_service: CorrectionService = Depends(get_correction_service),
+    profiler: RequestProfiler = Depends(get_profiler),
+    profile: str | None = Header(None, alias=PROFILE_HEADER),
 ) -> InvoiceResult:
     try:
-        return correction_service.apply(document_id, request)
+        with profiler.capture(profile) as capture:
+            capture.key = document_id
+            result = correction_service.apply(document_id, request)
+            capture.key = f"{document_id}_v{result.version}"
+        return result
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@router.get("/invoices/slowest", response_model=list[SlowDocument])
+async def get_slowest_invoices(
+    limit: int = Query(10, ge=1, le=500),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    repository: InvoiceRepository = Depends(get_repository),
+) -> list[SlowDocument]:
+    return repository.slowest_documents(limit, _utc_iso(since), _utc_iso(until))
+
+
 @router.get("/invoices/{document_id}", response_model=InvoiceResult)
 async def get_invoice(
     document_id: str,
@@ -80,6 +140,33 @@ async def get_invoice(
     return result
 
 
+@router.get("/invoices/{document_id}/response", response_model=InvoiceResponseText)
+async def get_invoice_response(
+    document_id: str,
+    repository: InvoiceRepository = Depends(get_repository),
+    responder: InvoiceResponder = Depends(get_responder),
+) -> InvoiceResponseText:
+    result = repository.load_invoice_result(document_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Invoice {document_id} was not found.")
+    return InvoiceResponseText(
+        document_id=result.document_id,
+        version=result.version,
+        response=responder.response_for(result),
+    )
+
+
+@router.get("/invoices/{document_id}/usage", response_model=LLMUsage)
+async def get_invoice_usage(
+    document_id: str,
+    repository: InvoiceRepository = Depends(get_repository),
+) -> LLMUsage:
+    result = repository.load_invoice_result(document_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Invoice {document_id} was not found.")
+    return result.llm_usage or LLMUsage()
+
+
 @router.get("/batches/{batch_id}", response_model=BatchResult)
 async def get_batch(
     batch_id: str,
@@ -91,6 +178,17 @@ async def get_batch(
     return batch
 
 
+@router.get("/batches/{batch_id}/usage", response_model=BatchLLMUsage)
+async def get_batch_usage(
+    batch_id: str,
+    repository: InvoiceRepository = Depends(get_repository),
+) -> BatchLLMUsage:
+    batch = repository.load_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} was not found.")
+    return batch.llm_usage
+
+
 @router.post("/demo/reset")
 async def reset_demo_data(
     repository: InvoiceRepository = Depends(get_repository),
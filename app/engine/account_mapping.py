@@ -8,6 +8,7 @@ from app.engine.schemas import AccountCodeSuggestion, InvoiceExtraction
 
 
 DEFAULT_RULE_PATH = Path("config/account_mapping_rules.json")
+MAPPING_FIELDS = frozenset({"supplier_name", "line_items"})
 
 
 class AccountCodeMapper:
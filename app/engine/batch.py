@@ -1,37 +1,86 @@
 from __future__ import annotations
 
+import os
 from decimal import Decimal
+from typing import Callable, TypeVar
 
 from app.engine.intake import new_batch_id
-from app.engine.schemas import BatchResult, InvoiceResult, InvoiceStatus
+from app.engine.llm_usage import BATCH_TOKEN_BUDGET_ENV, suppress_llm
+from app.engine.schemas import BatchLLMUsage, BatchResult, InvoiceResult, InvoiceStatus
+from app.engine.tracing import bind, span, trace_event
 
 
 FileSpec = tuple[str, str | None, bytes]
 TextSpec = tuple[str, str]
+Spec = TypeVar("Spec")
 
 
 class BatchProcessor:
-    def __init__(self, processor):
+    def __init__(self, processor, token_budget: int | None = None):
         self.processor = processor
         self.repository = processor.repository
+        if token_budget is None and os.getenv(BATCH_TOKEN_BUDGET_ENV):
+            token_budget = int(os.environ[BATCH_TOKEN_BUDGET_ENV])
+        self.token_budget = token_budget
 
     def process_pdfs(self, files: list[FileSpec]) -> BatchResult:
         batch_id = new_batch_id()
-        results = [
-            self.processor.process_pdf(filename, content_type, file_bytes, batch_id)
-            for filename, content_type, file_bytes in files
-        ]
-        return self._build_and_save(batch_id, results)
+        with bind(batch_id=batch_id), span("batch", files=len(files)):
+            results, usage = self._process_all(
+                files,
+                lambda spec: self.processor.process_pdf(spec[0], spec[1], spec[2], batch_id),
+            )
+            return self._build_and_save(batch_id, results, usage)
 
     def process_texts(self, texts: list[TextSpec]) -> BatchResult:
         batch_id = new_batch_id()
-        results = [
-            self.processor.process_text(filename, text, batch_id)
-            for filename, text in texts
-        ]
-        return self._build_and_save(batch_id, results)
+        with bind(batch_id=batch_id), span("batch", files=len(texts)):
+            results, usage = self._process_all(
+                texts,
+                lambda spec: self.processor.process_text(spec[0], spec[1], batch_id),
+            )
+            return self._build_and_save(batch_id, results, usage)
 
-    def _build_and_save(self, batch_id: str, results: list[InvoiceResult]) -> BatchResult:
+    def _process_all(
+        self,
+        specs: list[Spec],
+        process: Callable[[Spec], InvoiceResult],
+    ) -> tuple[list[InvoiceResult], BatchLLMUsage]:
+        usage = BatchLLMUsage(token_budget=self.token_budget)
+        results = []
+        for spec in specs:
+            with suppress_llm(usage.budget_exhausted):
+                result = process(spec)
+            results.append(result)
+            self._add_usage(usage, result)
+        return results, usage
+
+    def _add_usage(self, usage: BatchLLMUsage, result: InvoiceResult) -> None:
+        if usage.budget_exhausted:
+            usage.documents_without_llm += 1
+        document_usage = result.llm_usage
+        if document_usage is None or not document_usage.attempts:
+            return
+        usage.documents_with_llm += 1
+        usage.prompt_tokens += document_usage.prompt_tokens
+        usage.cached_tokens += document_usage.cached_tokens
+        usage.completion_tokens += document_usage.completion_tokens
+        usage.total_tokens += document_usage.total_tokens
+        usage.llm_attempts += len(document_usage.attempts)
+        usage.repair_attempts += max(0, len(document_usage.attempts) - 1)
+        usage.hedged_duplicates += document_usage.hedged_duplicates
+        for attempt in document_usage.attempts:
+            model = attempt.model or "unknown"
+            usage.tokens_by_model[model] = usage.tokens_by_model.get(model, 0) + attempt.total_tokens
+        if document_usage.runaway:
+            usage.runaway_documents.append(result.document_id)
+        if document_usage.escalations:
+            usage.escalated_documents += 1
+        if usage.token_budget is not None and not usage.budget_exhausted and usage.total_tokens >= usage.token_budget:
+            usage.budget_exhausted = True
+            trace_event("batch_token_budget_exhausted", total_tokens=usage.total_tokens, budget=usage.token_budget)
+
+    def _build_and_save(self, batch_id: str, results: list[InvoiceResult], usage: BatchLLMUsage) -> BatchResult:
         detected_gst_total = sum(
             (
                 result.extraction.gst
@@ -49,6 +98,7 @@ class BatchProcessor:
             ),
             failed=sum(1 for result in results if result.status == InvoiceStatus.FAILED),
             detected_gst_total=detected_gst_total,
+            llm_usage=usage,
             results=results,
         )
         self.repository.save_batch(batch)
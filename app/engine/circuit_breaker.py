@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable
+
+from app.engine.metrics import LLM_CIRCUIT_TOTAL
+from app.engine.project_env import ensure_project_env
+from app.engine.tracing import trace_event
+
+
+CIRCUIT_ENV = "INVOICE_LLM_CIRCUIT"
+CIRCUIT_FAILURES_ENV = "INVOICE_LLM_CIRCUIT_FAILURES"
+CIRCUIT_COOLDOWN_ENV = "INVOICE_LLM_CIRCUIT_COOLDOWN_S"
+CIRCUIT_PROBES_ENV = "INVOICE_LLM_CIRCUIT_PROBES"
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN_SECONDS = 30.0
+DEFAULT_HALF_OPEN_PROBES = 1
+DISABLED_VALUES = {"0", "false", "no", "off"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+        half_open_probes: int = DEFAULT_HALF_OPEN_PROBES,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        ensure_project_env()
+        return cls(
+            failure_threshold=int(os.getenv(CIRCUIT_FAILURES_ENV) or DEFAULT_FAILURE_THRESHOLD),
+            cooldown_seconds=float(os.getenv(CIRCUIT_COOLDOWN_ENV) or DEFAULT_COOLDOWN_SECONDS),
+            half_open_probes=int(os.getenv(CIRCUIT_PROBES_ENV) or DEFAULT_HALF_OPEN_PROBES),
+            enabled=os.getenv(CIRCUIT_ENV, "").strip().lower() not in DISABLED_VALUES,
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.short_circuited = 0
+            self.times_opened = 0
+            self.last_error: str | None = None
+            self._opened_at = 0.0
+            self._probe_started: list[float] = []
+
+    def allow(self) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                # A probe that never reported back (cassette hit, early return) frees its slot after one cooldown.
+                self._probe_started = [started for started in self._probe_started if now - started < self.cooldown_seconds]
+                if len(self._probe_started) < self.half_open_probes:
+                    self._probe_started.append(now)
+                    return True
+            self.short_circuited += 1
+        LLM_CIRCUIT_TOTAL.inc(event="short_circuited")
+        return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.enabled and self.state == OPEN and self._clock() - self._opened_at < self.cooldown_seconds
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self.times_opened += 1
+                self._transition(OPEN)
+
+    def snapshot(self) -> dict[str, object]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown_seconds - (self._clock() - self._opened_at))
+            return {
+                "enabled": self.enabled,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "retry_in_seconds": round(retry_in, 3),
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited,
+                "last_error": self.last_error,
+            }
+
+    def _transition(self, state: str) -> None:
+        previous = self.state
+        self.state = state
+        self._probe_started = []
+        LLM_CIRCUIT_TOTAL.inc(event=state)
+        trace_event(
+            "llm_circuit",
+            previous=previous,
+            state=state,
+            consecutive_failures=self.consecutive_failures,
+            last_error=self.last_error,
+        )
+
+
+@lru_cache(maxsize=1)
+def llm_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker.from_env()
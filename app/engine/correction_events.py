@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from app.engine.field_paths import apply_field_update
+from app.engine.schemas import CorrectionEvent, InvoiceResult
+from app.engine.xero_payload import XeroPayloadBuilder
+
+
+def replay_correction_events(
+    result: InvoiceResult,
+    events: list[CorrectionEvent],
+) -> InvoiceResult:
+    if not events:
+        return result
+
+    working = result.model_copy()
+    working.corrections = list(result.corrections)
+    if result.extraction is not None:
+        working.extraction = result.extraction.model_copy(deep=True)
+
+    for event in events:
+        if working.extraction is not None:
+            for update in event.updates:
+                if not update.field.startswith("account_code"):
+                    apply_field_update(working.extraction, update.field, update.value)
+        working.corrections.extend(event.records)
+        working.status = event.status
+        working.validation = event.validation
+        working.account_code_suggestion = event.account_code_suggestion
+        working.version = event.sequence
+
+    if working.extraction is not None:
+        working.xero_payload = XeroPayloadBuilder().build(
+            working.extraction,
+            working.account_code_suggestion,
+            working.status,
+        )
+    return working
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-from copy import deepcopy
-from typing import Any
-
+from app.engine.field_paths import apply_field_update
 from app.engine.schemas import (
     AccountCodeSuggestion,
+    BulkCorrectionItem,
+    BulkCorrectionResponse,
+    BulkCorrectionResult,
+    CorrectionEvent,
     CorrectionRecord,
     CorrectionRequest,
     CorrectionUpdate,
     InvoiceExtraction,
     InvoiceResult,
 )
+from app.engine.tracing import bind, span
 from app.engine.xero_payload import XeroPayloadBuilder
 from app.persistence.repositories import InvoiceRepository
 
@@ -38,6 +41,12 @@ class CorrectionService:
         self.payload_builder = XeroPayloadBuilder()
 
     def apply(self, document_id: str, request: CorrectionRequest) -> InvoiceResult:
+        with bind(document_id=document_id), span("correction") as correction_span:
+            result = self._apply(document_id, request)
+            correction_span.set(version=result.version, invoice_status=result.status.value)
+        return result
+
+    def _apply(self, document_id: str, request: CorrectionRequest) -> InvoiceResult:
         result = self.repository.load_invoice_result(document_id)
         if result is None:
             raise KeyError(f"Invoice {document_id} was not found.")
@@ -45,17 +54,64 @@ class CorrectionService:
         if not updates:
             raise ValueError("No correction updates were supplied.")
 
-        working = result.model_copy(deep=True)
+        working = result.model_copy()
+        working.corrections = list(result.corrections)
+        if result.extraction is not None:
+            working.extraction = result.extraction.model_copy(deep=True)
+        records: list[CorrectionRecord] = []
+        changed_fields: set[str] = set()
         for update in updates:
             record = self._apply_one(working, working.extraction, update)
             working.corrections.append(record)
-            self.repository.save_correction(document_id, record)
-
-        if working.extraction is None:
-            self.repository.save_invoice_result(working)
-            return working
-
-        return self.processor.rebuild_result(working, working.extraction)
+            records.append(record)
+            changed_fields.add(update.field.split(".", 1)[0])
+
+        if working.extraction is not None:
+            working = self.processor.rebuild_result(
+                working,
+                working.extraction,
+                changed_fields=changed_fields,
+                persist=False,
+            )
+        working.version = result.version + 1
+        self.repository.append_correction_event(
+            document_id,
+            CorrectionEvent(
+                sequence=working.version,
+                updates=updates,
+                records=records,
+                status=working.status,
+                validation=working.validation,
+                account_code_suggestion=working.account_code_suggestion,
+            ),
+            working,
+        )
+        return working
+
+    def apply_many(self, items: list[BulkCorrectionItem]) -> BulkCorrectionResponse:
+        results: list[BulkCorrectionResult] = []
+        with self.repository.transaction():
+            for item in items:
+                try:
+                    result = self.apply(item.document_id, item)
+                except (KeyError, ValueError) as exc:
+                    message = exc.args[0] if isinstance(exc, KeyError) and exc.args else str(exc)
+                    results.append(BulkCorrectionResult(document_id=item.document_id, error=message))
+                    continue
+                results.append(
+                    BulkCorrectionResult(
+                        document_id=result.document_id,
+                        status=result.status,
+                        version=result.version,
+                        issue_codes=[issue.code for issue in result.validation.issues],
+                    )
+                )
+        failed = sum(1 for result in results if result.error is not None)
+        return BulkCorrectionResponse(
+            applied=len(results) - failed,
+            failed=failed,
+            results=results,
+        )
 
     def _apply_one(
         self,
@@ -74,13 +130,7 @@ class CorrectionService:
         if top_level not in EDITABLE_EXTRACTION_FIELDS:
             raise ValueError(f"Field {field} is not editable.")
 
-        data = extraction.model_dump()
-        original_value = self._get_path(data, field)
-        self._set_path(data, field, update.value)
-        data["field_sources"] = dict(data.get("field_sources") or {})
-        data["field_sources"][field] = "user_correction"
-        data["original_extracted_values"] = extraction.original_extracted_values
-        result.extraction = InvoiceExtraction.model_validate(data)
+        original_value = apply_field_update(extraction, field, update.value)
         return CorrectionRecord(
             field=field,
             original_value=original_value,
@@ -111,26 +161,3 @@ class CorrectionService:
             original_value=previous,
             corrected_value=update.value,
         )
-
-    def _get_path(self, data: dict[str, Any], path: str) -> Any:
-        current: Any = data
-        for part in path.split("."):
-            if isinstance(current, list):
-                current = current[int(part)]
-            else:
-                current = current.get(part)
-        return deepcopy(current)
-
-    def _set_path(self, data: dict[str, Any], path: str, value: Any) -> None:
-        parts = path.split(".")
-        current: Any = data
-        for part in parts[:-1]:
-            if isinstance(current, list):
-                current = current[int(part)]
-            else:
-                current = current[part]
-        last = parts[-1]
-        if isinstance(current, list):
-            current[int(last)] = value
-        else:
-            current[last] = value
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.engine.schemas import InvoiceExtraction
+
+
+def get_field_path(model: BaseModel, path: str) -> Any:
+    current: Any = model
+    for part in path.split("."):
+        if isinstance(current, list):
+            current = current[int(part)]
+        elif isinstance(current, dict):
+            current = current.get(part)
+        else:
+            current = getattr(current, part, None)
+    return _plain(current)
+
+
+def set_field_path(model: BaseModel, path: str, value: Any) -> None:
+    parts = path.split(".")
+    parent: Any = model
+    for part in parts[:-2]:
+        parent = parent[int(part)] if isinstance(parent, list) else getattr(parent, part)
+    if len(parts) > 1:
+        container = parent[int(parts[-2])] if isinstance(parent, list) else getattr(parent, parts[-2])
+        if isinstance(container, list):
+            # Re-assign the list so validate_assignment coerces the new element.
+            items = list(container)
+            items[int(parts[-1])] = value
+            setattr(parent, parts[-2], items)
+            return
+        parent = container
+    setattr(parent, parts[-1], value)
+
+
+def apply_field_update(extraction: InvoiceExtraction, path: str, value: Any) -> Any:
+    try:
+        original_value = get_field_path(extraction, path)
+        set_field_path(extraction, path, value)
+    except (AttributeError, IndexError, KeyError, TypeError) as exc:
+        raise ValueError(f"Field {path} could not be corrected: {exc}") from exc
+    extraction.field_sources[path] = "user_correction"
+    return original_value
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return deepcopy(value)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+from app.engine.metrics import LLM_HEDGE_TOTAL
+from app.engine.tracing import trace_event
+
+
+HEDGE_ENV = "INVOICE_LLM_HEDGE"
+HEDGE_DELAY_ENV = "INVOICE_LLM_HEDGE_DELAY_MS"
+HEDGE_MAX_RATE_ENV = "INVOICE_LLM_HEDGE_MAX_RATE"
+DEFAULT_HEDGE_DELAY = "p95"
+DEFAULT_HEDGE_MAX_RATE = 0.05
+# Until this many calls have been timed, adaptive delays use the fallback below.
+MIN_LATENCY_SAMPLES = 20
+FALLBACK_HEDGE_DELAY_MS = 2000.0
+LATENCY_WINDOW = 500
+# One hedge may go out before the rate cap has enough requests behind it.
+HEDGE_BURST = 1
+ENABLED_VALUES = {"1", "true", "yes", "on"}
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    def __init__(
+        self,
+        delay: str | float = DEFAULT_HEDGE_DELAY,
+        max_rate: float = DEFAULT_HEDGE_MAX_RATE,
+        max_workers: int = 32,
+    ):
+        self.percentile = None
+        self.fixed_delay_ms = None
+        if isinstance(delay, str) and delay.lower().startswith("p"):
+            self.percentile = float(delay[1:])
+        else:
+            self.fixed_delay_ms = float(delay)
+        self.max_rate = max_rate
+        self.max_workers = max_workers
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "rate_capped": 0, "abandoned": 0}
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def from_env(cls) -> "RequestHedger | None":
+        if os.getenv(HEDGE_ENV, "").strip().lower() not in ENABLED_VALUES:
+            return None
+        return cls(
+            delay=os.getenv(HEDGE_DELAY_ENV) or DEFAULT_HEDGE_DELAY,
+            max_rate=float(os.getenv(HEDGE_MAX_RATE_ENV) or DEFAULT_HEDGE_MAX_RATE),
+        )
+
+    def delay_ms(self) -> float:
+        if self.fixed_delay_ms is not None:
+            return self.fixed_delay_ms
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return FALLBACK_HEDGE_DELAY_MS
+        index = min(len(samples) - 1, math.ceil(self.percentile / 100 * len(samples)) - 1)
+        return samples[index]
+
+    def observe(self, latency_ms: float) -> None:
+        with self._lock:
+            self._latencies.append(latency_ms)
+
+    def call(self, send: Callable[[], T], on_abandoned: Callable[[int], None] | None = None) -> T:
+        with self._lock:
+            self.stats["requests"] += 1
+        delay_ms = self.delay_ms()
+        primary = self._submit(send)
+        done, _ = wait([primary], timeout=delay_ms / 1000)
+        if done:
+            return primary.result()
+        if not self._take_hedge_slot():
+            LLM_HEDGE_TOTAL.inc(outcome="rate_capped")
+            return primary.result()
+
+        hedge = self._submit(send)
+        trace_event("llm_hedge", delay_ms=round(delay_ms, 3))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                winner = "hedge" if future is hedge else "primary"
+                # A started HTTP call cannot be interrupted; the loser finishes in the background, is discarded,
+                # and is still billed, so the caller is told how many duplicates it paid for.
+                abandoned = sum(not loser.cancel() for loser in pending)
+                with self._lock:
+                    if winner == "hedge":
+                        self.stats["hedge_wins"] += 1
+                    self.stats["abandoned"] += abandoned
+                LLM_HEDGE_TOTAL.inc(outcome=f"{winner}_won")
+                if abandoned:
+                    LLM_HEDGE_TOTAL.inc(abandoned, outcome="abandoned")
+                    if on_abandoned is not None:
+                        on_abandoned(abandoned)
+                return future.result()
+        LLM_HEDGE_TOTAL.inc(outcome="both_failed")
+        raise error
+
+    def _submit(self, send: Callable[[], T]) -> Future:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-hedge")
+        # Each attempt runs in its own copy of the caller's context so request-scoped contextvars stay visible.
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._timed, send)
+
+    def _timed(self, send: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        result = send()
+        self.observe((time.perf_counter() - started) * 1000)
+        return result
+
+    def _take_hedge_slot(self) -> bool:
+        with self._lock:
+            if self.stats["hedged"] + 1 > self.max_rate * self.stats["requests"] + HEDGE_BURST:
+                self.stats["rate_capped"] += 1
+                return False
+            self.stats["hedged"] += 1
+            return True
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from app.engine.llm_usage import current_llm_usage, record_llm_usage
+
+
+CASSETTE_DIR_ENV = "INVOICE_LLM_CASSETTE_DIR"
+CASSETTE_MODE_ENV = "INVOICE_LLM_CASSETTE_MODE"
+CASSETTE_MODES = {"off", "replay", "record", "record_new"}
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+def cassette_key(request_payload: dict[str, Any]) -> str:
+    canonical = json.dumps(request_payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCassette:
+    def __init__(self, directory: str | Path, mode: str = "replay"):
+        if mode not in CASSETTE_MODES - {"off"}:
+            raise ValueError(f"Unsupported cassette mode {mode!r}.")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "prompt_chars": 0, "response_chars": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMCassette | None":
+        mode = (os.getenv(CASSETTE_MODE_ENV) or "off").strip().lower()
+        directory = os.getenv(CASSETTE_DIR_ENV)
+        if mode == "off" or mode not in CASSETTE_MODES or not directory:
+            return None
+        return cls(directory, mode)
+
+    @property
+    def replays_only(self) -> bool:
+        return self.mode == "replay"
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def load(self, key: str) -> dict[str, Any] | None:
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, key: str, request_payload: dict[str, Any], output: str) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "model": request_payload.get("model"),
+            "recorded_at": datetime.now(UTC).isoformat(),
+            "prompt_chars": _prompt_chars(request_payload),
+            "response_chars": len(output),
+            "usage": _recorded_usage(current_llm_usage()),
+            "output": output,
+        }
+        partial = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        partial.write_text(json.dumps(entry, indent=2), encoding="utf-8")
+        os.replace(partial, path)
+
+    def call(self, request_payload: dict[str, Any], send: Callable[[], str]) -> str:
+        key = cassette_key(request_payload)
+        entry = None if self.mode == "record" else self.load(key)
+        if entry is not None:
+            output = entry["output"]
+            record_llm_usage(entry.get("usage"), entry.get("model"))
+            self._count(request_payload, output, hits=1)
+            return output
+        if self.mode == "replay":
+            self._count(request_payload, "", misses=1)
+            raise CassetteMiss(f"No cassette recorded for LLM request {key[:12]}.")
+        output = send()
+        self.save(key, request_payload, output)
+        self._count(request_payload, output, misses=1, recorded=1)
+        return output
+
+    def _count(self, request_payload: dict[str, Any], output: str, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+            self.stats["prompt_chars"] += _prompt_chars(request_payload)
+            self.stats["response_chars"] += len(output)
+
+
+def _recorded_usage(usage: dict[str, Any] | None) -> dict[str, Any] | None:
+    # A hedge duplicate was an accident of the recording run; replays bill the single answer.
+    if not usage:
+        return usage
+    return {key: value for key, value in usage.items() if key != "hedged_duplicates"}
+
+
+def _prompt_chars(request_payload: dict[str, Any]) -> int:
+    return sum(len(str(message.get("content", ""))) for message in request_payload.get("messages", []))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import codecs
+import json
+import os
+import time
+from typing import Any, Callable, Iterable, NamedTuple
+
+
+STREAM_ENV = "GROQ_STREAM"
+STREAM_CHUNK_TIMEOUT_ENV = "GROQ_STREAM_CHUNK_TIMEOUT_S"
+DEFAULT_STREAM_CHUNK_TIMEOUT = 15.0
+STREAM_CONNECT_TIMEOUT = 10.0
+# Header fields are complete once the model starts on one of these (or closes the object).
+LATE_FIELDS = frozenset({"line_items"})
+ENABLED_VALUES = {"1", "true", "yes", "on"}
+
+
+class StreamResult(NamedTuple):
+    content: str
+    model: str | None
+    usage: dict[str, Any] | None
+    header: dict[str, Any]
+    header_ms: float | None
+    complete_ms: float
+    chunks: int
+    stopped_early: bool
+
+
+def streaming_enabled() -> bool:
+    return os.getenv(STREAM_ENV, "").strip().lower() in ENABLED_VALUES
+
+
+def stream_chunk_timeout() -> float:
+    return float(os.getenv(STREAM_CHUNK_TIMEOUT_ENV) or DEFAULT_STREAM_CHUNK_TIMEOUT)
+
+
+class JsonObjectScanner:
+    def __init__(self):
+        self.text = ""
+        self.fields: dict[str, Any] = {}
+        self.current_key: str | None = None
+        self.end: int | None = None
+        self._start: int | None = None
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start: int | None = None
+        self._value_start: int | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def object_text(self) -> str | None:
+        if self.end is None:
+            return None
+        return self.text[self._start : self.end]
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        text = self.text
+        while self._position < len(text) and self.end is None:
+            char = text[self._position]
+            index = self._position
+            self._position += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None and self._value_start is None:
+                        self.current_key = self._loads(text[self._key_start : index + 1])
+                        self._key_start = None
+                continue
+            if self._depth == 0:
+                # Prose or code fences before the object are skipped, as parse_json would.
+                if char == "{":
+                    self._start = index
+                    self._depth = 1
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = index
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 1:
+                    self._finish_field(index)
+                self._depth -= 1
+                if self._depth == 0 and char == "}":
+                    self.end = index + 1
+            elif self._depth == 1 and char == ":":
+                self._value_start = index + 1
+            elif self._depth == 1 and char == ",":
+                self._finish_field(index)
+
+    def _finish_field(self, index: int) -> None:
+        if self.current_key is not None and self._value_start is not None:
+            value = self._loads(self.text[self._value_start : index].strip())
+            if value is not _INVALID:
+                self.fields[self.current_key] = value
+        self.current_key = None
+        self._value_start = None
+
+    def _loads(self, raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return _INVALID
+
+
+_INVALID = object()
+
+
+def _sse_chunks(chunks: Iterable[str | bytes]) -> Iterable[list[dict[str, Any] | None]]:
+    # Events are grouped by the network chunk they arrived in, so the reader can tell what is already buffered.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *lines, pending = pending.split("\n")
+        events: list[dict[str, Any] | None] = []
+        for line in lines:
+            line = line.strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                events.append(None)
+                break
+            events.append(json.loads(data))
+        yield events
+        if None in events:
+            return
+
+
+def read_chat_stream(
+    chunks: Iterable[str | bytes],
+    on_header: Callable[[dict[str, Any]], None] | None = None,
+    clock: Callable[[], float] = time.perf_counter,
+) -> StreamResult:
+    started = clock()
+    scanner = JsonObjectScanner()
+    model = None
+    usage = None
+    header: dict[str, Any] | None = None
+    header_ms = None
+    events_read = 0
+    finished = False
+    for events in _sse_chunks(chunks):
+        for event in events:
+            if event is None:
+                finished = True
+                break
+            if "error" in event:
+                error = event["error"]
+                message = error.get("message") if isinstance(error, dict) else str(error)
+                raise RuntimeError(f"Groq stream error: {message}")
+            events_read += 1
+            model = event.get("model") or model
+            # OpenAI-style streams put usage on the last chunk; Groq also reports it under x_groq.
+            usage = event.get("usage") or (event.get("x_groq") or {}).get("usage") or usage
+            for choice in event.get("choices") or []:
+                scanner.feed((choice.get("delta") or {}).get("content") or "")
+            if header is None and (scanner.complete or scanner.current_key in LATE_FIELDS):
+                header = {key: value for key, value in scanner.fields.items() if key not in LATE_FIELDS}
+                header_ms = (clock() - started) * 1000
+                if on_header is not None:
+                    on_header(header)
+        # Once the object is closed, usage is taken only if it arrived with the closing brace; waiting for a
+        # later chunk would cost a network round trip, and the caller estimates missing usage instead.
+        if finished or scanner.complete:
+            break
+    content = scanner.object_text if scanner.complete else scanner.text
+    return StreamResult(
+        content=content,
+        model=model,
+        usage=usage,
+        header=header or {},
+        header_ms=header_ms,
+        complete_ms=(clock() - started) * 1000,
+        chunks=events_read,
+        stopped_early=scanner.complete and not finished,
+    )
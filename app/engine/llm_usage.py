@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+# USD per million (prompt, completion) tokens on Groq's on-demand tier.
+MODEL_PRICES_PER_MILLION: dict[str, tuple[float, float]] = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+# Groq bills prompt tokens served from its prefix cache at half price.
+CACHED_PROMPT_DISCOUNT = 0.5
+
+TOKEN_ALERT_ENV = "INVOICE_LLM_TOKEN_ALERT"
+DEFAULT_TOKEN_ALERT = 16_000
+BATCH_TOKEN_BUDGET_ENV = "INVOICE_BATCH_TOKEN_BUDGET"
+
+_last_usage: ContextVar[dict[str, Any] | None] = ContextVar("invoice_llm_usage", default=None)
+_llm_suppressed: ContextVar[bool] = ContextVar("invoice_llm_suppressed", default=False)
+
+
+def record_llm_usage(usage: dict[str, Any] | None, model: str | None = None) -> None:
+    if not usage:
+        _last_usage.set(None)
+        return
+    _last_usage.set({**usage, "model": model or usage.get("model")})
+
+
+def current_llm_usage() -> dict[str, Any] | None:
+    return _last_usage.get()
+
+
+def consume_llm_usage() -> dict[str, Any] | None:
+    usage = _last_usage.get()
+    _last_usage.set(None)
+    return usage
+
+
+def llm_suppressed() -> bool:
+    return _llm_suppressed.get()
+
+
+@contextmanager
+def suppress_llm(active: bool = True) -> Iterator[None]:
+    token = _llm_suppressed.set(active or _llm_suppressed.get())
+    try:
+        yield
+    finally:
+        _llm_suppressed.reset(token)
+
+
+def estimate_cost_usd(
+    prompt_tokens: int,
+    completion_tokens: int,
+    model: str | None,
+    cached_tokens: int = 0,
+) -> float | None:
+    prices = MODEL_PRICES_PER_MILLION.get(model or "")
+    if prices is None:
+        return None
+    prompt_price, completion_price = prices
+    billed_prompt = prompt_tokens - cached_tokens * CACHED_PROMPT_DISCOUNT
+    return round((billed_prompt * prompt_price + completion_tokens * completion_price) / 1_000_000, 6)
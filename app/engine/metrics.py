@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Timer:
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @property
+    def ms(self) -> float:
+        return self.seconds * 1000
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, object]) -> LabelValues:
+        if len(labels) != len(self.label_names) or not all(name in labels for name in self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}.")
+        return tuple([str(labels[name]) for name in self.label_names])
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[LabelValues, float] = {} if label_names else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {} if self.label_names else {(): 0.0}
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then +Inf count, sum.
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[Timer]:
+        timer = Timer()
+        started = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            timer.seconds = time.perf_counter() - started
+            self.observe(timer.seconds, **labels)
+
+    def count(self, **labels: object) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series = {}
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {_format_number(cumulative)}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_number(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "invoice_stage_seconds",
+    "Time spent in each invoice processing stage.",
+    ("stage",),
+)
+DOCUMENTS_TOTAL = REGISTRY.counter(
+    "invoice_documents_total",
+    "Processed invoices by final status.",
+    ("status",),
+)
+OCR_METHOD_TOTAL = REGISTRY.counter(
+    "invoice_ocr_method_total",
+    "Text extraction results by method.",
+    ("method",),
+)
+PARSER_STATUS_TOTAL = REGISTRY.counter(
+    "invoice_parser_status_total",
+    "Parser results by status.",
+    ("status",),
+)
+LLM_ATTEMPTS_TOTAL = REGISTRY.counter(
+    "invoice_llm_attempts_total",
+    "LLM parser attempts by outcome (valid, invalid, error).",
+    ("outcome",),
+)
+LLM_TOKENS_TOTAL = REGISTRY.counter(
+    "invoice_llm_tokens_total",
+    "LLM tokens consumed by kind (prompt, completion; cached counts the prompt tokens served from the provider prefix cache).",
+    ("kind",),
+)
+LLM_RUNAWAY_TOTAL = REGISTRY.counter(
+    "invoice_llm_runaway_total",
+    "Documents whose LLM repair loop exhausted its attempts or exceeded the token alert.",
+)
+LLM_RESPONSE_FORMAT_TOTAL = REGISTRY.counter(
+    "invoice_llm_response_format_total",
+    "LLM attempts by requested response format and outcome; compare invalid shares to see repairs avoided.",
+    ("format", "outcome"),
+)
+LLM_HEDGE_TOTAL = REGISTRY.counter(
+    "invoice_llm_hedge_total",
+    "Slow LLM calls by hedging outcome (primary_won, hedge_won, both_failed, rate_capped) and losers abandoned.",
+    ("outcome",),
+)
+LLM_CIRCUIT_TOTAL = REGISTRY.counter(
+    "invoice_llm_circuit_total",
+    "LLM circuit breaker transitions (closed, open, half_open) and documents short_circuited to the deterministic parser.",
+    ("event",),
+)
+LLM_TIER_TOTAL = REGISTRY.counter(
+    "invoice_llm_tier_total",
+    "Documents parsed per model tier by outcome (accepted, escalated, failed).",
+    ("model", "outcome"),
+)
+LLM_FIELD_REQUESTS_TOTAL = REGISTRY.counter(
+    "invoice_llm_field_requests_total",
+    "Fields requested from the LLM in missing-fields mode because the deterministic parser missed them.",
+    ("field",),
+)
+LLM_RESPONSE_FORMAT_FALLBACK_TOTAL = REGISTRY.counter(
+    "invoice_llm_response_format_fallback_total",
+    "Response formats the provider rejected for the configured model.",
+    ("format",),
+)
+PROMPT_COMPACTION_TOTAL = REGISTRY.counter(
+    "invoice_prompt_compaction_total",
+    "LLM prompts by compaction outcome (compacted, within_budget, missing_cues, small_saving).",
+    ("outcome",),
+)
+LLM_TIER_SECONDS = REGISTRY.histogram(
+    "invoice_llm_tier_seconds",
+    "LLM time per document per model tier, repairs included.",
+    ("model",),
+)
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "invoice_llm_call_seconds",
+    "Latency of individual LLM chat-completion calls.",
+)
+LLM_STREAM_SECONDS = REGISTRY.histogram(
+    "invoice_llm_stream_seconds",
+    "Streamed LLM calls: time until the header fields were complete and until the JSON object closed.",
+    ("phase",),
+)
+REPOSITORY_SECONDS = REGISTRY.histogram(
+    "invoice_repository_seconds",
+    "SQLite repository operation latency.",
+    ("operation",),
+)
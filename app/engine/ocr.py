@@ -3,13 +3,16 @@ from __future__ import annotations
 from io import BytesIO
 from pathlib import Path
 
+from app.engine.metrics import STAGE_SECONDS
 from app.engine.schemas import ExtractionStatus, OCRResult
 
 
 class PDFTextExtractor:
     def extract(self, file_bytes: bytes, document_id: str) -> OCRResult:
         warnings: list[str] = []
-        text = self._extract_pdf_text(file_bytes, warnings)
+        pages: list[int] = []
+        with STAGE_SECONDS.time(stage="ocr_pdf_text"):
+            text = self._extract_pdf_text(file_bytes, warnings, pages)
         if text.strip():
             return OCRResult(
                 document_id=document_id,
@@ -17,9 +20,11 @@ class PDFTextExtractor:
                 method="pdf_text",
                 status=ExtractionStatus.SUCCESS,
                 warnings=warnings,
+                pages=pages[-1],
             )
 
-        ocr_text = self._extract_ocr_text(file_bytes, warnings)
+        with STAGE_SECONDS.time(stage="ocr_tesseract"):
+            ocr_text = self._extract_ocr_text(file_bytes, warnings, pages)
         if ocr_text.strip():
             return OCRResult(
                 document_id=document_id,
@@ -27,6 +32,7 @@ class PDFTextExtractor:
                 method="tesseract_ocr",
                 status=ExtractionStatus.SUCCESS,
                 warnings=warnings,
+                pages=pages[-1],
             )
 
         if not warnings:
@@ -37,12 +43,18 @@ class PDFTextExtractor:
             method="none",
             status=ExtractionStatus.FAILED,
             warnings=warnings,
+            pages=pages[-1] if pages else 0,
         )
 
     def extract_from_path(self, path: str | Path, document_id: str) -> OCRResult:
         return self.extract(Path(path).read_bytes(), document_id)
 
-    def _extract_pdf_text(self, file_bytes: bytes, warnings: list[str]) -> str:
+    def _extract_pdf_text(
+        self,
+        file_bytes: bytes,
+        warnings: list[str],
+        pages: list[int] | None = None,
+    ) -> str:
         try:
             from PyPDF2 import PdfReader
         except Exception as exc:  # pragma: no cover - depends on optional install
@@ -51,12 +63,19 @@ class PDFTextExtractor:
 
         try:
             reader = PdfReader(BytesIO(file_bytes))
+            if pages is not None:
+                pages.append(len(reader.pages))
             return "\n".join(page.extract_text() or "" for page in reader.pages)
         except Exception as exc:
             warnings.append(f"PDF text extraction failed: {exc}")
             return ""
 
-    def _extract_ocr_text(self, file_bytes: bytes, warnings: list[str]) -> str:
+    def _extract_ocr_text(
+        self,
+        file_bytes: bytes,
+        warnings: list[str],
+        pages: list[int] | None = None,
+    ) -> str:
         try:
             from pdf2image import convert_from_bytes
             import pytesseract
@@ -66,6 +85,8 @@ class PDFTextExtractor:
 
         try:
             images = convert_from_bytes(file_bytes)
+            if pages is not None:
+                pages.append(len(images))
             return "\n".join(pytesseract.image_to_string(image) for image in images)
         except Exception as exc:
             warnings.append(f"Tesseract OCR failed: {exc}")
@@ -7,27 +7,61 @@ import re
 import shutil
 import subprocess
 import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from types import NoneType
+from typing import Any, Iterator, get_args, get_origin
 
 from pydantic import ValidationError
-import requests
-
-try:
-    from dotenv import load_dotenv
-except ImportError:  # pragma: no cover - optional dependency in fresh environments
-    def load_dotenv() -> bool:
-        return False
 
+from app.engine.circuit_breaker import CircuitBreaker, llm_circuit_breaker
+from app.engine.hedging import RequestHedger
+from app.engine.llm_cassette import CassetteMiss, LLMCassette
+from app.engine.llm_stream import STREAM_CONNECT_TIMEOUT, read_chat_stream, stream_chunk_timeout, streaming_enabled
+from app.engine.llm_usage import (
+    DEFAULT_TOKEN_ALERT,
+    TOKEN_ALERT_ENV,
+    consume_llm_usage,
+    llm_suppressed,
+    record_llm_usage,
+)
+from app.engine.metrics import (
+    LLM_ATTEMPTS_TOTAL,
+    LLM_CALL_SECONDS,
+    LLM_FIELD_REQUESTS_TOTAL,
+    LLM_RESPONSE_FORMAT_FALLBACK_TOTAL,
+    LLM_RESPONSE_FORMAT_TOTAL,
+    LLM_RUNAWAY_TOTAL,
+    LLM_STREAM_SECONDS,
+    LLM_TIER_SECONDS,
+    LLM_TIER_TOTAL,
+    LLM_TOKENS_TOTAL,
+    PARSER_STATUS_TOTAL,
+    PROMPT_COMPACTION_TOTAL,
+    STAGE_SECONDS,
+)
+from app.engine.project_env import ensure_project_env
+from app.engine.prompt_regions import (
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    PROMPT_TOKEN_BUDGET_ENV,
+    estimate_tokens,
+    prompt_compaction_enabled,
+    select_prompt_regions,
+)
 from app.engine.schemas import (
     InvoiceExtraction,
     LineItem,
+    LLMUsage,
     ParserResult,
     ParserStatus,
     coerce_decimal,
 )
+from app.engine.tracing import span, trace_event
+from app.engine.validator import InvoiceValidator, validate_abn_checksum
 
 
 JSON_SCHEMA_HINT = {
@@ -54,7 +88,26 @@ JSON_SCHEMA_HINT = {
     ],
 }
 
-PROMPT_VERSION = "2026-06-02-noisy-v2"
+PROMPT_VERSION = "2026-10-19-cached-prefix-v3"
+GROQ_MODEL_ENV = "GROQ_MODEL"
+DEFAULT_GROQ_MODEL = "llama-3.1-8b-instant"
+GROQ_MODEL_TIERS_ENV = "GROQ_MODEL_TIERS"
+GROQ_BASE_URL_ENV = "GROQ_BASE_URL"
+DEFAULT_GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+RESPONSE_FORMAT_ENV = "GROQ_RESPONSE_FORMAT"
+RESPONSE_FORMATS = ("json_schema", "json_object", "text")
+DEFAULT_RESPONSE_FORMAT = "json_schema"
+JSON_SCHEMA_TYPES = {str: ["string"], Decimal: ["string", "number"]}
+RESPONSE_FORMAT_ERROR = re.compile(r"response[_\s]format|json[_\s]schema|json[_\s]object|structured output", re.IGNORECASE)
+
+LLM_MODE_ENV = "INVOICE_LLM_MODE"
+LLM_MODES = ("full", "missing_fields")
+# Absent from many genuine invoices, so they never trigger a missing-fields call on their own.
+OPTIONAL_FIELDS = {"due_date", "buyer_abn"}
+
+# (model, response format) pairs the provider rejected; later requests go straight to the next format.
+_unsupported_response_formats: set[tuple[str, str]] = set()
 
 PLACEHOLDER_KEYS = {
     "",
@@ -103,6 +156,57 @@ DATE_VALUE_PATTERN = (
 MONEY_VALUE_PATTERN = r"\$?\s*([0-9][0-9,]*\.\d{2})"
 
 
+_requested_fields: ContextVar[tuple[str, ...] | None] = ContextVar("invoice_llm_requested_fields", default=None)
+_active_model: ContextVar[str | None] = ContextVar("invoice_llm_active_model", default=None)
+
+
+@contextmanager
+def request_fields(fields: tuple[str, ...] | None) -> Iterator[None]:
+    token = _requested_fields.set(fields)
+    try:
+        yield
+    finally:
+        _requested_fields.reset(token)
+
+
+@contextmanager
+def use_model(model: str) -> Iterator[None]:
+    token = _active_model.set(model)
+    try:
+        yield
+    finally:
+        _active_model.reset(token)
+
+
+def _json_schema_for(annotation: Any) -> dict[str, Any]:
+    if get_origin(annotation) is list:
+        (item_model,) = get_args(annotation)
+        return {"type": "array", "items": _object_schema(item_model, JSON_SCHEMA_HINT["line_items"][0])}
+    types: list[str] = []
+    for arg in get_args(annotation) or (annotation,):
+        types.extend(["null"] if arg is NoneType else JSON_SCHEMA_TYPES[arg])
+    return {"type": types if len(types) > 1 else types[0]}
+
+
+def _object_schema(model: Any, fields: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {name: _json_schema_for(model.model_fields[name].annotation) for name in fields},
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+@lru_cache
+def extraction_json_schema(fields: tuple[str, ...] | None = None) -> dict[str, Any]:
+    hint = JSON_SCHEMA_HINT if fields is None else {name: JSON_SCHEMA_HINT[name] for name in fields}
+    return _object_schema(InvoiceExtraction, hint)
+
+
+class LLMNotConfigured(RuntimeError):
+    pass
+
+
 def is_real_groq_api_key(api_key: str | None) -> bool:
     cleaned = (api_key or "").strip()
     if cleaned.lower() in PLACEHOLDER_KEYS:
@@ -110,34 +214,70 @@ def is_real_groq_api_key(api_key: str | None) -> bool:
     return bool(cleaned) and not any(pattern.search(cleaned) for pattern in PLACEHOLDER_KEY_PATTERNS)
 
 
-def load_project_env() -> None:
-    if load_dotenv():
-        return
-    env_path = ".env"
-    if not os.path.exists(env_path):
-        return
-    with open(env_path, encoding="utf-8") as env_file:
-        for raw_line in env_file:
-            line = raw_line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, value = line.split("=", 1)
-            key = key.strip()
-            value = value.strip().strip('"').strip("'")
-            os.environ.setdefault(key, value)
-
-
-load_project_env()
-
-
 class InvoiceParser:
-    def __init__(self, use_llm: bool | None = None, max_attempts: int = 3):
+    def __init__(
+        self,
+        use_llm: bool | None = None,
+        max_attempts: int = 3,
+        base_url: str | None = None,
+        cassette: LLMCassette | None = None,
+        prompt_compaction: bool | None = None,
+        llm_mode: str | None = None,
+        hedger: RequestHedger | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        stream: bool | None = None,
+    ):
+        ensure_project_env()
         groq_key = (os.getenv("GROQ_API_KEY") or "").strip()
+        self.cassette = cassette if cassette is not None else LLMCassette.from_env()
         has_real_key = is_real_groq_api_key(groq_key)
-        self.use_llm = has_real_key if use_llm is None else use_llm
+        replaying = self.cassette is not None and self.cassette.replays_only
+        self.use_llm = (has_real_key or replaying) if use_llm is None else use_llm
         self.max_attempts = max_attempts
+        self.base_url = (base_url or os.getenv(GROQ_BASE_URL_ENV) or DEFAULT_GROQ_BASE_URL).rstrip("/")
+        self.token_alert = int(os.getenv(TOKEN_ALERT_ENV) or DEFAULT_TOKEN_ALERT)
+        self.preferred_response_format = os.getenv(RESPONSE_FORMAT_ENV) or DEFAULT_RESPONSE_FORMAT
+        if self.preferred_response_format not in RESPONSE_FORMATS:
+            raise ValueError(
+                f"{RESPONSE_FORMAT_ENV} must be one of {', '.join(RESPONSE_FORMATS)}, "
+                f"not {self.preferred_response_format!r}."
+            )
+        if prompt_compaction is None:
+            prompt_compaction = prompt_compaction_enabled()
+        self.prompt_compaction = prompt_compaction
+        self.prompt_token_budget = int(os.getenv(PROMPT_TOKEN_BUDGET_ENV) or DEFAULT_PROMPT_TOKEN_BUDGET)
+        self.llm_mode = llm_mode or os.getenv(LLM_MODE_ENV) or "full"
+        if self.llm_mode not in LLM_MODES:
+            raise ValueError(f"{LLM_MODE_ENV} must be one of {', '.join(LLM_MODES)}, not {self.llm_mode!r}.")
+        self.validator = InvoiceValidator()
+        self.hedger = hedger if hedger is not None else RequestHedger.from_env()
+        # Shared across parsers so one outage short-circuits every document, not just this instance's.
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else llm_circuit_breaker()
+        self.stream = streaming_enabled() if stream is None else stream
+        self.stream_chunk_timeout = stream_chunk_timeout()
         self._llm = None
 
+    @property
+    def model(self) -> str:
+        return _active_model.get() or self.model_tiers[0]
+
+    @property
+    def model_tiers(self) -> list[str]:
+        tiers = [model.strip() for model in (os.getenv(GROQ_MODEL_TIERS_ENV) or "").split(",") if model.strip()]
+        return tiers or [os.getenv(GROQ_MODEL_ENV, DEFAULT_GROQ_MODEL)]
+
+    @property
+    def chat_completions_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    @property
+    def response_format(self) -> str:
+        formats = RESPONSE_FORMATS[RESPONSE_FORMATS.index(self.preferred_response_format) :]
+        for response_format in formats:
+            if (self.model, response_format) not in _unsupported_response_formats:
+                return response_format
+        return "text"
+
     def parse(self, text: str, document_id: str) -> ParserResult:
         if not text.strip():
             return ParserResult(
@@ -146,12 +286,40 @@ class InvoiceParser:
                 errors=["Parser received empty text."],
             )
 
-        if self.use_llm:
-            llm_result = self._parse_with_llm(text, document_id)
-            if llm_result.status != ParserStatus.FAILED:
+        llm_result = None
+        deterministic = None
+        if self.use_llm and not llm_suppressed():
+            fields = None
+            if self.llm_mode == "missing_fields":
+                with STAGE_SECONDS.time(stage="parse_deterministic"):
+                    deterministic = self._parse_deterministically(text, document_id)
+                if deterministic.extraction is not None:
+                    fields = self._missing_fields(deterministic.extraction)
+                    if not fields:
+                        trace_event("llm_skipped", reason="no_missing_fields")
+                        PARSER_STATUS_TOTAL.inc(status=deterministic.status.value)
+                        return deterministic
+            if not self.circuit_breaker.allow():
+                trace_event("llm_skipped", reason="circuit_open")
+            else:
+                with STAGE_SECONDS.time(stage="parse_llm"):
+                    base = deterministic.extraction if fields else None
+                    llm_result = self._parse_with_model_tiers(text, document_id, base, fields)
+            if llm_result is not None and llm_result.status != ParserStatus.FAILED:
+                PARSER_STATUS_TOTAL.inc(status=llm_result.status.value)
                 return llm_result
 
-        return self._parse_deterministically(text, document_id)
+        if deterministic is not None:
+            result = deterministic
+        else:
+            with STAGE_SECONDS.time(stage="parse_deterministic"):
+                result = self._parse_deterministically(text, document_id)
+        if llm_result is not None:
+            result.llm_ms = llm_result.llm_ms
+            result.llm_attempts = llm_result.llm_attempts
+            result.llm_usage = llm_result.llm_usage
+        PARSER_STATUS_TOTAL.inc(status=result.status.value)
+        return result
 
     def parse_json(
         self,
@@ -161,7 +329,7 @@ class InvoiceParser:
         source_text: str | None = None,
     ) -> ParserResult:
         try:
-            payload = json.loads(self._extract_json_object(raw_json) or raw_json)
+            payload = self._load_json_payload(raw_json)
         except json.JSONDecodeError as exc:
             return ParserResult(
                 status=ParserStatus.FAILED,
@@ -178,66 +346,377 @@ class InvoiceParser:
             source_text=source_text,
         )
 
-    def _parse_with_llm(self, text: str, document_id: str) -> ParserResult:
+    def parse_missing_fields_json(
+        self,
+        raw_json: str,
+        document_id: str,
+        base: InvoiceExtraction,
+        fields: tuple[str, ...],
+        source_text: str | None = None,
+    ) -> ParserResult:
+        try:
+            answer = self._load_json_payload(raw_json)
+        except json.JSONDecodeError as exc:
+            return ParserResult(
+                status=ParserStatus.FAILED,
+                raw_output=raw_json,
+                attempts=1,
+                errors=[f"Invalid JSON: {exc}"],
+            )
+        if not isinstance(answer, dict):
+            return ParserResult(
+                status=ParserStatus.FAILED,
+                raw_output=raw_json,
+                attempts=1,
+                errors=[f"Expected a JSON object, got {type(answer).__name__}."],
+            )
+        filled = {name: answer[name] for name in fields if answer.get(name) not in (None, "", [], {})}
+        payload = base.model_dump(include=EXTRACTION_FIELDS)
+        payload.update(filled)
+        if "line_items" in filled:
+            payload["line_items_source"] = "parser"
+        result = self._validate_payload(
+            payload,
+            document_id,
+            raw_json,
+            attempts=1,
+            default_source="llm",
+            source_text=source_text,
+        )
+        if result.extraction is not None:
+            extraction = result.extraction
+            extraction.field_sources = {
+                **extraction.field_sources,
+                **{name: source for name, source in base.field_sources.items() if name not in filled},
+                **{name: "llm" for name in filled},
+            }
+            extraction.original_extracted_values = {
+                **extraction.original_extracted_values,
+                **{name: value for name, value in base.original_extracted_values.items() if name not in filled},
+            }
+        return result
+
+    def _load_json_payload(self, raw_json: str) -> Any:
+        try:
+            payload = json.loads(raw_json)
+        except json.JSONDecodeError:
+            payload = None
+        if not isinstance(payload, dict):
+            payload = json.loads(self._extract_json_object(raw_json) or raw_json)
+        return payload
+
+    def _missing_fields(self, extraction: InvoiceExtraction) -> tuple[str, ...]:
+        missing = [
+            name
+            for name in JSON_SCHEMA_HINT
+            if name not in {"currency", "line_items"} and getattr(extraction, name) in (None, "")
+        ]
+        if extraction.line_items_source == "fallback_single_line" or not extraction.line_items:
+            missing.append("line_items")
+        if not set(missing) - OPTIONAL_FIELDS:
+            return ()
+        return tuple(missing)
+
+    def _parse_with_model_tiers(
+        self,
+        text: str,
+        document_id: str,
+        base: InvoiceExtraction | None,
+        fields: tuple[str, ...] | None,
+    ) -> ParserResult:
+        tiers = self.model_tiers
+        usage = LLMUsage()
+        llm_ms = 0.0
+        llm_attempts = 0
+        best: ParserResult | None = None
+        for index, model in enumerate(tiers):
+            with use_model(model):
+                result = self._parse_with_llm(text, document_id, base, fields, usage)
+            LLM_TIER_SECONDS.observe(result.llm_ms / 1000, model=model)
+            llm_ms += result.llm_ms
+            llm_attempts += result.llm_attempts
+            if best is None or self._prefer_escalated(result, best):
+                best = result
+            reason = None
+            if index + 1 < len(tiers) and not self.circuit_breaker.is_open():
+                reason = self._escalation_reason(result, text)
+            if reason is None:
+                LLM_TIER_TOTAL.inc(model=model, outcome="failed" if result.status == ParserStatus.FAILED else "accepted")
+                break
+            LLM_TIER_TOTAL.inc(model=model, outcome="escalated")
+            usage.escalations.append(f"{model}: {reason}")
+            trace_event("llm_escalation", from_model=model, to_model=tiers[index + 1], reason=reason)
+        best.llm_ms = round(llm_ms, 3)
+        best.llm_attempts = llm_attempts
+        best.llm_usage = usage
+        return best
+
+    def _escalation_reason(self, result: ParserResult, text: str) -> str | None:
+        if result.status == ParserStatus.FAILED or result.extraction is None:
+            return "invalid_output"
+        codes = {item.code for item in self.validator.arithmetic_issues(result.extraction)}
+        if not codes:
+            return None
+        # Mismatches the regex parser reproduces are printed on the invoice, so a larger model cannot fix them.
+        deterministic = self._parse_deterministically(text, result.extraction.document_id).extraction
+        if deterministic is not None:
+            codes -= {item.code for item in self.validator.arithmetic_issues(deterministic)}
+        return ",".join(sorted(codes)) or None
+
+    def _prefer_escalated(self, candidate: ParserResult, current: ParserResult) -> bool:
+        if candidate.extraction is None:
+            return False
+        if current.extraction is None:
+            return True
+        return len(self.validator.arithmetic_issues(candidate.extraction)) <= len(
+            self.validator.arithmetic_issues(current.extraction)
+        )
+
+    def _parse_with_llm(
+        self,
+        text: str,
+        document_id: str,
+        base: InvoiceExtraction | None = None,
+        fields: tuple[str, ...] | None = None,
+        usage: LLMUsage | None = None,
+    ) -> ParserResult:
         errors: list[str] = []
         raw_output = ""
+        llm_ms = 0.0
+        attempts_made = 0
+        usage = usage if usage is not None else LLMUsage()
+        prompt_text = self._prompt_text(text)
+        for name in fields or ():
+            LLM_FIELD_REQUESTS_TOTAL.inc(field=name)
 
         for attempt in range(1, self.max_attempts + 1):
-            prompt = self._build_prompt(text, raw_output if attempt > 1 else None)
-            try:
-                raw_output = self._call_llm(prompt)
-            except Exception as exc:  # pragma: no cover - optional LLM path
-                errors.append(f"LLM call failed on attempt {attempt}: {exc}")
-                break
-
-            result = self.parse_json(
-                raw_output,
-                document_id,
-                default_source="llm",
-                source_text=text,
-            )
-            result.attempts = attempt
+            previous_output = raw_output if attempt > 1 else None
+            if fields:
+                prompt = self._build_missing_fields_prompt(prompt_text, previous_output, fields)
+            else:
+                prompt = self._build_prompt(prompt_text, previous_output)
+            attempts_made = attempt
+            with span(
+                "llm_attempt",
+                attempt=attempt,
+                repair=attempt > 1,
+                requested_fields=",".join(fields) if fields else None,
+            ) as attempt_span:
+                consume_llm_usage()
+                try:
+                    with LLM_CALL_SECONDS.time() as timer, request_fields(fields):
+                        raw_output = self._call_llm(prompt)
+                except Exception as exc:  # pragma: no cover - optional LLM path
+                    llm_ms += timer.ms
+                    self._record_circuit_outcome(exc)
+                    self._record_attempt_usage(usage, attempt, "error", timer.ms)
+                    LLM_ATTEMPTS_TOTAL.inc(outcome="error")
+                    attempt_span.set(
+                        outcome="error",
+                        status_code=getattr(getattr(exc, "response", None), "status_code", None),
+                        retry_reason=f"{type(exc).__name__}: {exc}",
+                        latency_ms=round(timer.ms, 3),
+                    )
+                    errors.append(f"LLM call failed on attempt {attempt}: {exc}")
+                    break
+                llm_ms += timer.ms
+
+                if fields:
+                    result = self.parse_missing_fields_json(raw_output, document_id, base, fields, source_text=text)
+                else:
+                    result = self.parse_json(
+                        raw_output,
+                        document_id,
+                        default_source="llm",
+                        source_text=text,
+                    )
+                result.attempts = attempt
+                result.llm_ms = round(llm_ms, 3)
+                result.llm_attempts = attempt
+                result.llm_usage = usage
+                outcome = "invalid" if result.status == ParserStatus.FAILED else "valid"
+                self._record_attempt_usage(usage, attempt, outcome, timer.ms)
+                LLM_ATTEMPTS_TOTAL.inc(outcome=outcome)
+                LLM_RESPONSE_FORMAT_TOTAL.inc(format=self.response_format, outcome=outcome)
+                attempt_span.set(
+                    outcome=outcome,
+                    status_code=200,
+                    response_format=self.response_format,
+                    retry_reason=result.errors[0] if outcome == "invalid" and result.errors else None,
+                    latency_ms=round(timer.ms, 3),
+                )
             if result.status != ParserStatus.FAILED:
+                self._check_runaway(usage, attempts_made, succeeded=True)
                 return result
             errors.extend(result.errors)
 
+        self._check_runaway(usage, attempts_made, succeeded=False)
+
         return ParserResult(
             status=ParserStatus.FAILED,
             raw_output=raw_output,
             attempts=min(self.max_attempts, max(1, len(errors))),
             errors=errors or ["LLM parser failed."],
+            llm_ms=round(llm_ms, 3),
+            llm_attempts=attempts_made,
+            llm_usage=usage,
+        )
+
+    def _record_circuit_outcome(self, exc: Exception) -> None:
+        if isinstance(exc, (CassetteMiss, LLMNotConfigured)):
+            # Local misses never reached the provider, so they say nothing about its health.
+            return
+        status_code = getattr(getattr(exc, "response", None), "status_code", None)
+        if status_code is not None and status_code < 500 and status_code != 429:
+            # The provider answered; a rejected request says nothing about its availability.
+            self.circuit_breaker.record_success()
+            return
+        self.circuit_breaker.record_failure(f"{type(exc).__name__}: {exc}")
+
+    def _prompt_text(self, text: str) -> str:
+        if not self.prompt_compaction:
+            return text
+        excerpt = select_prompt_regions(
+            text,
+            self._subtotal_patterns() + self._gst_patterns() + self._total_patterns(),
+            self.prompt_token_budget,
+        )
+        PROMPT_COMPACTION_TOTAL.inc(outcome=excerpt.reason)
+        trace_event(
+            "prompt_compaction",
+            outcome=excerpt.reason,
+            original_tokens=excerpt.original_tokens,
+            excerpt_tokens=excerpt.excerpt_tokens,
+        )
+        return excerpt.text
+
+    def _record_attempt_usage(self, usage: LLMUsage, attempt: int, outcome: str, latency_ms: float = 0.0) -> None:
+        entry = usage.record(attempt, outcome, consume_llm_usage(), self.model, latency_ms)
+        if entry.prompt_tokens:
+            LLM_TOKENS_TOTAL.inc(entry.prompt_tokens, kind="prompt")
+        if entry.completion_tokens:
+            LLM_TOKENS_TOTAL.inc(entry.completion_tokens, kind="completion")
+        if entry.cached_tokens:
+            LLM_TOKENS_TOTAL.inc(entry.cached_tokens, kind="cached")
+
+    def _check_runaway(self, usage: LLMUsage, attempts: int, succeeded: bool) -> None:
+        exhausted = not succeeded and self.max_attempts > 1 and attempts >= self.max_attempts
+        if not exhausted and usage.total_tokens <= self.token_alert:
+            return
+        usage.runaway = True
+        LLM_RUNAWAY_TOTAL.inc()
+        trace_event(
+            "llm_runaway",
+            attempts=attempts,
+            total_tokens=usage.total_tokens,
+            reason="attempts_exhausted" if exhausted else "token_alert",
         )
 
     def _call_llm(self, prompt: str) -> str:
+        if self.cassette is not None:
+            return self.cassette.call(self._groq_request_payload(prompt), lambda: self._request_llm(prompt))
+        return self._request_llm(prompt)
+
+    def _request_llm(self, prompt: str) -> str:
         api_key = os.getenv("GROQ_API_KEY")
         if not is_real_groq_api_key(api_key):
-            raise RuntimeError("GROQ_API_KEY is not configured.")
+            raise LLMNotConfigured("GROQ_API_KEY is not configured.")
 
-        try:
-            payload = self._call_groq_with_requests(api_key, prompt)
-        except Exception:
-            payload = self._call_groq_with_curl(api_key, prompt)
+        while True:
+            try:
+                payload = self._send_groq_request(api_key, prompt)
+            except Exception as exc:
+                response = getattr(exc, "response", None)
+                if response is None:
+                    if self.stream:
+                        # A stalled stream must not restart as a blocking curl call with a whole-call timeout.
+                        raise
+                    payload = self._call_groq_with_curl(api_key, prompt)
+                    break
+                if response.status_code != 400 or self.response_format == "text":
+                    # The server answered (429, 5xx, ...); curl would only repeat the same request.
+                    raise
+                error = self._error_body(response)
+                if error.get("code") == "json_validate_failed":
+                    # JSON mode rejected the generation; hand it to the repair loop like any invalid output.
+                    self.circuit_breaker.record_success()
+                    record_llm_usage(None)
+                    return str(error.get("failed_generation") or "")
+                if not self._is_response_format_error(error):
+                    # Context length, model or parameter errors would fail the same way in any format.
+                    raise
+                self._mark_response_format_unsupported(str(error.get("message") or exc))
+                continue
+            break
+        # Only answers that came back over the network say the provider is healthy; cassette hits never get here.
+        self.circuit_breaker.record_success()
+        record_llm_usage(payload.get("usage"), payload.get("model"))
         return str(payload["choices"][0]["message"]["content"])
 
+    def _send_groq_request(self, api_key: str, prompt: str) -> dict[str, Any]:
+        send = self._call_groq_streaming if self.stream else self._call_groq_with_requests
+        if self.hedger is None:
+            return send(api_key, prompt)
+        # Usage is recorded from the returned payload in this thread, not inside the hedged workers.
+        abandoned: list[int] = []
+        payload = self.hedger.call(lambda: send(api_key, prompt), on_abandoned=abandoned.append)
+        if abandoned and payload.get("usage"):
+            payload = {**payload, "usage": {**payload["usage"], "hedged_duplicates": sum(abandoned)}}
+        return payload
+
+    def _error_body(self, response) -> dict[str, Any]:
+        try:
+            error = response.json().get("error")
+        except (ValueError, AttributeError):
+            return {}
+        return error if isinstance(error, dict) else {}
+
+    def _is_response_format_error(self, error: dict[str, Any]) -> bool:
+        if error.get("param") == "response_format":
+            return True
+        described = f"{error.get('code') or ''} {error.get('message') or ''}"
+        return RESPONSE_FORMAT_ERROR.search(described) is not None
+
+    def _mark_response_format_unsupported(self, reason: str) -> None:
+        rejected = self.response_format
+        _unsupported_response_formats.add((self.model, rejected))
+        LLM_RESPONSE_FORMAT_FALLBACK_TOTAL.inc(format=rejected)
+        trace_event(
+            "llm_response_format_fallback",
+            model=self.model,
+            rejected=rejected,
+            fallback=self.response_format,
+            reason=reason,
+        )
+
     def _groq_request_payload(self, prompt: str) -> dict[str, Any]:
-        return {
-            "model": os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
+        fields = _requested_fields.get()
+        system_prompt = self._missing_fields_system_prompt() if fields else self._system_prompt()
+        payload: dict[str, Any] = {
+            "model": self.model,
             "temperature": 0,
             "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You extract invoice data into strict JSON only. "
-                        "You do not decide approval, readiness, validation, or account codes."
-                    ),
-                },
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
         }
+        if self.response_format == "json_schema":
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "invoice_missing_fields" if fields else "invoice_extraction",
+                    "schema": extraction_json_schema(fields),
+                },
+            }
+        elif self.response_format == "json_object":
+            payload["response_format"] = {"type": "json_object"}
+        return payload
 
     def _call_groq_with_requests(self, api_key: str, prompt: str) -> dict[str, Any]:
+        import requests
+
         response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
+            self.chat_completions_url,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
@@ -248,6 +727,72 @@ class InvoiceParser:
         response.raise_for_status()
         return response.json()
 
+    def _call_groq_streaming(self, api_key: str, prompt: str) -> dict[str, Any]:
+        import requests
+
+        request_payload = self._groq_request_payload(prompt)
+        response = requests.post(
+            self.chat_completions_url,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={**request_payload, "stream": True, "stream_options": {"include_usage": True}},
+            stream=True,
+            # The read timeout bounds the gap between chunks, not the whole completion.
+            timeout=(STREAM_CONNECT_TIMEOUT, self.stream_chunk_timeout),
+        )
+        with response:
+            if not response.ok:
+                # Buffer the short error body for _error_body, then raise inside the block so the connection is released.
+                response.content
+                response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("text/event-stream"):
+                # A JSON or HTML body in place of the stream goes through the same path as an HTTP error.
+                response.content
+                raise requests.HTTPError(
+                    f"Expected an event stream from {self.chat_completions_url}, got {content_type or 'no content type'}.",
+                    response=response,
+                )
+            result = read_chat_stream(response.iter_content(chunk_size=None), on_header=self._check_stream_header)
+        if result.header_ms is not None:
+            LLM_STREAM_SECONDS.observe(result.header_ms / 1000, phase="header")
+        LLM_STREAM_SECONDS.observe(result.complete_ms / 1000, phase="complete")
+        trace_event(
+            "llm_stream",
+            chunks=result.chunks,
+            header_ms=round(result.header_ms, 3) if result.header_ms is not None else None,
+            complete_ms=round(result.complete_ms, 3),
+            stopped_early=result.stopped_early,
+        )
+        usage = result.usage
+        if usage is None:
+            # Streams cut short after the object (or without usage reporting) are estimated so budgets keep counting.
+            prompt_tokens = sum(estimate_tokens(message["content"]) for message in request_payload["messages"])
+            completion_tokens = estimate_tokens(result.content)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "estimated": True,
+            }
+        return {
+            "model": result.model or request_payload["model"],
+            "choices": [{"message": {"content": result.content}}],
+            "usage": usage,
+        }
+
+    def _check_stream_header(self, header: dict[str, Any]) -> None:
+        issues = []
+        abn = header.get("supplier_abn")
+        if abn and not validate_abn_checksum(str(abn)):
+            issues.append("supplier_abn_checksum")
+        subtotal, gst, total = (coerce_decimal(header.get(name)) for name in ("subtotal", "gst", "total"))
+        if None not in (subtotal, gst, total) and abs(subtotal + gst - total) > Decimal("0.01"):
+            issues.append("header_totals_mismatch")
+        trace_event("llm_stream_header", fields=",".join(sorted(header)), issues=",".join(issues) or None)
+
     def _call_groq_with_curl(self, api_key: str, prompt: str) -> dict[str, Any]:
         curl = shutil.which("curl.exe") or shutil.which("curl")
         if not curl:
@@ -262,7 +807,7 @@ class InvoiceParser:
             config_path.write_text(
                 "\n".join(
                     [
-                        'url = "https://api.groq.com/openai/v1/chat/completions"',
+                        f'url = "{self.chat_completions_url}"',
                         'request = "POST"',
                         f'header = "Authorization: Bearer {api_key}"',
                         'header = "Content-Type: application/json"',
@@ -298,15 +843,11 @@ class InvoiceParser:
             raise RuntimeError(f"Groq API error: {message}")
         return response_payload
 
-    def _build_prompt(self, text: str, previous_output: str | None) -> str:
-        repair = ""
-        if previous_output:
-            repair = (
-                "The previous output was malformed or failed schema validation. "
-                "Repair it and return only valid JSON.\n"
-                f"Previous output:\n{previous_output}\n\n"
-            )
+    def _system_prompt(self) -> str:
+        # Byte-identical across requests so the provider can cache it as a prompt prefix.
         return (
+            "You extract invoice data into strict JSON only. "
+            "You do not decide approval, readiness, validation, or account codes.\n"
             f"Prompt version: {PROMPT_VERSION}\n"
             "Extract an Australian supplier invoice into this strict JSON schema. "
             "Return only one JSON object, no markdown, no commentary. Use null for missing values. "
@@ -320,10 +861,40 @@ class InvoiceParser:
             "- Extract line items from pipes, tables, or fixed-width rows when amounts are visible. Use amount as the GST-exclusive line amount where the invoice separates subtotal and GST.\n"
             "- Use tax_treatment GST for taxable rows and GST_FREE for GST-free rows. Do not mark a mixed invoice as all GST.\n"
             "- Do not decide whether the invoice is ready; validation is deterministic after extraction.\n\n"
-            f"Schema:\n{json.dumps(JSON_SCHEMA_HINT, indent=2)}\n\n"
-            f"{repair}Invoice text:\n{text}"
+            f"Schema:\n{json.dumps(JSON_SCHEMA_HINT, indent=2)}"
+        )
+
+    def _build_prompt(self, text: str, previous_output: str | None) -> str:
+        repair = ""
+        if previous_output:
+            repair = (
+                "The previous output was malformed or failed schema validation. "
+                "Repair it and return only valid JSON.\n"
+                f"Previous output:\n{previous_output}\n\n"
+            )
+        return f"{repair}Invoice text:\n{text}"
+
+    def _missing_fields_system_prompt(self) -> str:
+        return (
+            "You fill in fields that a rule-based parser could not find on an Australian supplier invoice. "
+            "Return only one JSON object containing exactly the requested keys, no markdown, no commentary. "
+            "Use null when a value is not printed. Use decimal strings for money.\n"
+            f"Prompt version: {PROMPT_VERSION}\n"
+            "- supplier_* fields describe the supplier/vendor/from party; buyer_* fields the bill-to/customer.\n"
+            "- invoice_number comes from invoice/ref/id labels, never payment, bank, quote or order references.\n"
+            "- Normalize dates to YYYY-MM-DD when unambiguous.\n"
+            "- line_items are the invoice rows with GST-exclusive amounts; tax_treatment is GST or GST_FREE."
         )
 
+    def _build_missing_fields_prompt(
+        self,
+        text: str,
+        previous_output: str | None,
+        fields: tuple[str, ...],
+    ) -> str:
+        requested = json.dumps({name: JSON_SCHEMA_HINT[name] for name in fields})
+        return f"Requested fields: {requested}\n\n{self._build_prompt(text, previous_output)}"
+
     def _validate_payload(
         self,
         payload: dict[str, Any],
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
 from app.agent.responder import InvoiceResponder
-from app.engine.account_mapping import AccountCodeMapper
+from app.engine.account_mapping import MAPPING_FIELDS, AccountCodeMapper
 from app.engine.intake import UnsupportedDocumentError, create_document, new_document_id
+from app.engine.metrics import DOCUMENTS_TOTAL, OCR_METHOD_TOTAL, STAGE_SECONDS, Timer
 from app.engine.ocr import PDFTextExtractor
 from app.engine.parser import InvoiceParser
 from app.engine.schemas import (
@@ -13,12 +18,20 @@ from app.engine.schemas import (
     InvoiceStatus,
     OCRResult,
     ParserStatus,
+    StageTimings,
 )
+from app.engine.tracing import bind, span, trace_event
 from app.engine.validator import InvoiceValidator
 from app.engine.xero_payload import XeroPayloadBuilder
 from app.persistence.repositories import InvoiceRepository
 
 
+@contextmanager
+def _stage(stage: str) -> Iterator[Timer]:
+    with span(stage), STAGE_SECONDS.time(stage=stage) as timer:
+        yield timer
+
+
 class InvoiceProcessor:
     def __init__(
         self,
@@ -55,8 +68,23 @@ class InvoiceProcessor:
                 message=str(exc),
             )
 
-        ocr_result = self.ocr.extract(file_bytes, document.document_id)
-        self.repository.save_document(document, ocr_result)
+        with bind(document_id=document.document_id, batch_id=batch_id):
+            with span("process_document", filename=filename, bytes=len(file_bytes)) as document_span:
+                result = self._process_document(document, file_bytes)
+                document_span.set(invoice_status=result.status.value)
+        return result
+
+    def _process_document(self, document: DocumentMetadata, file_bytes: bytes) -> InvoiceResult:
+        started = time.perf_counter()
+        with _stage("ocr") as ocr_timer:
+            ocr_result = self.ocr.extract(file_bytes, document.document_id)
+        OCR_METHOD_TOTAL.inc(method=ocr_result.method)
+        for warning in ocr_result.warnings:
+            trace_event("ocr_warning", method=ocr_result.method, message=warning)
+        timings = StageTimings(ocr_ms=round(ocr_timer.ms, 3), pages=ocr_result.pages)
+        with _stage("persist") as persist_timer:
+            self.repository.save_document(document, ocr_result)
+        timings.persistence_ms = round(persist_timer.ms, 3)
         if ocr_result.status == ExtractionStatus.FAILED or not ocr_result.text.strip():
             result = self._failure_result(
                 document_id=document.document_id,
@@ -65,10 +93,9 @@ class InvoiceProcessor:
                 message="No text could be extracted from the PDF.",
                 ocr=ocr_result,
             )
-            self.repository.save_invoice_result(result)
-            return result
+            return self._save_result(result, timings, started)
 
-        return self._process_text(document, ocr_result)
+        return self._process_text(document, ocr_result, timings, started)
 
     def process_text(
         self,
@@ -77,31 +104,59 @@ class InvoiceProcessor:
         batch_id: str | None = None,
     ) -> InvoiceResult:
         document = create_document(filename, "application/pdf", batch_id)
+        with bind(document_id=document.document_id, batch_id=batch_id):
+            with span("process_document", filename=filename, bytes=len(text)) as document_span:
+                result = self._process_fixture_text(document, text)
+                document_span.set(invoice_status=result.status.value)
+        return result
+
+    def _process_fixture_text(self, document: DocumentMetadata, text: str) -> InvoiceResult:
+        started = time.perf_counter()
         ocr_result = OCRResult(
             document_id=document.document_id,
             text=text,
             method="fixture_text",
             status=ExtractionStatus.SUCCESS,
         )
-        self.repository.save_document(document, ocr_result)
-        return self._process_text(document, ocr_result)
+        timings = StageTimings()
+        with _stage("persist") as persist_timer:
+            self.repository.save_document(document, ocr_result)
+        timings.persistence_ms = round(persist_timer.ms, 3)
+        return self._process_text(document, ocr_result, timings, started)
 
     def rebuild_result(
         self,
         existing: InvoiceResult,
         extraction: InvoiceExtraction,
+        changed_fields: set[str] | None = None,
+        persist: bool = True,
     ) -> InvoiceResult:
-        validation = self.validator.validate(
-            extraction,
-            duplicate_checker=self.repository.invoice_key_exists,
-        )
-        account = existing.account_code_suggestion or self.mapper.suggest(extraction)
+        if changed_fields is None:
+            validation = self.validator.validate(
+                extraction,
+                duplicate_checker=self.repository.invoice_key_exists,
+            )
+        else:
+            validation = self.validator.revalidate(
+                extraction,
+                existing.validation,
+                changed_fields,
+                duplicate_checker=self.repository.invoice_key_exists,
+            )
+        account = existing.account_code_suggestion
         if (
             account is None
             or account.status != "user_selected"
             or account.suggested_account_code in {None, "UNMAPPED"}
         ):
-            account = self.mapper.suggest(extraction)
+            mapping_unchanged = (
+                account is not None
+                and account.status != "user_selected"
+                and changed_fields is not None
+                and not MAPPING_FIELDS & {field.split(".", 1)[0] for field in changed_fields}
+            )
+            if not mapping_unchanged:
+                account = self.mapper.suggest(extraction)
         payload = self.payload_builder.build(extraction, account, validation.status)
         result = InvoiceResult(
             document_id=existing.document_id,
@@ -112,14 +167,30 @@ class InvoiceProcessor:
             account_code_suggestion=account,
             xero_payload=payload,
             corrections=existing.corrections,
+            version=existing.version,
+            timings=existing.timings,
+            llm_usage=existing.llm_usage,
             ocr=existing.ocr,
         )
-        result.response = self.responder.render(result)
-        self.repository.save_invoice_result(result)
+        if persist:
+            self.repository.save_invoice_result(result)
         return result
 
-    def _process_text(self, document: DocumentMetadata, ocr_result: OCRResult) -> InvoiceResult:
-        parser_result = self.parser.parse(ocr_result.text, document.document_id)
+    def _process_text(
+        self,
+        document: DocumentMetadata,
+        ocr_result: OCRResult,
+        timings: StageTimings,
+        started: float,
+    ) -> InvoiceResult:
+        with _stage("parse") as parse_timer:
+            parser_result = self.parser.parse(ocr_result.text, document.document_id)
+        timings.parse_ms = round(parse_timer.ms, 3)
+        timings.llm_ms = parser_result.llm_ms
+        timings.llm_attempts = parser_result.llm_attempts
+        timings.llm_tokens = parser_result.llm_usage.total_tokens if parser_result.llm_usage else 0
+        for error in parser_result.errors:
+            trace_event("parser_error", parser_status=parser_result.status.value, message=error)
         if parser_result.status == ParserStatus.FAILED or parser_result.extraction is None:
             code = "PARSER_INVALID_JSON"
             if parser_result.errors and not any("Invalid JSON" in error for error in parser_result.errors):
@@ -131,19 +202,24 @@ class InvoiceProcessor:
                 message="Parser could not return a valid invoice schema.",
                 ocr=ocr_result,
             )
-            self.repository.save_invoice_result(result)
-            return result
+            result.llm_usage = parser_result.llm_usage
+            return self._save_result(result, timings, started)
 
-        validation = self.validator.validate(
-            parser_result.extraction,
-            duplicate_checker=self.repository.invoice_key_exists,
-        )
-        account = self.mapper.suggest(parser_result.extraction)
-        payload = self.payload_builder.build(
-            parser_result.extraction,
-            account,
-            validation.status,
-        )
+        with _stage("validate") as validation_timer:
+            validation = self.validator.validate(
+                parser_result.extraction,
+                duplicate_checker=self.repository.invoice_key_exists,
+            )
+        timings.validation_ms = round(validation_timer.ms, 3)
+        with _stage("map") as mapping_timer:
+            account = self.mapper.suggest(parser_result.extraction)
+        timings.mapping_ms = round(mapping_timer.ms, 3)
+        with _stage("payload"):
+            payload = self.payload_builder.build(
+                parser_result.extraction,
+                account,
+                validation.status,
+            )
         result = InvoiceResult(
             document_id=document.document_id,
             filename=document.filename,
@@ -152,10 +228,22 @@ class InvoiceProcessor:
             validation=validation,
             account_code_suggestion=account,
             xero_payload=payload,
+            llm_usage=parser_result.llm_usage,
             ocr=ocr_result,
         )
-        result.response = self.responder.render(result)
-        self.repository.save_invoice_result(result)
+        DOCUMENTS_TOTAL.inc(status=result.status.value)
+        return self._save_result(result, timings, started)
+
+    def _save_result(self, result: InvoiceResult, timings: StageTimings, started: float) -> InvoiceResult:
+        # One write per document: the stored timings stop where the write starts, and its duration
+        # is added to the returned result only.
+        timings.total_ms = round((time.perf_counter() - started) * 1000, 3)
+        result.timings = timings.model_copy()
+        with _stage("persist") as persist_timer:
+            self.repository.save_invoice_result(result)
+        timings.persistence_ms = round(timings.persistence_ms + persist_timer.ms, 3)
+        timings.total_ms = round((time.perf_counter() - started) * 1000, 3)
+        result.timings = timings
         return result
 
     def _failure_result(
@@ -174,5 +262,5 @@ class InvoiceProcessor:
             validation=validation,
             ocr=ocr,
         )
-        result.response = self.responder.render(result)
+        DOCUMENTS_TOTAL.inc(status=result.status.value)
         return result
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from app.engine.project_env import ensure_project_env
+
+
+PROFILING_ENV = "INVOICE_PROFILING"
+PROFILE_DIR_ENV = "INVOICE_PROFILE_DIR"
+PROFILE_KEEP_ENV = "INVOICE_PROFILE_KEEP"
+PROFILE_HEADER = "X-Invoice-Profile"
+PROFILING_MODES = {"off", "header", "all"}
+DEFAULT_PROFILE_DIR = Path("data/profiles")
+DEFAULT_PROFILE_KEEP = 20
+DEFAULT_SAMPLE_INTERVAL = 0.002
+TRUTHY_HEADER_VALUES = {"1", "true", "yes", "on"}
+
+
+def _safe_key(key: str) -> str:
+    # Leading dots are dropped so keys such as ".." cannot name the parent directory.
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key).lstrip(".") or "profile"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="invoice-profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+class ProfileCapture:
+    def __init__(self, profiler: "RequestProfiler | None" = None):
+        self.profiler = profiler
+        self.key: str | None = None
+        self.path: Path | None = None
+        self._profile: cProfile.Profile | None = None
+        self._sampler: _StackSampler | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.profiler is not None
+
+    def __enter__(self) -> "ProfileCapture":
+        if self.profiler is None:
+            return self
+        self._sampler = _StackSampler(threading.get_ident(), self.profiler.sample_interval)
+        self._sampler.start()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger or coverage tool) owns this thread; keep the sampler only.
+            profile = None
+        self._profile = profile
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.profiler is None:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        self._sampler.stop()
+        self.path = self.profiler.write(self.key or "unknown", self._profile, self._sampler.stacks)
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        mode: str = "off",
+        directory: str | Path = DEFAULT_PROFILE_DIR,
+        keep: int = DEFAULT_PROFILE_KEEP,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+    ):
+        self.mode = mode if mode in PROFILING_MODES else "off"
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        ensure_project_env()
+        return cls(
+            mode=os.getenv(PROFILING_ENV, "off").strip().lower(),
+            directory=os.getenv(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR,
+            keep=int(os.getenv(PROFILE_KEEP_ENV) or DEFAULT_PROFILE_KEEP),
+        )
+
+    def should_profile(self, header_value: str | None = None) -> bool:
+        if self.mode == "all":
+            return True
+        return self.mode == "header" and (header_value or "").strip().lower() in TRUTHY_HEADER_VALUES
+
+    def capture(self, header_value: str | None = None) -> ProfileCapture:
+        return ProfileCapture(self if self.should_profile(header_value) else None)
+
+    def write(self, key: str, profile: cProfile.Profile | None, stacks: Counter[str]) -> Path:
+        target = self.directory / _safe_key(key)
+        if self.directory.resolve() not in target.resolve().parents:
+            raise ValueError(f"Profile key {key!r} resolves outside {self.directory}.")
+        target.mkdir(parents=True, exist_ok=True)
+        if profile is not None:
+            profile.dump_stats(str(target / "profile.pstats"))
+        (target / "stacks.collapsed").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+            encoding="utf-8",
+        )
+        self._prune()
+        return target
+
+    def _prune(self) -> None:
+        with self._lock:
+            profiles = sorted(
+                (path for path in self.directory.iterdir() if path.is_dir()),
+                key=lambda path: path.stat().st_mtime_ns,
+                reverse=True,
+            )
+            for stale in profiles[self.keep:]:
+                shutil.rmtree(stale, ignore_errors=True)
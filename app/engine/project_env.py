@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import os
+
+
+def load_dotenv() -> bool:
+    try:
+        from dotenv import load_dotenv as load_dotenv_file
+    except ImportError:  # pragma: no cover - optional dependency in fresh environments
+        return False
+    return load_dotenv_file()
+
+
+def load_project_env() -> None:
+    if load_dotenv():
+        return
+    env_path = ".env"
+    if not os.path.exists(env_path):
+        return
+    with open(env_path, encoding="utf-8") as env_file:
+        for raw_line in env_file:
+            line = raw_line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            key = key.strip()
+            value = value.strip().strip('"').strip("'")
+            os.environ.setdefault(key, value)
+
+
+# Settings are read lazily across the app; every reader calls ensure_project_env() first so .env values apply.
+_project_env_loaded = False
+
+
+def ensure_project_env() -> None:
+    global _project_env_loaded
+    if not _project_env_loaded:
+        _project_env_loaded = True
+        load_project_env()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import Iterable, NamedTuple
+
+
+PROMPT_COMPACTION_ENV = "INVOICE_PROMPT_COMPACTION"
+PROMPT_TOKEN_BUDGET_ENV = "INVOICE_PROMPT_TOKEN_BUDGET"
+DEFAULT_PROMPT_TOKEN_BUDGET = 400
+HEADER_LINES = 8
+# Below this saving the excerpt only risks dropping context, so the full text is sent.
+MIN_SAVING_RATIO = 0.15
+GAP_MARKER = "[...]"
+ENABLED_VALUES = {"1", "true", "yes", "on"}
+
+FIELD_CUE = re.compile(
+    r"\b(?:a\s*b\s*n|a8n)\b\s*[:#]?\s*\d|"
+    r"^\s*(?:tax\s+invoice|invoice|inv\b|ref(?:erence)?\b|supplier|vendor|from\b|buyer|bill(?:ed)?\s+to|"
+    r"customer|recipient|date|due|issued|currency|gst[-\s]*(?:free|inclusive|included)|includes\s+gst|"
+    r"mixed\s+taxable|tax\s+treatment)",
+    re.IGNORECASE,
+)
+TABLE_HEADER = re.compile(r"^\s*(?:line\s+items?|items?|description|qty|quantity)\b", re.IGNORECASE)
+MONEY = re.compile(r"\$?\s*[0-9][0-9,]*\.\d{2}\b")
+
+
+class PromptExcerpt(NamedTuple):
+    text: str
+    compacted: bool
+    original_tokens: int
+    excerpt_tokens: int
+    reason: str
+
+
+def prompt_compaction_enabled() -> bool:
+    return os.getenv(PROMPT_COMPACTION_ENV, "").strip().lower() in ENABLED_VALUES
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _is_table_row(line: str) -> bool:
+    return "|" in line or len(MONEY.findall(line)) >= 2
+
+
+def select_prompt_regions(
+    text: str,
+    money_patterns: Iterable[str],
+    token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET,
+) -> PromptExcerpt:
+    original_tokens = estimate_tokens(text)
+    if original_tokens <= token_budget:
+        return PromptExcerpt(text, False, original_tokens, original_tokens, "within_budget")
+    lines = text.splitlines()
+    compiled = [re.compile(pattern) for pattern in money_patterns]
+
+    keep: set[int] = set()
+    totals_found = False
+    identity_found = False
+    header_seen = 0
+    for index, raw_line in enumerate(lines):
+        line = raw_line.strip()
+        if not line:
+            continue
+        if header_seen < HEADER_LINES:
+            keep.add(index)
+            header_seen += 1
+        if any(pattern.search(line) for pattern in compiled):
+            totals_found = True
+            keep.update(range(max(0, index - 1), min(len(lines), index + 2)))
+        elif FIELD_CUE.search(line):
+            identity_found = True
+            keep.update(range(max(0, index - 1), min(len(lines), index + 2)))
+        elif TABLE_HEADER.match(line) or _is_table_row(line):
+            # Line items are data, not noise: they are always kept, whatever the budget.
+            keep.add(index)
+
+    if not totals_found or not identity_found:
+        return PromptExcerpt(text, False, original_tokens, original_tokens, "missing_cues")
+
+    excerpt_lines: list[str] = []
+    previous = -1
+    for index in sorted(keep):
+        if not lines[index].strip():
+            continue
+        if previous >= 0 and index > previous + 1:
+            excerpt_lines.append(GAP_MARKER)
+        excerpt_lines.append(lines[index])
+        previous = index
+    excerpt = "\n".join(excerpt_lines)
+    excerpt_tokens = estimate_tokens(excerpt)
+    if excerpt_tokens > original_tokens * (1 - MIN_SAVING_RATIO):
+        return PromptExcerpt(text, False, original_tokens, original_tokens, "small_saving")
+    return PromptExcerpt(excerpt, True, original_tokens, excerpt_tokens, "compacted")
@@ -89,6 +89,7 @@ class OCRResult(EngineModel):
     method: str = "none"
     status: ExtractionStatus = ExtractionStatus.FAILED
     warnings: list[str] = Field(default_factory=list)
+    pages: int = 0
 
 
 class LineItem(EngineModel):
@@ -139,12 +140,72 @@ class InvoiceExtraction(EngineModel):
         return str(value).strip().upper()
 
 
+class LLMAttemptUsage(EngineModel):
+    attempt: int
+    model: str | None = None
+    outcome: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    latency_ms: float = 0.0
+    hedged_duplicates: int = 0
+
+
+class LLMUsage(EngineModel):
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    attempts: list[LLMAttemptUsage] = Field(default_factory=list)
+    runaway: bool = False
+    escalations: list[str] = Field(default_factory=list)
+    hedged_duplicates: int = 0
+
+    def record(
+        self,
+        attempt: int,
+        outcome: str,
+        usage: dict[str, Any] | None,
+        model: str | None = None,
+        latency_ms: float = 0.0,
+    ) -> LLMAttemptUsage:
+        usage = usage or {}
+        # Abandoned hedge duplicates sent the same prompt and are billed like the answer that won.
+        duplicates = int(usage.get("hedged_duplicates") or 0)
+        copies = 1 + duplicates
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        prompt_details = usage.get("prompt_tokens_details") or {}
+        entry = LLMAttemptUsage(
+            attempt=attempt,
+            model=usage.get("model") or model,
+            outcome=outcome,
+            prompt_tokens=prompt_tokens * copies,
+            cached_tokens=int(prompt_details.get("cached_tokens") or 0) * copies,
+            completion_tokens=completion_tokens * copies,
+            total_tokens=int(usage.get("total_tokens") or prompt_tokens + completion_tokens) * copies,
+            latency_ms=round(latency_ms, 3),
+            hedged_duplicates=duplicates,
+        )
+        self.attempts.append(entry)
+        self.hedged_duplicates += duplicates
+        self.prompt_tokens += entry.prompt_tokens
+        self.cached_tokens += entry.cached_tokens
+        self.completion_tokens += entry.completion_tokens
+        self.total_tokens += entry.total_tokens
+        return entry
+
+
 class ParserResult(EngineModel):
     status: ParserStatus
     extraction: InvoiceExtraction | None = None
     raw_output: str | None = None
     attempts: int = 0
     errors: list[str] = Field(default_factory=list)
+    llm_ms: float = 0.0
+    llm_attempts: int = 0
+    llm_usage: LLMUsage | None = None
 
 
 class ValidationIssue(EngineModel):
@@ -186,6 +247,14 @@ class CorrectionRequest(EngineModel):
         return [CorrectionUpdate(field=self.field, value=self.value)]
 
 
+class BulkCorrectionItem(CorrectionRequest):
+    document_id: str
+
+
+class BulkCorrectionRequest(EngineModel):
+    items: list[BulkCorrectionItem]
+
+
 class AccountCodeSuggestion(EngineModel):
     suggested_account_code: str | None = None
     suggested_account_name: str | None = None
@@ -194,6 +263,16 @@ class AccountCodeSuggestion(EngineModel):
     status: str
 
 
+class CorrectionEvent(EngineModel):
+    sequence: int
+    updates: list[CorrectionUpdate]
+    records: list[CorrectionRecord] = Field(default_factory=list)
+    status: InvoiceStatus
+    validation: ValidationResult
+    account_code_suggestion: AccountCodeSuggestion | None = None
+    created_at: str = Field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+
 class XeroDraftBillPayload(EngineModel):
     Type: str = "ACCPAY"
     Status: str = "DRAFT"
@@ -205,6 +284,28 @@ class XeroDraftBillPayload(EngineModel):
     LineItems: list[dict[str, Any]]
 
 
+class StageTimings(EngineModel):
+    processed_at: str = Field(default_factory=lambda: datetime.now(UTC).isoformat())
+    ocr_ms: float = 0.0
+    pages: int = 0
+    llm_ms: float = 0.0
+    llm_attempts: int = 0
+    llm_tokens: int = 0
+    parse_ms: float = 0.0
+    validation_ms: float = 0.0
+    mapping_ms: float = 0.0
+    persistence_ms: float = 0.0
+    total_ms: float = 0.0
+
+
+class SlowDocument(EngineModel):
+    document_id: str
+    filename: str
+    status: InvoiceStatus
+    supplier_name: str | None = None
+    timings: StageTimings
+
+
 class InvoiceResult(EngineModel):
     document_id: str
     filename: str
@@ -214,10 +315,50 @@ class InvoiceResult(EngineModel):
     account_code_suggestion: AccountCodeSuggestion | None = None
     xero_payload: XeroDraftBillPayload | None = None
     corrections: list[CorrectionRecord] = Field(default_factory=list)
+    version: int = 0
     response: str | None = None
+    timings: StageTimings | None = None
+    llm_usage: LLMUsage | None = None
     ocr: OCRResult | None = None
 
 
+class InvoiceResponseText(EngineModel):
+    document_id: str
+    version: int
+    response: str
+
+
+class BulkCorrectionResult(EngineModel):
+    document_id: str
+    status: InvoiceStatus | None = None
+    version: int | None = None
+    issue_codes: list[str] = Field(default_factory=list)
+    error: str | None = None
+
+
+class BulkCorrectionResponse(EngineModel):
+    applied: int
+    failed: int
+    results: list[BulkCorrectionResult] = Field(default_factory=list)
+
+
+class BatchLLMUsage(EngineModel):
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    llm_attempts: int = 0
+    repair_attempts: int = 0
+    documents_with_llm: int = 0
+    tokens_by_model: dict[str, int] = Field(default_factory=dict)
+    token_budget: int | None = None
+    budget_exhausted: bool = False
+    documents_without_llm: int = 0
+    runaway_documents: list[str] = Field(default_factory=list)
+    escalated_documents: int = 0
+    hedged_duplicates: int = 0
+
+
 class BatchResult(EngineModel):
     batch_id: str
     uploaded: int
@@ -225,6 +366,7 @@ class BatchResult(EngineModel):
     needs_review: int
     failed: int
     detected_gst_total: Decimal = Decimal("0.00")
+    llm_usage: BatchLLMUsage = Field(default_factory=BatchLLMUsage)
     results: list[InvoiceResult] = Field(default_factory=list)
 
     @field_validator("detected_gst_total", mode="before")
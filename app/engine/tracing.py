@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.engine.project_env import ensure_project_env
+
+
+TRACE_FILE_ENV = "INVOICE_TRACE_FILE"
+TRACE_MAX_BYTES_ENV = "INVOICE_TRACE_MAX_BYTES"
+TRACE_BACKUPS_ENV = "INVOICE_TRACE_BACKUPS"
+DEFAULT_TRACE_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_TRACE_BACKUPS = 5
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_trace_ids: ContextVar[dict[str, str]] = ContextVar("invoice_trace_ids", default={})
+_records: queue.SimpleQueue | None = None
+_listener: QueueListener | None = None
+_configured: bool | None = None
+_configure_lock = threading.Lock()
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {**record.msg, "ts": datetime.fromtimestamp(record.msg["ts"], UTC).isoformat()}
+        return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+class _TraceListener(QueueListener):
+    # The hot path only enqueues a dict; LogRecord creation, timestamp formatting
+    # and JSON encoding all happen on the listener thread.
+    def dequeue(self, block: bool) -> logging.LogRecord | None:
+        item = self.queue.get(block)
+        if item is self._sentinel:
+            return item
+        return logging.makeLogRecord({"msg": item})
+
+
+def configure_tracing(
+    path: str | Path | None = None,
+    max_bytes: int | None = None,
+    backups: int | None = None,
+) -> bool:
+    global _listener, _records, _configured
+    with _configure_lock:
+        _stop_listener()
+        ensure_project_env()
+        path = path or os.getenv(TRACE_FILE_ENV)
+        if not path:
+            _configured = False
+            return False
+        trace_path = Path(path)
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            trace_path,
+            maxBytes=max_bytes or int(os.getenv(TRACE_MAX_BYTES_ENV) or DEFAULT_TRACE_MAX_BYTES),
+            backupCount=backups if backups is not None else int(
+                os.getenv(TRACE_BACKUPS_ENV) or DEFAULT_TRACE_BACKUPS
+            ),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(_JsonLinesFormatter())
+        _records = queue.SimpleQueue()
+        _listener = _TraceListener(_records, file_handler)
+        _listener.start()
+        _configured = True
+        return True
+
+
+def shutdown_tracing() -> None:
+    global _configured
+    with _configure_lock:
+        _stop_listener()
+        _configured = None
+
+
+def _stop_listener() -> None:
+    global _listener, _records
+    _records = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_tracing)
+
+
+def tracing_enabled() -> bool:
+    if _configured is None:
+        configure_tracing()
+    return bool(_configured)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_ids() -> dict[str, str]:
+    return dict(_trace_ids.get())
+
+
+@contextmanager
+def bind(**ids: str | None) -> Iterator[dict[str, str]]:
+    merged = {**_trace_ids.get(), **{key: value for key, value in ids.items() if value}}
+    token = _trace_ids.set(merged)
+    try:
+        yield merged
+    finally:
+        _trace_ids.reset(token)
+
+
+def _emit(record: dict[str, Any]) -> None:
+    records = _records
+    if records is not None:
+        records.put(record)
+
+
+def trace_event(name: str, **attributes: Any) -> None:
+    if not tracing_enabled():
+        return
+    _emit(
+        {
+            "ts": time.time(),
+            "event": name,
+            **_trace_ids.get(),
+            **attributes,
+        }
+    )
+
+
+class Span:
+    __slots__ = ("name", "attributes", "_started", "_started_at")
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self._started = 0.0
+        self._started_at = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        record = {
+            "ts": self._started_at,
+            "span": self.name,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "status": "error" if exc_type else "ok",
+            **_trace_ids.get(),
+            **self.attributes,
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _emit(record)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        return None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    if not tracing_enabled():
+        return _NOOP_SPAN
+    return Span(name, attributes)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from datetime import datetime
 from decimal import Decimal
-from typing import Callable
+from typing import Callable, Iterable, NamedTuple, Sequence
 
 from app.engine.confidence import with_decided_status
 from app.engine.schemas import (
@@ -20,6 +20,65 @@ GST_TOLERANCE = Decimal("0.05")
 SMALL_INVOICE_THRESHOLD = Decimal("82.50")
 BUYER_IDENTITY_THRESHOLD = Decimal("1000.00")
 
+ROUNDING_TOLERANCE_CENTS = 2
+GST_TOLERANCE_CENTS = 5
+BUYER_IDENTITY_THRESHOLD_CENTS = 100000
+
+
+class ValidationRule(NamedTuple):
+    name: str
+    fields: frozenset[str] | None
+    codes: frozenset[str]
+
+
+# Each rule lists the extraction fields it reads so corrections only re-run
+# the rules they can affect. Rules with fields=None read external state and
+# always run.
+VALIDATION_RULES: tuple[ValidationRule, ...] = (
+    ValidationRule(
+        "supplier_name",
+        frozenset({"supplier_name"}),
+        frozenset({"MISSING_SUPPLIER_NAME"}),
+    ),
+    ValidationRule(
+        "supplier_abn",
+        frozenset({"supplier_abn", "total"}),
+        frozenset({"MISSING_SUPPLIER_ABN", "INVALID_ABN"}),
+    ),
+    ValidationRule(
+        "invoice_number",
+        frozenset({"invoice_number"}),
+        frozenset({"MISSING_INVOICE_NUMBER"}),
+    ),
+    ValidationRule(
+        "invoice_date",
+        frozenset({"invoice_date"}),
+        frozenset({"MISSING_INVOICE_DATE", "INVALID_INVOICE_DATE"}),
+    ),
+    ValidationRule("total", frozenset({"total"}), frozenset({"MISSING_TOTAL"})),
+    ValidationRule("currency", frozenset({"currency"}), frozenset({"UNSUPPORTED_CURRENCY"})),
+    ValidationRule("gst", frozenset({"gst"}), frozenset({"MISSING_GST"})),
+    ValidationRule(
+        "amounts",
+        frozenset({"subtotal", "gst", "total", "line_items"}),
+        frozenset({"GST_TOTAL_MISMATCH"}),
+    ),
+    ValidationRule(
+        "thresholds",
+        frozenset({"total", "buyer_name", "buyer_abn"}),
+        frozenset({"MISSING_BUYER_FOR_OVER_1000"}),
+    ),
+    ValidationRule(
+        "line_items",
+        frozenset({"line_items", "subtotal", "gst", "total"}),
+        frozenset({"LINE_ITEMS_TOTAL_MISMATCH"}),
+    ),
+    ValidationRule("duplicate", None, frozenset({"DUPLICATE_INVOICE"})),
+)
+
+RULE_CODES = frozenset(code for rule in VALIDATION_RULES for code in rule.codes)
+ARITHMETIC_RULES = frozenset({"amounts", "line_items"})
+
 
 def normalize_abn(abn: str | None) -> str:
     if not abn:
@@ -27,11 +86,14 @@ def normalize_abn(abn: str | None) -> str:
     return re.sub(r"\D", "", abn)
 
 
+ABN_WEIGHTS = [10, 1, 3, 5, 7, 9, 11, 13, 15, 17, 19]
+
+
 def validate_abn_checksum(abn: str | None) -> bool:
     clean = normalize_abn(abn)
     if not re.fullmatch(r"\d{11}", clean):
         return False
-    weights = [10, 1, 3, 5, 7, 9, 11, 13, 15, 17, 19]
+    weights = ABN_WEIGHTS
     digits = [int(digit) for digit in clean]
     digits[0] -= 1
     return sum(weight * digit for weight, digit in zip(weights, digits)) % 89 == 0
@@ -73,6 +135,87 @@ def issue(
     )
 
 
+def _subtotal_mismatch_issue() -> ValidationIssue:
+    return issue(
+        "GST_TOTAL_MISMATCH",
+        ValidationSeverity.CRITICAL,
+        "Subtotal plus GST does not match the invoice total.",
+        "total",
+        "Check subtotal, GST, and total against the invoice.",
+    )
+
+
+def _gst_ratio_mismatch_issue() -> ValidationIssue:
+    return issue(
+        "GST_TOTAL_MISMATCH",
+        ValidationSeverity.CRITICAL,
+        "GST is not approximately one eleventh of the GST-inclusive total.",
+        "gst",
+        "Check whether the invoice mixes taxable and GST-free items.",
+    )
+
+
+def _missing_buyer_issue() -> ValidationIssue:
+    return issue(
+        "MISSING_BUYER_FOR_OVER_1000",
+        ValidationSeverity.WARNING,
+        "Invoice is AUD 1,000 or more but buyer identity was not found.",
+        "buyer_name",
+        "Enter buyer name or buyer ABN for high-value tax invoices.",
+    )
+
+
+def _line_item_amounts_missing_issue() -> ValidationIssue:
+    return issue(
+        "LINE_ITEMS_TOTAL_MISMATCH",
+        ValidationSeverity.CRITICAL,
+        "One or more line items are missing amounts.",
+        "line_items",
+        "Review line item amounts or use a fallback line item.",
+    )
+
+
+def _line_items_mismatch_issue() -> ValidationIssue:
+    return issue(
+        "LINE_ITEMS_TOTAL_MISMATCH",
+        ValidationSeverity.CRITICAL,
+        "Line item amounts do not match the invoice subtotal.",
+        "line_items",
+        "Check the extracted line item amounts.",
+    )
+
+
+def _cents(value: Decimal) -> int:
+    return int(value.scaleb(2))
+
+
+def _cents_column(values: Sequence[Decimal | None]):
+    import numpy as np
+
+    count = len(values)
+    present = np.fromiter((value is not None for value in values), dtype=bool, count=count)
+    cents = np.fromiter(
+        (0 if value is None else _cents(value) for value in values),
+        dtype=np.int64,
+        count=count,
+    )
+    return cents, present
+
+
+def _abn_checksum_column(abns: Sequence[str]) -> dict[str, bool]:
+    import numpy as np
+
+    unique = [abn for abn in dict.fromkeys(abns) if abn]
+    valid = {abn: False for abn in unique}
+    candidates = [abn for abn in unique if re.fullmatch(r"\d{11}", abn)]
+    if candidates:
+        digits = np.array([[int(digit) for digit in abn] for abn in candidates], dtype=np.int64)
+        digits[:, 0] -= 1
+        passed = (digits @ np.array(ABN_WEIGHTS, dtype=np.int64)) % 89 == 0
+        valid.update(zip(candidates, passed.tolist()))
+    return valid
+
+
 class InvoiceValidator:
     def validate(
         self,
@@ -80,7 +223,194 @@ class InvoiceValidator:
         duplicate_checker: Callable[[str, str, str], bool] | None = None,
     ) -> ValidationResult:
         issues: list[ValidationIssue] = []
+        for rule in VALIDATION_RULES:
+            self._run_rule(rule, extraction, duplicate_checker, issues)
+
+        result = with_decided_status(issues)
+        return ValidationResult(status=result.status, issues=result.issues)
+
+    def revalidate(
+        self,
+        extraction: InvoiceExtraction,
+        previous: ValidationResult,
+        changed_fields: Iterable[str],
+        duplicate_checker: Callable[[str, str, str], bool] | None = None,
+    ) -> ValidationResult:
+        if any(item.code not in RULE_CODES for item in previous.issues):
+            return self.validate(extraction, duplicate_checker)
+
+        changed = {field.split(".", 1)[0] for field in changed_fields}
+        issues: list[ValidationIssue] = []
+        for rule in VALIDATION_RULES:
+            if rule.fields is None or rule.fields & changed:
+                self._run_rule(rule, extraction, duplicate_checker, issues)
+            else:
+                issues.extend(item for item in previous.issues if item.code in rule.codes)
 
+        result = with_decided_status(issues)
+        return ValidationResult(status=result.status, issues=result.issues)
+
+    def arithmetic_issues(self, extraction: InvoiceExtraction) -> list[ValidationIssue]:
+        issues: list[ValidationIssue] = []
+        for rule in VALIDATION_RULES:
+            if rule.name in ARITHMETIC_RULES:
+                self._run_rule(rule, extraction, None, issues)
+        return issues
+
+    def validate_many(
+        self,
+        extractions: Sequence[InvoiceExtraction],
+        duplicate_checker: Callable[[str, str, str], bool] | None = None,
+    ) -> list[ValidationResult]:
+        import numpy as np
+
+        count = len(extractions)
+        if count == 0:
+            return []
+
+        total, has_total = _cents_column([extraction.total for extraction in extractions])
+        gst, has_gst = _cents_column([extraction.gst for extraction in extractions])
+        subtotal, has_subtotal = _cents_column([extraction.subtotal for extraction in extractions])
+        mixed_tax = np.fromiter(
+            (self._has_mixed_tax_treatment(extraction) for extraction in extractions),
+            dtype=bool,
+            count=count,
+        )
+        has_buyer = np.fromiter(
+            (
+                bool(extraction.buyer_name or normalize_abn(extraction.buyer_abn))
+                for extraction in extractions
+            ),
+            dtype=bool,
+            count=count,
+        )
+
+        has_amounts = has_total & has_gst
+        subtotal_mismatch = (
+            has_amounts
+            & has_subtotal
+            & (np.abs(subtotal + gst - total) > ROUNDING_TOLERANCE_CENTS)
+        )
+        # Decimal quantize rounds half-even, but total / 11 can never land on a half cent.
+        quotient, remainder = np.divmod(total, 11)
+        expected_gst = quotient + (2 * remainder > 11)
+        gst_ratio_mismatch = (
+            has_amounts
+            & (gst > 0)
+            & ~mixed_tax
+            & (np.abs(expected_gst - gst) > GST_TOLERANCE_CENTS)
+        )
+        missing_buyer = has_total & (total >= BUYER_IDENTITY_THRESHOLD_CENTS) & ~has_buyer
+
+        item_counts = np.fromiter(
+            (len(extraction.line_items) for extraction in extractions),
+            dtype=np.int64,
+            count=count,
+        )
+        item_amounts, has_item_amount = _cents_column(
+            [item.amount for extraction in extractions for item in extraction.line_items]
+        )
+        owners = np.repeat(np.arange(count), item_counts)
+        line_totals = np.zeros(count, dtype=np.int64)
+        np.add.at(line_totals, owners, item_amounts)
+        missing_item_amounts = np.bincount(
+            owners, weights=~has_item_amount, minlength=count
+        ) > 0
+        has_items = item_counts > 0
+        target = np.where(has_subtotal, subtotal, total - gst)
+        has_target = has_subtotal | has_amounts
+        line_amounts_missing = has_items & missing_item_amounts
+        line_items_mismatch = (
+            has_items
+            & ~missing_item_amounts
+            & has_target
+            & (np.abs(line_totals - target) > ROUNDING_TOLERANCE_CENTS)
+        )
+
+        supplier_abns = [normalize_abn(extraction.supplier_abn) for extraction in extractions]
+        abn_checksums = _abn_checksum_column(supplier_abns)
+        invoice_dates = {
+            value: parse_invoice_date(value)
+            for value in {extraction.invoice_date for extraction in extractions}
+            if value
+        }
+
+        flags = zip(
+            subtotal_mismatch.tolist(),
+            gst_ratio_mismatch.tolist(),
+            missing_buyer.tolist(),
+            line_amounts_missing.tolist(),
+            line_items_mismatch.tolist(),
+        )
+        results: list[ValidationResult] = []
+        for extraction, row in zip(extractions, flags):
+            issues: list[ValidationIssue] = []
+            self._validate_fields(
+                extraction,
+                issues,
+                abn_checksum=abn_checksums.__getitem__,
+                date_parser=invoice_dates.__getitem__,
+            )
+            if row[0]:
+                issues.append(_subtotal_mismatch_issue())
+            if row[1]:
+                issues.append(_gst_ratio_mismatch_issue())
+            if row[2]:
+                issues.append(_missing_buyer_issue())
+            if row[3]:
+                issues.append(_line_item_amounts_missing_issue())
+            if row[4]:
+                issues.append(_line_items_mismatch_issue())
+            self._validate_duplicate(extraction, duplicate_checker, issues)
+            results.append(with_decided_status(issues))
+        return results
+
+    def failure_result(self, code: str, message: str, field: str | None = None) -> ValidationResult:
+        return ValidationResult(
+            status=InvoiceStatus.FAILED,
+            issues=[
+                issue(
+                    code,
+                    ValidationSeverity.CRITICAL,
+                    message,
+                    field,
+                    "Re-upload a readable PDF or correct the source document.",
+                )
+            ],
+        )
+
+    def _run_rule(
+        self,
+        rule: ValidationRule,
+        extraction: InvoiceExtraction,
+        duplicate_checker: Callable[[str, str, str], bool] | None,
+        issues: list[ValidationIssue],
+    ) -> None:
+        if rule.name == "duplicate":
+            self._validate_duplicate(extraction, duplicate_checker, issues)
+            return
+        getattr(self, f"_validate_{rule.name}")(extraction, issues)
+
+    def _validate_fields(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+        abn_checksum: Callable[[str], bool] = validate_abn_checksum,
+        date_parser: Callable[[str], datetime | None] = parse_invoice_date,
+    ) -> None:
+        self._validate_supplier_name(extraction, issues)
+        self._validate_supplier_abn(extraction, issues, abn_checksum)
+        self._validate_invoice_number(extraction, issues)
+        self._validate_invoice_date(extraction, issues, date_parser)
+        self._validate_total(extraction, issues)
+        self._validate_currency(extraction, issues)
+        self._validate_gst(extraction, issues)
+
+    def _validate_supplier_name(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+    ) -> None:
         if not extraction.supplier_name:
             issues.append(
                 issue(
@@ -92,6 +422,12 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_supplier_abn(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+        abn_checksum: Callable[[str], bool] = validate_abn_checksum,
+    ) -> None:
         clean_abn = normalize_abn(extraction.supplier_abn)
         is_small_invoice = (
             extraction.total is not None and extraction.total <= SMALL_INVOICE_THRESHOLD
@@ -107,7 +443,7 @@ class InvoiceValidator:
                         "Enter the supplier ABN shown on the invoice.",
                     )
                 )
-        elif not validate_abn_checksum(clean_abn):
+        elif not abn_checksum(clean_abn):
             issues.append(
                 issue(
                     "INVALID_ABN",
@@ -118,6 +454,11 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_invoice_number(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+    ) -> None:
         if not extraction.invoice_number:
             issues.append(
                 issue(
@@ -129,6 +470,12 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_invoice_date(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+        date_parser: Callable[[str], datetime | None] = parse_invoice_date,
+    ) -> None:
         if not extraction.invoice_date:
             issues.append(
                 issue(
@@ -139,7 +486,7 @@ class InvoiceValidator:
                     "Enter the invoice date shown on the invoice.",
                 )
             )
-        elif parse_invoice_date(extraction.invoice_date) is None:
+        elif date_parser(extraction.invoice_date) is None:
             issues.append(
                 issue(
                     "INVALID_INVOICE_DATE",
@@ -150,6 +497,11 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_total(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+    ) -> None:
         if extraction.total is None:
             issues.append(
                 issue(
@@ -161,6 +513,11 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_currency(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+    ) -> None:
         if extraction.currency != "AUD":
             issues.append(
                 issue(
@@ -172,6 +529,11 @@ class InvoiceValidator:
                 )
             )
 
+    def _validate_gst(
+        self,
+        extraction: InvoiceExtraction,
+        issues: list[ValidationIssue],
+    ) -> None:
         if extraction.gst is None:
             issues.append(
                 issue(
@@ -183,28 +545,6 @@ class InvoiceValidator:
                 )
             )
 
-        self._validate_amounts(extraction, issues)
-        self._validate_thresholds(extraction, issues)
-        self._validate_line_items(extraction, issues)
-        self._validate_duplicate(extraction, duplicate_checker, issues)
-
-        result = with_decided_status(issues)
-        return ValidationResult(status=result.status, issues=result.issues)
-
-    def failure_result(self, code: str, message: str, field: str | None = None) -> ValidationResult:
-        return ValidationResult(
-            status=InvoiceStatus.FAILED,
-            issues=[
-                issue(
-                    code,
-                    ValidationSeverity.CRITICAL,
-                    message,
-                    field,
-                    "Re-upload a readable PDF or correct the source document.",
-                )
-            ],
-        )
-
     def _validate_amounts(
         self,
         extraction: InvoiceExtraction,
@@ -217,28 +557,12 @@ class InvoiceValidator:
         if subtotal is not None:
             expected_total = subtotal + extraction.gst
             if abs(expected_total - extraction.total) > ROUNDING_TOLERANCE:
-                issues.append(
-                    issue(
-                        "GST_TOTAL_MISMATCH",
-                        ValidationSeverity.CRITICAL,
-                        "Subtotal plus GST does not match the invoice total.",
-                        "total",
-                        "Check subtotal, GST, and total against the invoice.",
-                    )
-                )
+                issues.append(_subtotal_mismatch_issue())
 
         if extraction.gst > Decimal("0.00") and not self._has_mixed_tax_treatment(extraction):
             expected_gst = (extraction.total / Decimal("11")).quantize(Decimal("0.01"))
             if abs(expected_gst - extraction.gst) > GST_TOLERANCE:
-                issues.append(
-                    issue(
-                        "GST_TOTAL_MISMATCH",
-                        ValidationSeverity.CRITICAL,
-                        "GST is not approximately one eleventh of the GST-inclusive total.",
-                        "gst",
-                        "Check whether the invoice mixes taxable and GST-free items.",
-                    )
-                )
+                issues.append(_gst_ratio_mismatch_issue())
 
     def _has_mixed_tax_treatment(self, extraction: InvoiceExtraction) -> bool:
         treatments = {
@@ -258,15 +582,7 @@ class InvoiceValidator:
         if extraction.total >= BUYER_IDENTITY_THRESHOLD and not (
             extraction.buyer_name or normalize_abn(extraction.buyer_abn)
         ):
-            issues.append(
-                issue(
-                    "MISSING_BUYER_FOR_OVER_1000",
-                    ValidationSeverity.WARNING,
-                    "Invoice is AUD 1,000 or more but buyer identity was not found.",
-                    "buyer_name",
-                    "Enter buyer name or buyer ABN for high-value tax invoices.",
-                )
-            )
+            issues.append(_missing_buyer_issue())
 
         if extraction.total <= SMALL_INVOICE_THRESHOLD:
             return
@@ -281,15 +597,7 @@ class InvoiceValidator:
 
         amounts = [item.amount for item in extraction.line_items if item.amount is not None]
         if len(amounts) != len(extraction.line_items):
-            issues.append(
-                issue(
-                    "LINE_ITEMS_TOTAL_MISMATCH",
-                    ValidationSeverity.CRITICAL,
-                    "One or more line items are missing amounts.",
-                    "line_items",
-                    "Review line item amounts or use a fallback line item.",
-                )
-            )
+            issues.append(_line_item_amounts_missing_issue())
             return
 
         target = extraction.subtotal
@@ -300,15 +608,7 @@ class InvoiceValidator:
 
         line_total = sum(amounts, Decimal("0.00"))
         if abs(line_total - target) > ROUNDING_TOLERANCE:
-            issues.append(
-                issue(
-                    "LINE_ITEMS_TOTAL_MISMATCH",
-                    ValidationSeverity.CRITICAL,
-                    "Line item amounts do not match the invoice subtotal.",
-                    "line_items",
-                    "Check the extracted line item amounts.",
-                )
-            )
+            issues.append(_line_items_mismatch_issue())
 
     def _validate_duplicate(
         self,
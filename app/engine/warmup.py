@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from app.engine.processor import InvoiceProcessor
+from app.engine.project_env import ensure_project_env
+
+
+WARMUP_ENV = "INVOICE_WARMUP"
+ENABLED_VALUES = {"1", "true", "yes", "on"}
+# A failed warm-up is retried from /ready after this delay, doubling per consecutive failure.
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
+
+SAMPLE_INVOICE_TEXT = """TAX INVOICE
+Warmup Supplies Pty Ltd
+ABN 51 824 753 556
+Invoice Number: WARM-001
+Invoice Date: 01/07/2026
+Due Date: 15/07/2026
+Bill To: Warmup Buyer Pty Ltd
+Description Qty Unit Price Amount
+Paper towels 1 $100.00 $100.00
+Subtotal $100.00
+GST $10.00
+Total $110.00
+"""
+
+
+def warmup_enabled() -> bool:
+    ensure_project_env()
+    return os.getenv(WARMUP_ENV, "").strip().lower() in ENABLED_VALUES
+
+
+class WarmupState:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.status = "disabled"
+        self.steps_ms: dict[str, float] = {}
+        self.warnings: list[str] = []
+        self.error: str | None = None
+        self.failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.status in {"disabled", "ready"}
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = "warming"
+            self.steps_ms = {}
+            self.warnings = []
+            self.error = None
+
+    def record(self, step: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.steps_ms[step] = round(elapsed_ms, 3)
+
+    def warn(self, message: str) -> None:
+        with self._lock:
+            self.warnings.append(message)
+
+    def finish(self, error: str | None = None) -> None:
+        with self._lock:
+            self.status = "failed" if error else "ready"
+            self.error = error
+            self.failures = self.failures + 1 if error else 0
+            if error:
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (self.failures - 1))
+                self._retry_at = self._clock() + delay
+
+    def claim_retry(self) -> bool:
+        # Only one caller wins the retry; the rest keep reporting "warming" until it finishes.
+        with self._lock:
+            if self.status != "failed" or self._clock() < self._retry_at:
+                return False
+            self.status = "warming"
+            return True
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "steps_ms": dict(self.steps_ms),
+                "warnings": list(self.warnings),
+                "error": self.error,
+                "failures": self.failures,
+                "retry_in_seconds": round(max(0.0, self._retry_at - self._clock()), 3)
+                if self.status == "failed"
+                else None,
+            }
+
+
+WARMUP_STATE = WarmupState()
+
+
+def _timed(state: WarmupState, step: str, action: Callable[[], Any]) -> Any:
+    started = time.perf_counter()
+    value = action()
+    state.record(step, (time.perf_counter() - started) * 1000)
+    return value
+
+
+def _prime_ocr_imports(state: WarmupState) -> None:
+    for module in ("PyPDF2", "pdf2image", "pytesseract"):
+        try:
+            __import__(module)
+        except Exception as exc:
+            state.warn(f"{module} unavailable: {exc}")
+
+
+def _prime_tesseract(state: WarmupState) -> None:
+    try:
+        import pytesseract
+        from PIL import Image, ImageDraw
+    except Exception as exc:
+        state.warn(f"Tesseract warm-up skipped: {exc}")
+        return
+
+    image = Image.new("L", (160, 40), color=255)
+    ImageDraw.Draw(image).text((8, 12), "GST 10.00", fill=0)
+    try:
+        pytesseract.image_to_string(image)
+    except Exception as exc:
+        state.warn(f"Tesseract warm-up failed: {exc}")
+
+
+def run_warmup(
+    processor_factory: Callable[[], InvoiceProcessor],
+    state: WarmupState = WARMUP_STATE,
+) -> WarmupState:
+    state.start()
+    try:
+        processor = _timed(state, "processor", processor_factory)
+        _timed(state, "ocr_imports", lambda: _prime_ocr_imports(state))
+        _timed(state, "tesseract", lambda: _prime_tesseract(state))
+        parsed = _timed(
+            state,
+            "parser",
+            lambda: processor.parser._parse_deterministically(SAMPLE_INVOICE_TEXT, "doc_warmup"),
+        )
+        extraction = parsed.extraction
+        _timed(state, "validator", lambda: processor.validator.validate(extraction))
+        _timed(state, "mapper", lambda: processor.mapper.suggest(extraction))
+        _timed(state, "repository", lambda: processor.repository.load_invoice_result("doc_warmup"))
+    except Exception as exc:
+        state.finish(error=f"{type(exc).__name__}: {exc}")
+        return state
+    state.finish()
+    return state
+
+
+def start_warmup(
+    processor_factory: Callable[[], InvoiceProcessor],
+    state: WarmupState = WARMUP_STATE,
+) -> threading.Thread:
+    state.start()
+    thread = threading.Thread(
+        target=run_warmup,
+        args=(processor_factory, state),
+        name="invoice-warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def retry_warmup_if_due(
+    processor_factory: Callable[[], InvoiceProcessor],
+    state: WarmupState = WARMUP_STATE,
+) -> threading.Thread | None:
+    if not state.claim_retry():
+        return None
+    return start_warmup(processor_factory, state)
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
+from app.api.dependencies import get_processor
+from app.api.middleware import RequestCorrelationMiddleware
 from app.api.routes import router
+from app.engine.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from app.engine.project_env import ensure_project_env
+from app.engine.warmup import WARMUP_STATE, retry_warmup_if_due, start_warmup, warmup_enabled
+
 
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    ensure_project_env()
+    if warmup_enabled():
+        start_warmup(get_processor)
+    yield
 
-app = FastAPI(title="Invoice Automation POC")
+
+app = FastAPI(title="Invoice Automation POC", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +32,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestCorrelationMiddleware)
 
 app.include_router(router)
 
@@ -24,4 +42,18 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    retry_warmup_if_due(get_processor)
+    return JSONResponse(
+        status_code=200 if WARMUP_STATE.ready else 503,
+        content=WARMUP_STATE.snapshot(),
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 handler = app
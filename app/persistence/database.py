@@ -20,6 +20,21 @@ def connect(db_path: str | Path = DEFAULT_DB_PATH) -> sqlite3.Connection:
 def initialize_database(connection: sqlite3.Connection) -> None:
     connection.execute(models.DOCUMENTS_TABLE)
     connection.execute(models.INVOICE_RESULTS_TABLE)
-    connection.execute(models.CORRECTIONS_TABLE)
+    connection.execute(models.CORRECTION_EVENTS_TABLE)
     connection.execute(models.BATCHES_TABLE)
+    _add_missing_columns(connection, "invoice_results", models.INVOICE_RESULTS_MIGRATIONS)
+    connection.execute(models.INVOICE_KEY_INDEX)
+    connection.execute(models.INVOICE_TIMING_INDEX)
+    connection.execute(models.INVOICE_PROCESSED_AT_INDEX)
     connection.commit()
+
+
+def _add_missing_columns(
+    connection: sqlite3.Connection,
+    table: str,
+    columns: dict[str, str],
+) -> None:
+    existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+    for column, definition in columns.items():
+        if column not in existing:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
@@ -23,19 +23,49 @@ CREATE TABLE IF NOT EXISTS invoice_results (
     response_text TEXT,
     ocr_json TEXT,
     result_json TEXT NOT NULL,
-    updated_at TEXT NOT NULL
+    updated_at TEXT NOT NULL,
+    snapshot_version INTEGER NOT NULL DEFAULT 0,
+    supplier_abn_key TEXT,
+    invoice_number_key TEXT,
+    supplier_name TEXT,
+    processed_at TEXT,
+    total_ms REAL,
+    timings_json TEXT
 )
 """
 
-CORRECTIONS_TABLE = """
-CREATE TABLE IF NOT EXISTS corrections (
-    correction_id TEXT PRIMARY KEY,
+INVOICE_RESULTS_MIGRATIONS = {
+    "snapshot_version": "INTEGER NOT NULL DEFAULT 0",
+    "supplier_abn_key": "TEXT",
+    "invoice_number_key": "TEXT",
+    "supplier_name": "TEXT",
+    "processed_at": "TEXT",
+    "total_ms": "REAL",
+    "timings_json": "TEXT",
+}
+
+INVOICE_KEY_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_invoice_results_invoice_key
+ON invoice_results (supplier_abn_key, invoice_number_key)
+"""
+
+INVOICE_TIMING_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_invoice_results_total_ms
+ON invoice_results (total_ms)
+"""
+
+INVOICE_PROCESSED_AT_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_invoice_results_processed_at
+ON invoice_results (processed_at)
+"""
+
+CORRECTION_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS correction_events (
     document_id TEXT NOT NULL,
-    field TEXT NOT NULL,
-    original_value TEXT,
-    corrected_value TEXT,
-    source TEXT NOT NULL,
-    created_at TEXT NOT NULL
+    sequence INTEGER NOT NULL,
+    event_json TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (document_id, sequence)
 )
 """
 
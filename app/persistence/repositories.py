@@ -2,41 +2,95 @@ from __future__ import annotations
 
 import json
 import sqlite3
-import uuid
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, ContextManager, Iterator
 
+from app.engine.correction_events import replay_correction_events
+from app.engine.metrics import REPOSITORY_SECONDS
 from app.engine.schemas import (
     BatchResult,
-    CorrectionRecord,
+    CorrectionEvent,
     DocumentMetadata,
+    InvoiceExtraction,
     InvoiceResult,
     OCRResult,
+    SlowDocument,
+    StageTimings,
 )
 from app.engine.validator import normalize_abn
 from app.persistence.database import DEFAULT_DB_PATH, connect, initialize_database
 
 
-def _json_value(value: Any) -> str | None:
-    if value is None:
-        return None
-    return json.dumps(value, default=str)
+DEFAULT_SNAPSHOT_INTERVAL = 20
+
+
+def _invoice_key(extraction: InvoiceExtraction | None) -> tuple[str, str]:
+    if extraction is None:
+        return "", ""
+    return normalize_abn(extraction.supplier_abn), (extraction.invoice_number or "").lower()
+
+
+def _supplier_name(extraction: InvoiceExtraction | None) -> str:
+    return (extraction.supplier_name if extraction else None) or ""
 
 
 class InvoiceRepository:
-    def __init__(self, db_path: str | Path = DEFAULT_DB_PATH):
+    def __init__(
+        self,
+        db_path: str | Path = DEFAULT_DB_PATH,
+        snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
+    ):
         self.db_path = Path(db_path)
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        self.snapshot_interval = max(1, snapshot_interval)
+        self._local = threading.local()
+        self._schema_ready = False
+        with self._session("backfill_invoice_keys") as connection:
+            self._backfill_invoice_keys(connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if getattr(self._local, "connection", None) is not None:
+            yield
+            return
+        with self._session("transaction") as connection:
+            self._local.connection = connection
+            try:
+                yield
+            finally:
+                self._local.connection = None
+
+    @contextmanager
+    def _session(self, operation: str) -> Iterator[sqlite3.Connection]:
+        active = getattr(self._local, "connection", None)
+        if active is not None:
+            with REPOSITORY_SECONDS.time(operation=operation):
+                yield active
+            return
+        started = time.perf_counter()
+        connection = connect(self.db_path)
+        try:
+            if not self._schema_ready:
+                initialize_database(connection)
+                self._schema_ready = True
+            yield connection
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+            REPOSITORY_SECONDS.observe(time.perf_counter() - started, operation=operation)
 
     def save_document(
         self,
         document: DocumentMetadata,
         ocr: OCRResult | None = None,
     ) -> None:
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        with self._session("save_document") as connection:
             connection.execute(
                 """
                 INSERT OR REPLACE INTO documents (
@@ -55,20 +109,21 @@ class InvoiceRepository:
                     ocr.method if ocr else None,
                 ),
             )
-            connection.commit()
 
     def save_invoice_result(self, result: InvoiceResult) -> None:
         now = datetime.now(UTC).isoformat()
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        supplier_abn_key, invoice_number_key = _invoice_key(result.extraction)
+        with self._session("save_invoice_result") as connection:
             connection.execute(
                 """
                 INSERT OR REPLACE INTO invoice_results (
                     document_id, filename, status, extraction_json, validation_json,
                     account_mapping_json, xero_payload_json, corrections_json,
-                    response_text, ocr_json, result_json, updated_at
+                    response_text, ocr_json, result_json, updated_at,
+                    snapshot_version, supplier_abn_key, invoice_number_key,
+                    supplier_name, processed_at, total_ms, timings_json
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     result.document_id,
@@ -84,52 +139,166 @@ class InvoiceRepository:
                         [record.model_dump(mode="json") for record in result.corrections],
                         default=str,
                     ),
-                    result.response,
+                    None,
                     result.ocr.model_dump_json() if result.ocr else None,
-                    result.model_dump_json(),
+                    result.model_dump_json(exclude={"response", "timings"}),
                     now,
+                    result.version,
+                    supplier_abn_key,
+                    invoice_number_key,
+                    _supplier_name(result.extraction),
+                    result.timings.processed_at if result.timings else None,
+                    result.timings.total_ms if result.timings else None,
+                    result.timings.model_dump_json() if result.timings else None,
                 ),
             )
-            connection.commit()
 
     def load_invoice_result(self, document_id: str) -> InvoiceResult | None:
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        with self._session("load_invoice_result") as connection:
             row = connection.execute(
-                "SELECT result_json FROM invoice_results WHERE document_id = ?",
+                """
+                SELECT result_json, snapshot_version, timings_json FROM invoice_results
+                WHERE document_id = ?
+                """,
                 (document_id,),
             ).fetchone()
-        if row is None:
-            return None
-        return InvoiceResult.model_validate_json(row["result_json"])
+            if row is None:
+                return None
+            events = self._load_events(connection, document_id, row["snapshot_version"])
+        snapshot = InvoiceResult.model_validate_json(row["result_json"])
+        if row["timings_json"]:
+            snapshot.timings = StageTimings.model_validate_json(row["timings_json"])
+        return replay_correction_events(snapshot, events)
 
-    def save_correction(self, document_id: str, correction: CorrectionRecord) -> None:
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+    def append_correction_event(
+        self,
+        document_id: str,
+        event: CorrectionEvent,
+        result: InvoiceResult,
+    ) -> None:
+        now = datetime.now(UTC).isoformat()
+        supplier_abn_key, invoice_number_key = _invoice_key(result.extraction)
+        with self._session("append_correction_event") as connection:
             connection.execute(
                 """
-                INSERT INTO corrections (
-                    correction_id, document_id, field, original_value,
-                    corrected_value, source, created_at
+                INSERT INTO correction_events (document_id, sequence, event_json, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (document_id, event.sequence, event.model_dump_json(), event.created_at),
+            )
+            row = connection.execute(
+                "SELECT snapshot_version FROM invoice_results WHERE document_id = ?",
+                (document_id,),
+            ).fetchone()
+            snapshot_due = row is None or event.sequence - row["snapshot_version"] >= self.snapshot_interval
+            if not snapshot_due:
+                # The JSON columns stay the snapshot; only the small columns read without replay move per event.
+                connection.execute(
+                    """
+                    UPDATE invoice_results
+                    SET status = ?, supplier_abn_key = ?, invoice_number_key = ?, supplier_name = ?,
+                        updated_at = ?
+                    WHERE document_id = ?
+                    """,
+                    (
+                        result.status.value,
+                        supplier_abn_key,
+                        invoice_number_key,
+                        _supplier_name(result.extraction),
+                        now,
+                        document_id,
+                    ),
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+        if snapshot_due:
+            self.save_invoice_result(result)
+
+    def compact_invoice_result(self, document_id: str) -> InvoiceResult | None:
+        result = self.load_invoice_result(document_id)
+        if result is not None:
+            self.save_invoice_result(result)
+        return result
+
+    def slowest_documents(
+        self,
+        limit: int = 10,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[SlowDocument]:
+        clauses = ["total_ms IS NOT NULL"]
+        parameters: list[Any] = []
+        if since:
+            clauses.append("processed_at >= ?")
+            parameters.append(since)
+        if until:
+            clauses.append("processed_at < ?")
+            parameters.append(until)
+        with self._session("slowest_documents") as connection:
+            rows = connection.execute(
+                f"""
+                SELECT document_id, filename, status, supplier_name, timings_json
+                FROM invoice_results
+                WHERE {" AND ".join(clauses)}
+                ORDER BY total_ms DESC
+                LIMIT ?
+                """,
+                (*parameters, limit),
+            ).fetchall()
+        return [
+            SlowDocument(
+                document_id=row["document_id"],
+                filename=row["filename"],
+                status=row["status"],
+                supplier_name=row["supplier_name"] or None,
+                timings=StageTimings.model_validate_json(row["timings_json"]),
+            )
+            for row in rows
+        ]
+
+    def load_correction_events(self, document_id: str) -> list[CorrectionEvent]:
+        with self._session("load_correction_events") as connection:
+            return self._load_events(connection, document_id, 0)
+
+    def _load_events(
+        self,
+        connection: sqlite3.Connection,
+        document_id: str,
+        after_sequence: int,
+    ) -> list[CorrectionEvent]:
+        rows = connection.execute(
+            """
+            SELECT event_json FROM correction_events
+            WHERE document_id = ? AND sequence > ?
+            ORDER BY sequence
+            """,
+            (document_id, after_sequence),
+        ).fetchall()
+        return [CorrectionEvent.model_validate_json(row["event_json"]) for row in rows]
+
+    def _backfill_invoice_keys(self, connection: sqlite3.Connection) -> None:
+        rows = connection.execute(
+            """
+            SELECT document_id, extraction_json FROM invoice_results
+            WHERE supplier_abn_key IS NULL OR supplier_name IS NULL
+            """
+        ).fetchall()
+        for row in rows:
+            extraction = json.loads(row["extraction_json"] or "{}")
+            connection.execute(
+                """
+                UPDATE invoice_results SET supplier_abn_key = ?, invoice_number_key = ?, supplier_name = ?
+                WHERE document_id = ?
                 """,
                 (
-                    f"corr_{uuid.uuid4().hex[:12]}",
-                    document_id,
-                    correction.field,
-                    _json_value(correction.original_value),
-                    _json_value(correction.corrected_value),
-                    correction.source,
-                    correction.created_at,
+                    normalize_abn(extraction.get("supplier_abn")),
+                    (extraction.get("invoice_number") or "").lower(),
+                    extraction.get("supplier_name") or "",
+                    row["document_id"],
                 ),
             )
-            connection.commit()
 
     def save_batch(self, batch: BatchResult) -> None:
         now = datetime.now(UTC).isoformat()
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        with self._session("save_batch") as connection:
             connection.execute(
                 """
                 INSERT OR REPLACE INTO batches (
@@ -153,11 +322,9 @@ class InvoiceRepository:
                     now,
                 ),
             )
-            connection.commit()
 
     def load_batch(self, batch_id: str) -> BatchResult | None:
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
+        with self._session("load_batch") as connection:
             row = connection.execute(
                 "SELECT batch_json FROM batches WHERE batch_id = ?",
                 (batch_id,),
@@ -175,31 +342,23 @@ class InvoiceRepository:
         clean_abn = normalize_abn(supplier_abn)
         if not clean_abn or not invoice_number:
             return False
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
-            rows = connection.execute("SELECT result_json FROM invoice_results").fetchall()
-        for row in rows:
-            result = InvoiceResult.model_validate_json(row["result_json"])
-            if exclude_document_id and result.document_id == exclude_document_id:
-                continue
-            extraction = result.extraction
-            if extraction is None:
-                continue
-            if (
-                normalize_abn(extraction.supplier_abn) == clean_abn
-                and (extraction.invoice_number or "").lower() == invoice_number.lower()
-            ):
-                return True
-        return False
+        with self._session("invoice_key_exists") as connection:
+            row = connection.execute(
+                """
+                SELECT 1 FROM invoice_results
+                WHERE supplier_abn_key = ? AND invoice_number_key = ? AND document_id != ?
+                LIMIT 1
+                """,
+                (clean_abn, invoice_number.lower(), exclude_document_id or ""),
+            ).fetchone()
+        return row is not None
 
     def reset_demo_data(self) -> None:
-        with connect(self.db_path) as connection:
-            initialize_database(connection)
-            connection.execute("DELETE FROM corrections")
+        with self._session("reset_demo_data") as connection:
+            connection.execute("DELETE FROM correction_events")
             connection.execute("DELETE FROM invoice_results")
             connection.execute("DELETE FROM documents")
             connection.execute("DELETE FROM batches")
-            connection.commit()
 
 
 class InMemoryInvoiceRepository:
@@ -207,7 +366,10 @@ class InMemoryInvoiceRepository:
         self.documents: dict[str, DocumentMetadata] = {}
         self.results: dict[str, InvoiceResult] = {}
         self.batches: dict[str, BatchResult] = {}
-        self.corrections: list[tuple[str, CorrectionRecord]] = []
+        self.correction_events: dict[str, list[CorrectionEvent]] = {}
+
+    def transaction(self) -> ContextManager[None]:
+        return nullcontext()
 
     def save_document(self, document: DocumentMetadata, ocr: OCRResult | None = None) -> None:
         self.documents[document.document_id] = document
@@ -218,8 +380,45 @@ class InMemoryInvoiceRepository:
     def load_invoice_result(self, document_id: str) -> InvoiceResult | None:
         return self.results.get(document_id)
 
-    def save_correction(self, document_id: str, correction: CorrectionRecord) -> None:
-        self.corrections.append((document_id, correction))
+    def append_correction_event(
+        self,
+        document_id: str,
+        event: CorrectionEvent,
+        result: InvoiceResult,
+    ) -> None:
+        self.correction_events.setdefault(document_id, []).append(event)
+        self.results[document_id] = result
+
+    def compact_invoice_result(self, document_id: str) -> InvoiceResult | None:
+        return self.results.get(document_id)
+
+    def slowest_documents(
+        self,
+        limit: int = 10,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[SlowDocument]:
+        timed = [
+            result
+            for result in self.results.values()
+            if result.timings is not None
+            and (not since or result.timings.processed_at >= since)
+            and (not until or result.timings.processed_at < until)
+        ]
+        timed.sort(key=lambda result: result.timings.total_ms, reverse=True)
+        return [
+            SlowDocument(
+                document_id=result.document_id,
+                filename=result.filename,
+                status=result.status,
+                supplier_name=result.extraction.supplier_name if result.extraction else None,
+                timings=result.timings,
+            )
+            for result in timed[:limit]
+        ]
+
+    def load_correction_events(self, document_id: str) -> list[CorrectionEvent]:
+        return list(self.correction_events.get(document_id, []))
 
     def save_batch(self, batch: BatchResult) -> None:
         self.batches[batch.batch_id] = batch
@@ -251,4 +450,4 @@ class InMemoryInvoiceRepository:
         self.documents.clear()
         self.results.clear()
         self.batches.clear()
-        self.corrections.clear()
+        self.correction_events.clear()
@@ -5,7 +5,8 @@ from pathlib import Path
 
 import pytest
 
-from app.engine.parser import InvoiceParser
+from app.engine.circuit_breaker import llm_circuit_breaker
+from app.engine.parser import InvoiceParser, ensure_project_env
 from app.engine.processor import InvoiceProcessor
 from app.persistence.repositories import InMemoryInvoiceRepository
 
@@ -14,11 +15,22 @@ FIXTURE_ROOT = Path(__file__).parent / "fixtures"
 OCR_TEXT_ROOT = FIXTURE_ROOT / "ocr_text"
 EXPECTED_PATH = FIXTURE_ROOT / "expected" / "invoice_cases.json"
 
+# Load .env before tests adjust GROQ_API_KEY so a later first parser cannot override them.
+ensure_project_env()
+
 
 def load_text(name: str) -> str:
     return (OCR_TEXT_ROOT / f"{name}.txt").read_text(encoding="utf-8")
 
 
+@pytest.fixture(autouse=True)
+def reset_llm_circuit():
+    # The breaker is process-wide; simulated outages in one test must not short-circuit the next.
+    llm_circuit_breaker().reset()
+    yield
+    llm_circuit_breaker().reset()
+
+
 @pytest.fixture
 def expected_cases() -> dict:
     return json.loads(EXPECTED_PATH.read_text(encoding="utf-8"))
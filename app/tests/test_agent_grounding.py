@@ -3,9 +3,9 @@ from __future__ import annotations
 
 def test_responder_mentions_engine_status_and_issues_without_overriding(processor, text_loader):
     result = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"))
-    response = result.response
+    response = processor.responder.response_for(result)
 
-    assert response is not None
+    assert result.response is None
     assert "Status: needs_review." in response
     assert "INVALID_ABN" in response
     assert "12 345 678 901" in response
@@ -18,8 +18,29 @@ def test_responder_does_not_invent_missing_buyer_identity(processor, text_loader
         "over_1000_missing_buyer.pdf",
         text_loader("over_1000_missing_buyer"),
     )
-    response = result.response or ""
+    response = processor.responder.response_for(result)
 
     assert "MISSING_BUYER_FOR_OVER_1000" in response
     assert "Luna Cafe Pty Ltd" not in response
     assert result.status.value == "needs_review"
+
+
+def test_responder_caches_rendered_text_by_result_version(processor, text_loader, monkeypatch):
+    result = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"))
+    calls: list[int] = []
+    original_render = processor.responder.render
+
+    def counting_render(item):
+        calls.append(item.version)
+        return original_render(item)
+
+    monkeypatch.setattr(processor.responder, "render", counting_render)
+    first = processor.responder.response_for(result)
+    assert processor.responder.response_for(result) == first
+    corrected = result.model_copy(update={"version": 1})
+    processor.responder.response_for(corrected)
+    reprocessed = processor.process_text("invalid_abn.pdf", text_loader("clean_under_1000"))
+    reprocessed = reprocessed.model_copy(update={"document_id": result.document_id})
+
+    assert processor.responder.response_for(reprocessed) != first
+    assert calls == [0, 1, 0]
@@ -9,6 +9,7 @@ from app.api.dependencies import (
     get_correction_service,
     get_processor,
     get_repository,
+    get_responder,
 )
 from app.engine.batch import BatchProcessor
 from app.engine.corrections import CorrectionService
@@ -36,6 +37,7 @@ def _client():
     app.dependency_overrides[get_processor] = lambda: processor
     app.dependency_overrides[get_batch_processor] = lambda: BatchProcessor(processor)
     app.dependency_overrides[get_correction_service] = lambda: CorrectionService(processor)
+    app.dependency_overrides[get_responder] = lambda: processor.responder
     return TestClient(app), repository
 
 
@@ -124,3 +126,57 @@ def test_demo_reset_endpoint_clears_duplicate_state_without_dev_gate():
         assert after_reset["status"] == "ready"
     finally:
         app.dependency_overrides.clear()
+
+
+def test_bulk_corrections_endpoint_returns_compact_per_document_results():
+    client, _ = _client()
+    try:
+        with _pdf("invalid_abn") as review_file:
+            review = client.post("/invoices/process", files={"file": review_file}).json()
+
+        response = client.post(
+            "/invoices/corrections/bulk",
+            json={
+                "items": [
+                    {
+                        "document_id": review["document_id"],
+                        "field": "supplier_abn",
+                        "value": "51 824 753 556",
+                    },
+                    {"document_id": "doc_unknown", "field": "buyer_name", "value": "Luna"},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["applied"], body["failed"]) == (1, 1)
+        assert body["results"][0]["status"] == "ready"
+        assert body["results"][0]["issue_codes"] == []
+        assert "extraction" not in body["results"][0]
+        assert body["results"][1]["error"] == "Invoice doc_unknown was not found."
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_invoice_response_is_rendered_on_demand_for_the_current_version():
+    client, repository = _client()
+    try:
+        with _pdf("invalid_abn") as review_file:
+            review = client.post("/invoices/process", files={"file": review_file}).json()
+        assert review["response"] is None
+
+        before = client.get(f"/invoices/{review['document_id']}/response").json()
+        client.patch(
+            f"/invoices/{review['document_id']}/corrections",
+            json={"field": "supplier_abn", "value": "51 824 753 556"},
+        )
+        after = client.get(f"/invoices/{review['document_id']}/response").json()
+
+        assert (before["version"], after["version"]) == (0, 1)
+        assert "Status: needs_review." in before["response"]
+        assert "Status: ready." in after["response"]
+        assert repository.load_invoice_result(review["document_id"]).response is None
+        assert client.get("/invoices/doc_unknown/response").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
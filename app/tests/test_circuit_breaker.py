@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app.engine.circuit_breaker import CircuitBreaker
+from app.engine.llm_cassette import LLMCassette
+from app.engine.parser import InvoiceParser
+from app.engine.schemas import ParserStatus
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_cooldown():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=30, clock=clock)
+
+    breaker.record_failure("timeout")
+    assert breaker.allow() is True
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+    clock.now = 31
+    assert breaker.allow() is True
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False
+
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    clock.now = 62
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.snapshot()["state"] == "closed"
+    assert breaker.snapshot()["times_opened"] == 2
+    assert breaker.snapshot()["short_circuited"] == 2
+
+
+def test_open_circuit_routes_documents_to_deterministic_parser(monkeypatch, text_loader):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+    parser = InvoiceParser(use_llm=True, circuit_breaker=breaker)
+    calls: list[str] = []
+
+    def outage(prompt: str) -> str:
+        calls.append(prompt)
+        raise RuntimeError("simulated LLM outage")
+
+    monkeypatch.setattr(parser, "_call_llm", outage)
+
+    results = [parser.parse(text_loader("clean_under_1000"), f"doc_{index}") for index in range(5)]
+
+    assert len(calls) == 2
+    assert breaker.state == "open"
+    assert all(result.status == ParserStatus.SUCCESS for result in results)
+    assert results[4].extraction.invoice_number == "MCR-1001"
+    assert results[4].llm_usage is None
+
+
+def test_client_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1)
+    parser = InvoiceParser(use_llm=False, circuit_breaker=breaker)
+
+    class Response:
+        status_code = 400
+
+    error = RuntimeError("bad request")
+    error.response = Response()
+    parser._record_circuit_outcome(error)
+    assert breaker.state == "closed"
+
+    Response.status_code = 503
+    parser._record_circuit_outcome(error)
+    assert breaker.state == "open"
+
+
+def test_system_status_reports_circuit_state():
+    response = TestClient(app).get("/system/status")
+
+    assert response.status_code == 200
+    circuit = response.json()["llm_circuit"]
+    assert circuit["state"] == "closed"
+    assert circuit["consecutive_failures"] == 0
+
+
+def test_cassette_misses_and_missing_key_do_not_open_the_circuit(tmp_path, monkeypatch, text_loader):
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    breaker = CircuitBreaker(failure_threshold=2)
+    replaying = InvoiceParser(use_llm=True, cassette=LLMCassette(tmp_path, mode="replay"), circuit_breaker=breaker)
+    unconfigured = InvoiceParser(use_llm=True, circuit_breaker=breaker)
+
+    for index in range(3):
+        assert replaying.parse(text_loader("clean_under_1000"), f"doc_miss_{index}").status == ParserStatus.SUCCESS
+        unconfigured.parse(text_loader("clean_under_1000"), f"doc_nokey_{index}")
+
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
+
+
+def test_cassette_replays_do_not_close_a_half_open_circuit(tmp_path, monkeypatch, text_loader):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("r" * 48))
+    recorder = InvoiceParser(use_llm=True, cassette=LLMCassette(tmp_path, mode="record_new"))
+    answer = {"invoice_number": "MCR-REPLAY", "total": "110.00", "gst": "10.00", "subtotal": "100.00"}
+    monkeypatch.setattr(
+        recorder,
+        "_call_groq_with_requests",
+        lambda api_key, prompt: {"choices": [{"message": {"content": json.dumps(answer)}}]},
+    )
+    recorder.parse(text_loader("clean_under_1000"), "doc_recorded")
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30, clock=clock)
+    replaying = InvoiceParser(use_llm=True, cassette=LLMCassette(tmp_path, mode="replay"), circuit_breaker=breaker)
+    breaker.record_failure("timeout")
+    clock.now = 31
+
+    result = replaying.parse(text_loader("clean_under_1000"), "doc_replayed")
+
+    assert result.extraction.invoice_number == "MCR-REPLAY"
+    assert breaker.state == "half_open"
+    assert breaker.consecutive_failures == 1
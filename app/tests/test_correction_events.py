@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import sqlite3
+
+from app.engine.corrections import CorrectionService
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.engine.schemas import BulkCorrectionItem, CorrectionRequest, InvoiceStatus
+from app.persistence import repositories as repositories_module
+from app.persistence.repositories import InvoiceRepository
+
+
+def _processor(tmp_path, snapshot_interval: int) -> InvoiceProcessor:
+    return InvoiceProcessor(
+        repository=InvoiceRepository(
+            tmp_path / "events.sqlite3",
+            snapshot_interval=snapshot_interval,
+        ),
+        parser=InvoiceParser(use_llm=False),
+    )
+
+
+def _row(tmp_path, document_id: str) -> sqlite3.Row:
+    connection = sqlite3.connect(tmp_path / "events.sqlite3")
+    connection.row_factory = sqlite3.Row
+    try:
+        return connection.execute(
+            """
+            SELECT snapshot_version, status, result_json, extraction_json, corrections_json
+            FROM invoice_results WHERE document_id = ?
+            """,
+            (document_id,),
+        ).fetchone()
+    finally:
+        connection.close()
+
+
+def test_corrections_append_events_and_snapshot_every_interval(tmp_path, text_loader):
+    processor = _processor(tmp_path, snapshot_interval=3)
+    before = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"))
+    original_snapshot = _row(tmp_path, before.document_id)["result_json"]
+    service = CorrectionService(processor)
+
+    service.apply(before.document_id, CorrectionRequest(field="due_date", value="2026-07-01"))
+    second = service.apply(
+        before.document_id,
+        CorrectionRequest(field="supplier_abn", value="51 824 753 556"),
+    )
+
+    row = _row(tmp_path, before.document_id)
+    assert row["snapshot_version"] == 0
+    assert row["result_json"] == original_snapshot
+    assert row["status"] == "ready"
+    events = processor.repository.load_correction_events(before.document_id)
+    assert [event.sequence for event in events] == [1, 2]
+    assert all(len(event.model_dump_json()) < 1500 for event in events)
+    assert len(original_snapshot) > 2 * max(len(event.model_dump_json()) for event in events)
+
+    loaded = processor.repository.load_invoice_result(before.document_id)
+    assert loaded.model_dump() == second.model_dump()
+
+    third = service.apply(before.document_id, CorrectionRequest(field="buyer_name", value="Luna Cafe"))
+    row = _row(tmp_path, before.document_id)
+    assert row["snapshot_version"] == 3
+    assert processor.repository.load_invoice_result(before.document_id).model_dump() == third.model_dump()
+
+
+def test_columns_read_without_replay_follow_pending_events(tmp_path, text_loader):
+    processor = _processor(tmp_path, snapshot_interval=50)
+    result = processor.process_text("clean_under_1000.pdf", text_loader("clean_under_1000"))
+    before = _row(tmp_path, result.document_id)
+
+    CorrectionService(processor).apply(
+        result.document_id,
+        CorrectionRequest(field="supplier_name", value="Renamed Supplier Pty Ltd"),
+    )
+
+    after = _row(tmp_path, result.document_id)
+    assert after["snapshot_version"] == 0
+    assert (after["extraction_json"], after["corrections_json"]) == (before["extraction_json"], before["corrections_json"])
+    slowest = processor.repository.slowest_documents()
+    assert [document.supplier_name for document in slowest] == ["Renamed Supplier Pty Ltd"]
+
+
+def test_pending_events_are_visible_to_duplicate_detection_and_compaction(tmp_path, text_loader):
+    processor = _processor(tmp_path, snapshot_interval=50)
+    first = processor.process_text("clean_under_1000.pdf", text_loader("clean_under_1000"))
+    other = processor.process_text("cleaning.pdf", text_loader("cleaning"))
+
+    CorrectionService(processor).apply(
+        other.document_id,
+        CorrectionRequest(
+            updates=[
+                {"field": "supplier_abn", "value": first.extraction.supplier_abn},
+                {"field": "invoice_number", "value": first.extraction.invoice_number},
+            ]
+        ),
+    )
+
+    assert processor.repository.invoice_key_exists(
+        first.extraction.supplier_abn,
+        first.extraction.invoice_number,
+        first.document_id,
+    )
+    compacted = processor.repository.compact_invoice_result(other.document_id)
+    assert _row(tmp_path, other.document_id)["snapshot_version"] == compacted.version == 1
+
+
+def test_bulk_corrections_share_one_connection_and_report_per_document_errors(
+    tmp_path,
+    text_loader,
+    monkeypatch,
+):
+    processor = _processor(tmp_path, snapshot_interval=20)
+    first = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"))
+    second = processor.process_text("missing_abn.pdf", text_loader("missing_abn"))
+    opened: list[object] = []
+    original_connect = repositories_module.connect
+
+    def counting_connect(*args, **kwargs):
+        connection = original_connect(*args, **kwargs)
+        opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(repositories_module, "connect", counting_connect)
+    response = CorrectionService(processor).apply_many(
+        [
+            BulkCorrectionItem(document_id=first.document_id, field="supplier_abn", value="51 824 753 556"),
+            BulkCorrectionItem(document_id="doc_missing", field="supplier_abn", value="51 824 753 556"),
+            BulkCorrectionItem(document_id=second.document_id, field="supplier_abn", value="51 824 753 556"),
+        ]
+    )
+
+    assert len(opened) == 1
+    assert (response.applied, response.failed) == (2, 1)
+    assert [result.status for result in response.results] == [
+        InvoiceStatus.READY,
+        None,
+        InvoiceStatus.READY,
+    ]
+    assert response.results[1].error == "Invoice doc_missing was not found."
+    assert processor.repository.load_invoice_result(second.document_id).version == 1
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import pytest
+
 from app.engine.corrections import CorrectionService
 from app.engine.schemas import CorrectionRequest
 
@@ -54,3 +56,51 @@ def test_account_code_correction_regenerates_payload(processor, text_loader):
     assert after.status.value == "ready"
     assert after.account_code_suggestion.status == "user_selected"
     assert after.xero_payload.LineItems[0]["AccountCode"] == "429"
+
+
+@pytest.mark.parametrize(
+    ("case_name", "field", "value"),
+    [
+        ("invalid_abn", "supplier_abn", "51 824 753 556"),
+        ("invalid_abn", "due_date", "2026-07-01"),
+        ("over_1000_missing_buyer", "buyer_name", "Luna Cafe Pty Ltd"),
+        ("subtotal_mismatch", "total", "330.00"),
+        ("clear_line_items", "line_items.0.amount", "1.00"),
+        ("missing_invoice_number", "invoice_number", "INV-77"),
+        ("unsupported_currency", "currency", "AUD"),
+    ],
+)
+def test_incremental_rebuild_matches_full_rebuild(processor, text_loader, case_name, field, value):
+    before = processor.process_text(f"{case_name}.pdf", text_loader(case_name))
+    after = CorrectionService(processor).apply(
+        before.document_id,
+        CorrectionRequest(field=field, value=value),
+    )
+
+    full = processor.rebuild_result(after, after.extraction)
+
+    assert after.model_dump(exclude={"response"}) == full.model_dump(exclude={"response"})
+
+
+def test_due_date_correction_only_reruns_rules_that_read_external_state(
+    processor,
+    text_loader,
+    monkeypatch,
+):
+    before = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"))
+    executed: list[str] = []
+    original_run_rule = processor.validator._run_rule
+
+    def spy(rule, *args):
+        executed.append(rule.name)
+        return original_run_rule(rule, *args)
+
+    monkeypatch.setattr(processor.validator, "_run_rule", spy)
+    after = CorrectionService(processor).apply(
+        before.document_id,
+        CorrectionRequest(field="due_date", value="2026-07-01"),
+    )
+
+    assert executed == ["duplicate"]
+    assert {issue.code for issue in after.validation.issues} == {"INVALID_ABN"}
+    assert after.extraction.due_date == "2026-07-01"
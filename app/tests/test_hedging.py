@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+
+from app.engine.hedging import RequestHedger
+from app.engine.llm_usage import current_llm_usage
+from app.engine.parser import InvoiceParser, use_model
+
+
+def _slow_then_fast(delays: list[float]):
+    calls = itertools.count()
+    lock = threading.Lock()
+
+    def send() -> str:
+        with lock:
+            index = next(calls)
+        time.sleep(delays[index])
+        return f"call-{index}"
+
+    return send
+
+
+def test_fast_calls_are_not_hedged():
+    hedger = RequestHedger(delay=200, max_rate=1.0)
+
+    assert hedger.call(_slow_then_fast([0.0])) == "call-0"
+    assert hedger.stats["hedged"] == 0
+
+
+def test_slow_call_is_hedged_and_the_faster_duplicate_wins():
+    hedger = RequestHedger(delay=20, max_rate=1.0)
+    started = time.perf_counter()
+
+    result = hedger.call(_slow_then_fast([1.0, 0.0]))
+
+    assert result == "call-1"
+    assert time.perf_counter() - started < 0.5
+    assert hedger.stats == {"requests": 1, "hedged": 1, "hedge_wins": 1, "rate_capped": 0, "abandoned": 1}
+
+
+def test_hedge_rate_is_capped():
+    hedger = RequestHedger(delay=1, max_rate=0.0)
+
+    hedger.call(_slow_then_fast([0.05, 0.05]))
+    result = hedger.call(_slow_then_fast([0.05, 0.0]))
+
+    assert result == "call-0"
+    assert hedger.stats["hedged"] == 1
+    assert hedger.stats["rate_capped"] == 1
+
+
+def test_adaptive_delay_tracks_observed_latency_percentile():
+    hedger = RequestHedger(delay="p95")
+    assert hedger.delay_ms() == 2000.0
+
+    for latency in range(1, 101):
+        hedger.observe(float(latency))
+
+    assert hedger.delay_ms() == 95.0
+
+
+def test_parser_records_usage_and_tier_model_from_hedged_calls(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("h" * 48))
+    parser = InvoiceParser(use_llm=True, hedger=RequestHedger(delay=20, max_rate=1.0))
+    delays = iter([1.0, 0.0, 1.0, 0.0])
+    lock = threading.Lock()
+    content = json.dumps({"invoice_number": "HEDGE-1", "total": "11.00", "gst": "1.00"})
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        with lock:
+            delay = next(delays)
+        time.sleep(delay)
+        return {
+            "model": parser._groq_request_payload(prompt)["model"],
+            "choices": [{"message": {"content": content}}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55},
+        }
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    result = parser.parse("Tax Invoice\nInvoice Number: HEDGE-1\nTotal $11.00", "doc_hedged")
+
+    assert result.extraction.invoice_number == "HEDGE-1"
+    assert result.llm_ms < 500
+    # The abandoned primary was billed too, at the winner's usage.
+    assert result.llm_usage.total_tokens == 110
+    assert result.llm_usage.hedged_duplicates == 1
+    assert result.llm_usage.attempts[0].hedged_duplicates == 1
+
+    with use_model("context-model"):
+        parser._call_llm("Invoice text:\nTotal $11.00")
+    assert current_llm_usage()["model"] == "context-model"
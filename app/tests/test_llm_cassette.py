@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+
+from app.engine.llm_cassette import LLMCassette, cassette_key
+from app.engine.parser import InvoiceParser
+from app.engine.schemas import ParserStatus
+
+
+INVOICE_TEXT = "\n".join(
+    [
+        "Tax Invoice",
+        "Supplier: Metro Coffee Roasters Pty Ltd",
+        "Supplier ABN: 51 824 753 556",
+        "Invoice Number: MCR-1001",
+        "Invoice Date: 2026-05-12",
+        "Subtotal: $300.00",
+        "GST: $30.00",
+        "Total: $330.00",
+    ]
+)
+LLM_OUTPUT = json.dumps(
+    {
+        "supplier_name": "Metro Coffee Roasters Pty Ltd",
+        "supplier_abn": "51 824 753 556",
+        "invoice_number": "MCR-1001",
+        "invoice_date": "2026-05-12",
+        "subtotal": "300.00",
+        "gst": "30.00",
+        "total": "330.00",
+        "currency": "AUD",
+        "line_items": [],
+    }
+)
+
+
+def _parser(monkeypatch, cassette: LLMCassette, calls: list[str]) -> InvoiceParser:
+    parser = InvoiceParser(use_llm=True, cassette=cassette)
+
+    def fake_request(prompt: str) -> str:
+        calls.append(prompt)
+        return LLM_OUTPUT
+
+    monkeypatch.setattr(parser, "_request_llm", fake_request)
+    return parser
+
+
+def test_record_new_records_once_then_replays(monkeypatch, tmp_path):
+    calls: list[str] = []
+    cassette = LLMCassette(tmp_path, "record_new")
+    parser = _parser(monkeypatch, cassette, calls)
+
+    first = parser.parse(INVOICE_TEXT, "doc_first")
+    second = parser.parse(INVOICE_TEXT, "doc_second")
+
+    assert first.status == ParserStatus.SUCCESS
+    assert second.extraction.invoice_number == "MCR-1001"
+    assert len(calls) == 1
+    assert cassette.stats["recorded"] == 1
+    assert cassette.stats["hits"] == 1
+    assert cassette.stats["response_chars"] == 2 * len(LLM_OUTPUT)
+    assert len(list(tmp_path.rglob("*.json"))) == 1
+
+
+def test_replay_serves_recordings_offline_and_misses_fall_back(monkeypatch, tmp_path):
+    recorder_calls: list[str] = []
+    _parser(monkeypatch, LLMCassette(tmp_path, "record"), recorder_calls).parse(INVOICE_TEXT, "doc_recorded")
+
+    replay_calls: list[str] = []
+    replay = LLMCassette(tmp_path, "replay")
+    parser = _parser(monkeypatch, replay, replay_calls)
+
+    replayed = parser.parse(INVOICE_TEXT, "doc_replayed")
+    missed = parser.parse(INVOICE_TEXT.replace("MCR-1001", "MCR-2002"), "doc_missed")
+
+    assert replay_calls == []
+    assert replayed.extraction.field_sources["invoice_number"] == "llm"
+    assert missed.extraction.invoice_number == "MCR-2002"
+    assert missed.extraction.field_sources["invoice_number"] != "llm"
+    assert replay.stats["hits"] == 1
+    assert replay.stats["misses"] == 1
+
+
+def test_cassette_key_tracks_every_request_field():
+    payload = InvoiceParser(use_llm=False)._groq_request_payload("Invoice text:\nTotal $1.00")
+
+    assert cassette_key(payload) == cassette_key(json.loads(json.dumps(payload)))
+    assert cassette_key(payload) != cassette_key({**payload, "model": "another-model"})
+
+
+def test_replay_cassette_from_env_enables_llm_without_api_key(monkeypatch, tmp_path):
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setenv("INVOICE_LLM_CASSETTE_DIR", str(tmp_path))
+    monkeypatch.setenv("INVOICE_LLM_CASSETTE_MODE", "replay")
+
+    parser = InvoiceParser()
+
+    assert parser.use_llm is True
+    assert parser.cassette is not None and parser.cassette.mode == "replay"
+
+
+def test_replayed_cassettes_report_recorded_usage(monkeypatch, tmp_path):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("e" * 48))
+    recorder = InvoiceParser(use_llm=True, cassette=LLMCassette(tmp_path, "record"))
+    monkeypatch.setattr(
+        recorder,
+        "_call_groq_with_requests",
+        lambda api_key, prompt: {
+            "model": "llama-3.1-8b-instant",
+            "choices": [{"message": {"content": LLM_OUTPUT}}],
+            "usage": {"prompt_tokens": 700, "completion_tokens": 90, "total_tokens": 790},
+        },
+    )
+    recorder.parse(INVOICE_TEXT, "doc_recorded")
+
+    replayed = InvoiceParser(use_llm=True, cassette=LLMCassette(tmp_path, "replay")).parse(INVOICE_TEXT, "doc_replayed")
+
+    assert replayed.llm_usage.prompt_tokens == 700
+    assert replayed.llm_usage.completion_tokens == 90
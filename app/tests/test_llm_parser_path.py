@@ -117,3 +117,233 @@ def test_field_sources_indicate_llm_origin_when_possible(monkeypatch):
     assert result.extraction.field_sources["subtotal"] == "derived_arithmetic"
     assert result.extraction.line_items_source == "fallback_single_line"
     assert result.extraction.line_items[0].source == "fallback_single_line"
+
+
+def test_llm_usage_is_summed_across_repair_attempts(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("d" * 48))
+    parser = InvoiceParser(use_llm=True, max_attempts=2)
+    contents = iter(["not json", json.dumps(_valid_invoice_payload())])
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        return {
+            "model": "llama-3.1-8b-instant",
+            "choices": [{"message": {"content": next(contents)}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 120, "total_tokens": 1020},
+        }
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    result = parser.parse("Tax Invoice\nTotal $330.00", "doc_usage")
+
+    assert result.status == ParserStatus.SUCCESS
+    assert result.llm_usage is not None
+    assert result.llm_usage.prompt_tokens == 1800
+    assert result.llm_usage.completion_tokens == 240
+    assert result.llm_usage.total_tokens == 2040
+
+
+def test_instructions_form_a_stable_prefix_and_cached_tokens_are_reported(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("c" * 48))
+    parser = InvoiceParser(use_llm=True, max_attempts=2)
+    contents = iter(["not json", json.dumps(_valid_invoice_payload()), json.dumps(_valid_invoice_payload())])
+    payloads: list[dict] = []
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        payloads.append(parser._groq_request_payload(prompt))
+        return {
+            "model": "llama-3.1-8b-instant",
+            "choices": [{"message": {"content": next(contents)}}],
+            "usage": {
+                "prompt_tokens": 900,
+                "completion_tokens": 120,
+                "total_tokens": 1020,
+                "prompt_tokens_details": {"cached_tokens": 768},
+            },
+        }
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    repaired = parser.parse("Tax Invoice\nTotal $330.00", "doc_first")
+    parser.parse("Tax Invoice\nInvoice Number: OTHER-2\nTotal $110.00", "doc_second")
+
+    system_prompts = {payload["messages"][0]["content"] for payload in payloads}
+    user_prompts = [payload["messages"][1]["content"] for payload in payloads]
+    assert len(payloads) == 3
+    assert len(system_prompts) == 1
+    assert "Schema:" in system_prompts.pop()
+    assert user_prompts[0] == "Invoice text:\nTax Invoice\nTotal $330.00"
+    assert user_prompts[1].startswith("The previous output was malformed")
+    assert all("Schema:" not in prompt for prompt in user_prompts)
+    assert user_prompts[2].endswith("Invoice text:\nTax Invoice\nInvoice Number: OTHER-2\nTotal $110.00")
+    assert repaired.llm_usage.cached_tokens == 1536
+    assert repaired.llm_usage.attempts[0].cached_tokens == 768
+
+
+def test_missing_fields_mode_asks_only_for_fields_the_regex_missed(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("b" * 48))
+    parser = InvoiceParser(use_llm=True, llm_mode="missing_fields")
+    payloads: list[dict] = []
+    answer = {
+        "buyer_name": "Luna Cafe Pty Ltd",
+        "line_items": [{"description": "Coffee beans", "quantity": "1", "unit_price": "300.00", "amount": "300.00"}],
+        "invoice_number": "IGNORED-NOT-REQUESTED",
+    }
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        payloads.append(parser._groq_request_payload(prompt))
+        return {"choices": [{"message": {"content": json.dumps(answer)}}]}
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+    text = "\n".join(
+        [
+            "Metro Coffee Roasters Pty Ltd",
+            "ABN: 51 824 753 556",
+            "Invoice Number: MCR-77",
+            "Invoice Date: 2026-05-12",
+            "Subtotal: $300.00",
+            "GST: $30.00",
+            "Total: $330.00",
+        ]
+    )
+
+    result = parser.parse(text, "doc_partial")
+
+    requested = payloads[0]["response_format"]["json_schema"]["schema"]["required"]
+    assert len(payloads) == 1
+    assert "buyer_name" in requested and "line_items" in requested
+    assert "invoice_number" not in requested and "total" not in requested
+    assert payloads[0]["messages"][1]["content"].startswith("Requested fields: ")
+    extraction = result.extraction
+    assert extraction.invoice_number == "MCR-77"
+    assert extraction.field_sources["invoice_number"] == "regex_rescue"
+    assert extraction.buyer_name == "Luna Cafe Pty Ltd"
+    assert extraction.field_sources["buyer_name"] == "llm"
+    assert extraction.line_items_source == "llm"
+    assert extraction.line_items[0].description == "Coffee beans"
+
+
+def test_missing_fields_mode_skips_the_llm_for_complete_extractions(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("a" * 48))
+    parser = InvoiceParser(use_llm=True, llm_mode="missing_fields")
+
+    def fail_groq(api_key: str, prompt: str) -> dict:
+        raise AssertionError("complete extractions should not call the LLM")
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fail_groq)
+    text = "\n".join(
+        [
+            "Metro Coffee Roasters Pty Ltd",
+            "ABN: 51 824 753 556",
+            "Invoice Number: MCR-78",
+            "Invoice Date: 2026-05-12",
+            "Bill To: Luna Cafe Pty Ltd",
+            "Line Items:",
+            "Description | Qty | Unit Price | Amount | GST",
+            "Coffee beans | 1 | 300.00 | 300.00 | 30.00",
+            "Subtotal: $300.00",
+            "GST: $30.00",
+            "Total: $330.00",
+        ]
+    )
+
+    result = parser.parse(text, "doc_complete")
+
+    assert result.llm_usage is None
+    assert result.extraction.buyer_name == "Luna Cafe Pty Ltd"
+
+
+def test_missing_fields_mode_repairs_non_object_answers(monkeypatch):
+    parser = InvoiceParser(use_llm=True, llm_mode="missing_fields", max_attempts=2)
+    outputs = iter(['["Luna Cafe Pty Ltd"]', json.dumps({"buyer_name": "Luna Cafe Pty Ltd"})])
+    prompts: list[str] = []
+
+    def fake_llm(prompt: str) -> str:
+        prompts.append(prompt)
+        return next(outputs)
+
+    monkeypatch.setattr(parser, "_call_llm", fake_llm)
+    text = "\n".join(
+        [
+            "Metro Coffee Roasters Pty Ltd",
+            "ABN: 51 824 753 556",
+            "Invoice Number: MCR-79",
+            "Invoice Date: 2026-05-12",
+            "Subtotal: $300.00",
+            "GST: $30.00",
+            "Total: $330.00",
+        ]
+    )
+
+    result = parser.parse(text, "doc_list_answer")
+
+    assert len(prompts) == 2
+    assert result.extraction.buyer_name == "Luna Cafe Pty Ltd"
+    assert result.extraction.invoice_number == "MCR-79"
+
+
+TIERED_INVOICE = "\n".join(
+    [
+        "Metro Coffee Roasters Pty Ltd",
+        "ABN: 51 824 753 556",
+        "Invoice Number: MCR-TIER",
+        "Invoice Date: 2026-05-12",
+        "Subtotal: $300.00",
+        "GST: $30.00",
+        "Total: $330.00",
+    ]
+)
+
+
+def _tiered_parser(monkeypatch, answers: dict[str, list[str]], models: list[str]) -> InvoiceParser:
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("t" * 48))
+    monkeypatch.setenv("GROQ_MODEL_TIERS", "small-model, large-model")
+    parser = InvoiceParser(use_llm=True, max_attempts=1)
+    pending = {model: iter(contents) for model, contents in answers.items()}
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        model = parser._groq_request_payload(prompt)["model"]
+        models.append(model)
+        return {
+            "model": model,
+            "choices": [{"message": {"content": next(pending[model])}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        }
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+    return parser
+
+
+def test_arithmetic_mismatch_escalates_to_the_next_model_tier(monkeypatch):
+    models: list[str] = []
+    misread = json.dumps(_valid_invoice_payload(invoice_number="MCR-TIER", gst="60.00"))
+    correct = json.dumps(_valid_invoice_payload(invoice_number="MCR-TIER"))
+    parser = _tiered_parser(monkeypatch, {"small-model": [misread], "large-model": [correct]}, models)
+
+    result = parser.parse(TIERED_INVOICE, "doc_tiered")
+
+    assert models == ["small-model", "large-model"]
+    assert result.extraction.gst == 30
+    assert result.llm_attempts == 2
+    assert [attempt.model for attempt in result.llm_usage.attempts] == ["small-model", "large-model"]
+    assert result.llm_usage.escalations == ["small-model: GST_TOTAL_MISMATCH"]
+
+
+def test_invalid_output_escalates_but_printed_mismatches_do_not(monkeypatch):
+    models: list[str] = []
+    correct = json.dumps(_valid_invoice_payload(invoice_number="MCR-TIER"))
+    parser = _tiered_parser(monkeypatch, {"small-model": ["not json"], "large-model": [correct]}, models)
+
+    escalated = parser.parse(TIERED_INVOICE, "doc_invalid")
+
+    assert models == ["small-model", "large-model"]
+    assert escalated.extraction.field_sources["invoice_number"] == "llm"
+
+    models.clear()
+    printed_mismatch = TIERED_INVOICE.replace("Total: $330.00", "Total: $340.00")
+    mismatched = json.dumps(_valid_invoice_payload(invoice_number="MCR-TIER", total="340.00"))
+    parser = _tiered_parser(monkeypatch, {"small-model": [mismatched]}, models)
+
+    result = parser.parse(printed_mismatch, "doc_printed")
+
+    assert models == ["small-model"]
+    assert result.llm_usage.escalations == []
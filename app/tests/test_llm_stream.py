@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+from app.engine.llm_stream import JsonObjectScanner, read_chat_stream
+from app.engine.parser import InvoiceParser
+from app.engine.schemas import ParserStatus
+
+
+ANSWER = json.dumps(
+    {
+        "invoice_number": "STREAM-1",
+        "supplier_name": "Brace {Co} \"Quoted\"",
+        "subtotal": "100.00",
+        "gst": "10.00",
+        "total": "110.00",
+        "line_items": [{"description": "Item, one", "amount": "100.00"}],
+    }
+)
+
+
+def _sse_chunks(content: str, size: int = 7, usage: dict | None = None, usage_separate: bool = False) -> list[str]:
+    chunks = []
+    for start in range(0, len(content), size):
+        delta = {"choices": [{"index": 0, "delta": {"content": content[start : start + size]}}], "model": "stream-model"}
+        chunks.append(f"data: {json.dumps(delta)}\n\n")
+    if usage is not None:
+        usage_event = f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+        if usage_separate:
+            chunks.append(usage_event)
+        else:
+            # The final delta and the usage event usually arrive in one network read.
+            chunks[-1] += usage_event
+    chunks.append("data: [DONE]\n\n")
+    return chunks
+
+
+def _consumed(chunks: list[str], consumed: list[str]):
+    for chunk in chunks:
+        consumed.append(chunk)
+        yield chunk.encode("utf-8")
+
+
+def test_scanner_reports_top_level_fields_as_they_complete():
+    scanner = JsonObjectScanner()
+    seen = []
+    for char in "Here you go:\n" + ANSWER + "\nHope that helps.":
+        scanner.feed(char)
+        if scanner.current_key == "line_items" and not seen:
+            seen = sorted(scanner.fields)
+
+    assert seen == ["gst", "invoice_number", "subtotal", "supplier_name", "total"]
+    assert scanner.fields["supplier_name"] == 'Brace {Co} "Quoted"'
+    assert scanner.complete is True
+    assert json.loads(scanner.object_text) == json.loads(ANSWER)
+
+
+def test_stream_reader_stops_at_closing_brace_and_reports_header_early():
+    consumed = []
+    headers = []
+
+    chunks = _sse_chunks(ANSWER + " trailing prose that should never be read")
+
+    result = read_chat_stream(_consumed(chunks, consumed), on_header=headers.append)
+
+    assert result.content == ANSWER
+    assert result.stopped_early is True
+    assert result.model == "stream-model"
+    assert headers[0]["invoice_number"] == "STREAM-1"
+    assert "line_items" not in headers[0]
+    assert result.header_ms is not None and result.header_ms <= result.complete_ms
+    assert "data: [DONE]\n\n" not in consumed
+
+
+def test_stream_reader_keeps_buffered_usage_but_does_not_wait_for_it():
+    usage = {"prompt_tokens": 80, "completion_tokens": 20, "total_tokens": 100}
+    consumed: list[str] = []
+
+    buffered = read_chat_stream(_consumed(_sse_chunks(ANSWER, size=len(ANSWER), usage=usage), consumed))
+    assert buffered.usage == usage
+    assert consumed[-1] != "data: [DONE]\n\n"
+
+    consumed.clear()
+    chunks = _sse_chunks(ANSWER, size=len(ANSWER), usage=usage, usage_separate=True)
+    later = read_chat_stream(_consumed(chunks, consumed))
+    assert later.usage is None
+    assert later.content == ANSWER
+    assert consumed == chunks[:1]
+
+
+def test_parser_streams_completion_with_chunk_timeout(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("s" * 48))
+    parser = InvoiceParser(use_llm=True, stream=True)
+    requests_made = []
+
+    class FakeStreamResponse:
+        ok = True
+        headers = {"Content-Type": "text/event-stream; charset=utf-8"}
+
+        def __init__(self, chunks):
+            self.chunks = chunks
+            self.closed = False
+
+        def raise_for_status(self):
+            return None
+
+        def iter_content(self, chunk_size=None):
+            return (chunk.encode("utf-8") for chunk in self.chunks)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.closed = True
+
+    def fake_post(url, **kwargs):
+        requests_made.append(kwargs)
+        return FakeStreamResponse(_sse_chunks(ANSWER, usage={"prompt_tokens": 80, "completion_tokens": 20, "total_tokens": 100}))
+
+    monkeypatch.setattr("requests.post", fake_post)
+
+    result = parser.parse("Tax Invoice\nInvoice Number: STREAM-1\nTotal $110.00", "doc_streamed")
+
+    assert result.status != ParserStatus.FAILED
+    assert result.extraction.invoice_number == "STREAM-1"
+    assert requests_made[0]["stream"] is True
+    assert requests_made[0]["json"]["stream"] is True
+    assert requests_made[0]["timeout"] == (10.0, parser.stream_chunk_timeout)
+    assert result.llm_usage.total_tokens == 100
+
+
+def test_streamed_error_response_is_closed_and_its_body_still_read(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("t" * 48))
+    parser = InvoiceParser(use_llm=True, stream=True)
+    body = {"error": {"code": "json_validate_failed", "failed_generation": '{"total": '}}
+    closed: list[bool] = []
+
+    class TrackedResponse(requests.Response):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    def fake_post(url, **kwargs):
+        response = TrackedResponse()
+        response.status_code = 400
+        response.raw = HTTPResponse(body=io.BytesIO(json.dumps(body).encode("utf-8")), status=400, preload_content=False)
+        response.url = url
+        return response
+
+    monkeypatch.setattr("requests.post", fake_post)
+
+    assert parser._call_llm("Invoice text:\nTotal $1.00") == '{"total": '
+    assert closed == [True]
+
+
+def test_non_stream_body_takes_the_http_error_path(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("u" * 48))
+    parser = InvoiceParser(use_llm=True, stream=True)
+    body = json.dumps({"error": {"message": "upstream unavailable"}}).encode("utf-8")
+
+    def fake_post(url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.raw = HTTPResponse(body=io.BytesIO(body), status=200, preload_content=False)
+        response.url = url
+        return response
+
+    monkeypatch.setattr("requests.post", fake_post)
+
+    with pytest.raises(requests.HTTPError, match="Expected an event stream") as error:
+        parser._call_llm("Invoice text:\nTotal $1.00")
+
+    assert error.value.response.json()["error"]["message"] == "upstream unavailable"
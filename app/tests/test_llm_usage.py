@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_repository
+from app.engine.batch import BatchProcessor
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.main import app
+from app.persistence.repositories import InMemoryInvoiceRepository
+
+
+USAGE = {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200}
+
+
+def _llm_parser(monkeypatch, calls: list[str], malformed: bool = False, max_attempts: int = 2) -> InvoiceParser:
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("f" * 48))
+    parser = InvoiceParser(use_llm=True, max_attempts=max_attempts)
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        calls.append(prompt)
+        text = prompt.rsplit("Invoice text:\n", 1)[-1]
+        extraction = parser._parse_deterministically(text, "doc_fake").extraction
+        content = "not json" if malformed else extraction.model_dump_json()
+        return {"model": "llama-3.1-8b-instant", "choices": [{"message": {"content": content}}], "usage": USAGE}
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+    return parser
+
+
+def _batch(parser: InvoiceParser, repository=None, token_budget: int | None = None) -> BatchProcessor:
+    processor = InvoiceProcessor(repository=repository or InMemoryInvoiceRepository(), parser=parser)
+    return BatchProcessor(processor, token_budget=token_budget)
+
+
+def test_usage_is_recorded_per_document_and_aggregated_per_batch(monkeypatch, text_loader):
+    calls: list[str] = []
+    batch = _batch(_llm_parser(monkeypatch, calls)).process_texts(
+        [
+            ("clean_under_1000.pdf", text_loader("clean_under_1000")),
+            ("cleaning.pdf", text_loader("cleaning")),
+        ]
+    )
+
+    document_usage = batch.results[0].llm_usage
+    assert document_usage.total_tokens == 1200
+    assert document_usage.attempts[0].model == "llama-3.1-8b-instant"
+    assert document_usage.attempts[0].outcome == "valid"
+    assert batch.results[0].timings.llm_tokens == 1200
+    assert batch.llm_usage.total_tokens == 2400
+    assert batch.llm_usage.prompt_tokens == 2000
+    assert batch.llm_usage.documents_with_llm == 2
+    assert batch.llm_usage.repair_attempts == 0
+    assert batch.llm_usage.tokens_by_model == {"llama-3.1-8b-instant": 2400}
+
+
+def test_batch_token_budget_parses_remaining_documents_deterministically(monkeypatch, text_loader):
+    calls: list[str] = []
+    batch = _batch(_llm_parser(monkeypatch, calls), token_budget=1500).process_texts(
+        [
+            ("clean_under_1000.pdf", text_loader("clean_under_1000")),
+            ("cleaning.pdf", text_loader("cleaning")),
+            ("produce.pdf", text_loader("produce")),
+        ]
+    )
+
+    assert len(calls) == 2
+    assert batch.llm_usage.budget_exhausted is True
+    assert batch.llm_usage.documents_without_llm == 1
+    assert batch.results[2].llm_usage is None
+    assert batch.results[2].extraction.field_sources["invoice_number"] != "llm"
+
+
+def test_exhausted_repair_loop_is_flagged_as_runaway(monkeypatch, text_loader):
+    calls: list[str] = []
+    batch = _batch(_llm_parser(monkeypatch, calls, malformed=True, max_attempts=3)).process_texts(
+        [("clean_under_1000.pdf", text_loader("clean_under_1000"))]
+    )
+
+    usage = batch.results[0].llm_usage
+    assert len(calls) == 3
+    assert usage.runaway is True
+    assert [attempt.outcome for attempt in usage.attempts] == ["invalid", "invalid", "invalid"]
+    assert batch.llm_usage.repair_attempts == 2
+    assert batch.llm_usage.runaway_documents == [batch.results[0].document_id]
+
+
+def test_usage_endpoints_return_document_and_batch_usage(monkeypatch, text_loader):
+    calls: list[str] = []
+    repository = InMemoryInvoiceRepository()
+    batch = _batch(_llm_parser(monkeypatch, calls), repository).process_texts(
+        [("clean_under_1000.pdf", text_loader("clean_under_1000"))]
+    )
+    app.dependency_overrides[get_repository] = lambda: repository
+    try:
+        client = TestClient(app)
+        document = client.get(f"/invoices/{batch.results[0].document_id}/usage")
+        batch_usage = client.get(f"/batches/{batch.batch_id}/usage")
+        missing = client.get("/batches/missing/usage")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert document.status_code == 200
+    assert document.json()["total_tokens"] == 1200
+    assert batch_usage.json()["documents_with_llm"] == 1
+    assert missing.status_code == 404
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.engine.metrics import MetricsRegistry, REGISTRY
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.main import app
+from app.persistence.repositories import InvoiceRepository
+
+
+def test_registry_renders_prometheus_counters_and_cumulative_histograms():
+    registry = MetricsRegistry()
+    documents = registry.counter("docs_total", "Documents.", ("status",))
+    latency = registry.histogram("stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1.0))
+
+    documents.inc(status="ready")
+    documents.inc(2, status='needs "review"')
+    latency.observe(0.05, stage="ocr")
+    latency.observe(0.5, stage="ocr")
+    latency.observe(3.0, stage="ocr")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE docs_total counter" in lines
+    assert 'docs_total{status="ready"} 1' in lines
+    assert 'docs_total{status="needs \\"review\\""} 2' in lines
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="ocr"} 3.55' in lines
+    assert 'stage_seconds_count{stage="ocr"} 3' in lines
+
+
+def test_metrics_endpoint_exposes_stage_parser_and_repository_series(tmp_path, text_loader):
+    REGISTRY.reset()
+    processor = InvoiceProcessor(
+        repository=InvoiceRepository(tmp_path / "metrics.sqlite3"),
+        parser=InvoiceParser(use_llm=False),
+    )
+    processor.process_text("clean_under_1000.pdf", text_loader("clean_under_1000"))
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    for stage in ("parse", "parse_deterministic", "validate", "map", "payload"):
+        assert f'invoice_stage_seconds_count{{stage="{stage}"}} 1' in body
+    assert 'invoice_parser_status_total{status="success"} 1' in body
+    assert 'invoice_documents_total{status="ready"} 1' in body
+    assert 'invoice_repository_seconds_count{operation="save_invoice_result"} 1' in body
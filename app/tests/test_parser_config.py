@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import json
 import os
 
+import pytest
+import requests
+
 from app.engine import parser as parser_module
+from app.engine import project_env
 from app.engine.parser import InvoiceParser
 
 
@@ -27,13 +32,148 @@ def test_parser_enables_llm_for_real_looking_api_key(monkeypatch):
 def test_project_env_loads_without_python_dotenv(monkeypatch, tmp_path):
     monkeypatch.chdir(tmp_path)
     monkeypatch.delenv("GROQ_API_KEY", raising=False)
-    monkeypatch.setattr(parser_module, "load_dotenv", lambda: False)
+    monkeypatch.setattr(project_env, "load_dotenv", lambda: False)
     (tmp_path / ".env").write_text(
         "GROQ_API_KEY=gsk_" + ("b" * 48) + "\n",
         encoding="utf-8",
     )
 
-    parser_module.load_project_env()
+    project_env.load_project_env()
 
     assert os.environ["GROQ_API_KEY"].startswith("gsk_")
     assert InvoiceParser().use_llm is True
+
+
+def test_parser_base_url_defaults_to_groq_and_honours_env(monkeypatch):
+    monkeypatch.delenv("GROQ_BASE_URL", raising=False)
+    assert InvoiceParser().chat_completions_url == "https://api.groq.com/openai/v1/chat/completions"
+
+    monkeypatch.setenv("GROQ_BASE_URL", "http://127.0.0.1:8089/openai/v1/")
+    assert InvoiceParser().chat_completions_url == "http://127.0.0.1:8089/openai/v1/chat/completions"
+    assert InvoiceParser(base_url="http://stub/v1").chat_completions_url == "http://stub/v1/chat/completions"
+
+
+def test_llm_http_errors_are_not_retried_through_curl(monkeypatch):
+    import requests
+
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("c" * 48))
+    monkeypatch.delenv("GROQ_RESPONSE_FORMAT", raising=False)
+    parser = InvoiceParser(use_llm=True, base_url="http://stub/v1")
+    posted: list[str] = []
+
+    def fake_post(url, **kwargs):
+        posted.append(url)
+        response = requests.Response()
+        response.status_code = 429
+        response.url = url
+        return response
+
+    def fail_curl(api_key, prompt):
+        raise AssertionError("curl fallback should not run after an HTTP error response")
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(parser, "_call_groq_with_curl", fail_curl)
+
+    with pytest.raises(requests.HTTPError) as error:
+        parser._call_llm("Invoice text:\nTotal $1.00")
+
+    assert error.value.response.status_code == 429
+    assert posted == ["http://stub/v1/chat/completions"]
+
+
+def _http_error(status_code: int, body: dict):
+    import requests
+
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8")
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+def test_requests_structured_output_schema_derived_from_extraction(monkeypatch):
+    monkeypatch.delenv("GROQ_RESPONSE_FORMAT", raising=False)
+    payload = InvoiceParser(use_llm=False)._groq_request_payload("Invoice text:\nTotal $1.00")
+
+    schema = payload["response_format"]["json_schema"]["schema"]
+    assert payload["response_format"]["type"] == "json_schema"
+    assert set(schema["required"]) == set(parser_module.JSON_SCHEMA_HINT)
+    assert schema["properties"]["total"]["type"] == ["string", "number", "null"]
+    assert "source" not in schema["properties"]["line_items"]["items"]["properties"]
+
+    monkeypatch.setenv("GROQ_RESPONSE_FORMAT", "text")
+    assert "response_format" not in InvoiceParser(use_llm=False)._groq_request_payload("Invoice text:\n")
+
+
+def test_unsupported_response_format_falls_back_and_is_remembered(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("d" * 48))
+    monkeypatch.setenv("GROQ_MODEL", "model-without-structured-output")
+    monkeypatch.setattr(parser_module, "_unsupported_response_formats", set())
+    parser = InvoiceParser(use_llm=True)
+    formats: list[str | None] = []
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        response_format = parser._groq_request_payload(prompt).get("response_format", {}).get("type")
+        formats.append(response_format)
+        if response_format == "json_schema":
+            raise _http_error(400, {"error": {"message": "response_format `json_schema` is not supported"}})
+        return {"choices": [{"message": {"content": "{}"}}]}
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    parser._call_llm("Invoice text:\nTotal $1.00")
+    parser._call_llm("Invoice text:\nTotal $2.00")
+
+    assert formats == ["json_schema", "json_object", "json_object"]
+    assert InvoiceParser(use_llm=True).response_format == "json_object"
+
+
+def test_unrelated_bad_request_is_raised_without_downgrading_the_format(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("c" * 48))
+    monkeypatch.setattr(parser_module, "_unsupported_response_formats", set())
+    parser = InvoiceParser(use_llm=True)
+    calls: list[str] = []
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        calls.append(prompt)
+        raise _http_error(
+            400,
+            {"error": {"code": "context_length_exceeded", "message": "Please reduce the length of the messages."}},
+        )
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    with pytest.raises(requests.HTTPError):
+        parser._call_llm("Invoice text:\nTotal $1.00")
+
+    assert len(calls) == 1
+    assert parser_module._unsupported_response_formats == set()
+    assert parser.response_format == "json_schema"
+
+
+def test_json_validate_failures_go_to_the_repair_loop(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_" + ("e" * 48))
+    monkeypatch.setattr(parser_module, "_unsupported_response_formats", set())
+    parser = InvoiceParser(use_llm=True, max_attempts=2)
+    responses = iter(
+        [
+            _http_error(400, {"error": {"code": "json_validate_failed", "failed_generation": '{"total": '}}),
+            {"choices": [{"message": {"content": json.dumps({"invoice_number": "INV-9", "total": "11.00"})}}]},
+        ]
+    )
+    prompts: list[str] = []
+
+    def fake_groq(api_key: str, prompt: str) -> dict:
+        prompts.append(prompt)
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(parser, "_call_groq_with_requests", fake_groq)
+
+    result = parser.parse("Tax Invoice\nInvoice Number: INV-9\nTotal $11.00", "doc_json_mode")
+
+    assert result.extraction.invoice_number == "INV-9"
+    assert result.llm_attempts == 2
+    assert 'Previous output:\n{"total": ' in prompts[1]
+    assert parser.response_format == "json_schema"
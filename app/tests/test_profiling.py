@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_processor, get_profiler
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.engine.profiling import PROFILE_HEADER, RequestProfiler
+from app.main import app
+from app.persistence.repositories import InMemoryInvoiceRepository
+from app.tests.conftest import FIXTURE_ROOT
+
+
+def _busy_parse(processor: InvoiceProcessor, text: str) -> None:
+    for _ in range(30):
+        processor.parser.parse(text, "doc_profile")
+
+
+def test_capture_writes_pstats_and_collapsed_stacks_keyed_by_id(processor, tmp_path, text_loader):
+    profiler = RequestProfiler(mode="all", directory=tmp_path, sample_interval=0.0005)
+
+    with profiler.capture() as capture:
+        _busy_parse(processor, text_loader("clean_over_1000"))
+        capture.key = "doc_abc/../1"
+
+    assert capture.path == tmp_path / "doc_abc_.._1"
+    stats = pstats.Stats(str(capture.path / "profile.pstats"))
+    assert any(name == "_parse_deterministically" for _, _, name in stats.stats)
+    lines = (capture.path / "stacks.collapsed").read_text(encoding="utf-8").splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+
+def test_dot_only_keys_stay_inside_the_profile_directory(tmp_path):
+    directory = tmp_path / "profiles"
+    profiler = RequestProfiler(mode="all", directory=directory)
+
+    for key in ("..", ".", "..."):
+        with profiler.capture() as capture:
+            capture.key = key
+        assert capture.path == directory / "profile"
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["profiles"]
+
+
+def test_header_mode_only_profiles_flagged_requests_and_caps_retention(processor, tmp_path, text_loader):
+    profiler = RequestProfiler(mode="header", directory=tmp_path, keep=2)
+
+    with profiler.capture(None) as skipped:
+        skipped.key = "doc_skipped"
+    for index in range(3):
+        with profiler.capture("1") as capture:
+            processor.parser.parse(text_loader("cleaning"), f"doc_{index}")
+            capture.key = f"doc_{index}"
+
+    assert skipped.enabled is False
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["doc_1", "doc_2"]
+    assert RequestProfiler(mode="off", directory=tmp_path).should_profile("1") is False
+
+
+def test_process_endpoint_profiles_when_header_is_sent(tmp_path):
+    processor = InvoiceProcessor(
+        repository=InMemoryInvoiceRepository(),
+        parser=InvoiceParser(use_llm=False),
+    )
+    app.dependency_overrides[get_processor] = lambda: processor
+    app.dependency_overrides[get_profiler] = lambda: RequestProfiler(mode="header", directory=tmp_path)
+    try:
+        with (FIXTURE_ROOT / "invoices" / "cleaning.pdf").open("rb") as handle:
+            response = TestClient(app).post(
+                "/invoices/process",
+                files={"file": ("cleaning.pdf", handle, "application/pdf")},
+                headers={PROFILE_HEADER: "1"},
+            )
+
+        document_id = response.json()["document_id"]
+        assert (tmp_path / document_id / "stacks.collapsed").exists()
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from app.engine.parser import InvoiceParser
+from app.engine.prompt_regions import GAP_MARKER, select_prompt_regions
+from app.engine.schemas import ParserStatus
+
+
+HEADER = [
+    "Tax Invoice",
+    "Metro Coffee Roasters Pty Ltd",
+    "ABN: 51 824 753 556",
+    "Invoice Number: MCR-1001",
+    "Invoice Date: 2026-05-12",
+    "Bill To: Harbour Cafe Pty Ltd",
+]
+LINE_ITEMS = [
+    "Description | Qty | Unit Price | Amount",
+    "Espresso beans 1kg | 10 | 25.00 | 250.00",
+    "Filter papers | 5 | 10.00 | 50.00",
+]
+TOTALS = ["Subtotal: $300.00", "GST: $30.00", "Total: $330.00"]
+TERMS = [
+    f"Clause {number}. Goods remain the property of the supplier until paid in full and are supplied subject to our standard terms."
+    for number in range(1, 40)
+]
+LONG_INVOICE = "\n".join(HEADER + LINE_ITEMS + TERMS + TOTALS + TERMS)
+
+
+def _parser(monkeypatch, prompts: list[str]) -> InvoiceParser:
+    parser = InvoiceParser(use_llm=True, prompt_compaction=True)
+
+    def fake_request(prompt: str) -> str:
+        prompts.append(prompt)
+        excerpt = prompt.rsplit("Invoice text:\n", 1)[-1]
+        return parser._parse_deterministically(excerpt, "doc_fake").extraction.model_dump_json()
+
+    monkeypatch.setattr(parser, "_request_llm", fake_request)
+    return parser
+
+
+def test_long_invoice_is_compacted_to_header_items_and_totals():
+    patterns = InvoiceParser(use_llm=False)._total_patterns()
+    excerpt = select_prompt_regions(LONG_INVOICE, patterns, token_budget=200)
+
+    assert excerpt.compacted is True
+    assert excerpt.reason == "compacted"
+    assert excerpt.excerpt_tokens < excerpt.original_tokens / 4
+    for line in HEADER + LINE_ITEMS + ["Total: $330.00"]:
+        assert line in excerpt.text
+    assert "Clause 20." not in excerpt.text
+    assert GAP_MARKER in excerpt.text
+
+
+def test_full_text_is_kept_within_budget_or_without_cues():
+    patterns = InvoiceParser(use_llm=False)._total_patterns()
+    short = "\n".join(HEADER + TOTALS)
+    no_totals = "\n".join(HEADER + TERMS)
+
+    within = select_prompt_regions(short, patterns, token_budget=400)
+    missing = select_prompt_regions(no_totals, patterns, token_budget=50)
+
+    assert (within.compacted, within.reason, within.text) == (False, "within_budget", short)
+    assert (missing.compacted, missing.reason, missing.text) == (False, "missing_cues", no_totals)
+
+
+def test_parser_sends_excerpt_but_validates_against_full_text(monkeypatch):
+    prompts: list[str] = []
+    parser = _parser(monkeypatch, prompts)
+    parser.prompt_token_budget = 200
+
+    result = parser.parse(LONG_INVOICE, "doc_compacted")
+
+    assert result.status != ParserStatus.FAILED
+    assert result.extraction.total == 330
+    assert result.extraction.invoice_number == "MCR-1001"
+    assert len(prompts) == 1
+    assert "Clause 20." not in prompts[0]
+    assert len(prompts[0]) < len(parser._build_prompt(LONG_INVOICE, None))
+
+
+def test_prompt_compaction_is_opt_in(monkeypatch):
+    monkeypatch.delenv("INVOICE_PROMPT_COMPACTION", raising=False)
+    assert InvoiceParser(use_llm=False).prompt_compaction is False
+
+    monkeypatch.setenv("INVOICE_PROMPT_COMPACTION", "1")
+    monkeypatch.setenv("INVOICE_PROMPT_TOKEN_BUDGET", "250")
+    parser = InvoiceParser(use_llm=False)
+    assert parser.prompt_compaction is True
+    assert parser.prompt_token_budget == 250
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_repository
+from app.engine.corrections import CorrectionService
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.engine.schemas import CorrectionRequest
+from app.main import app
+from app.persistence.repositories import InvoiceRepository
+from app.tests.conftest import FIXTURE_ROOT
+
+
+def _processor(tmp_path, **repository_options) -> InvoiceProcessor:
+    return InvoiceProcessor(
+        repository=InvoiceRepository(tmp_path / "timings.sqlite3", **repository_options),
+        parser=InvoiceParser(use_llm=False),
+    )
+
+
+def test_pdf_results_carry_stage_timings_that_survive_reload_and_corrections(tmp_path):
+    processor = _processor(tmp_path, snapshot_interval=1)
+    pdf_bytes = (FIXTURE_ROOT / "invoices" / "invalid_abn.pdf").read_bytes()
+
+    result = processor.process_pdf("invalid_abn.pdf", "application/pdf", pdf_bytes)
+
+    timings = result.timings
+    assert timings is not None
+    assert timings.pages == 1
+    assert timings.ocr_ms > 0 and timings.parse_ms > 0 and timings.persistence_ms > 0
+    assert timings.llm_attempts == 0
+    assert timings.total_ms >= timings.ocr_ms + timings.parse_ms + timings.validation_ms
+    stored = processor.repository.load_invoice_result(result.document_id).timings
+    assert stored.model_dump(exclude={"persistence_ms", "total_ms"}) == timings.model_dump(
+        exclude={"persistence_ms", "total_ms"}
+    )
+    assert stored.persistence_ms < timings.persistence_ms and stored.total_ms < timings.total_ms
+
+    CorrectionService(processor).apply(
+        result.document_id,
+        CorrectionRequest(field="supplier_abn", value="51 824 753 556"),
+    )
+    assert processor.repository.load_invoice_result(result.document_id).timings == stored
+
+
+def test_processing_writes_the_result_row_once(tmp_path, text_loader, monkeypatch):
+    processor = _processor(tmp_path)
+    writes: list[str] = []
+    original_session = InvoiceRepository._session
+
+    def recording_session(self, operation):
+        writes.append(operation)
+        return original_session(self, operation)
+
+    monkeypatch.setattr(InvoiceRepository, "_session", recording_session)
+
+    result = processor.process_text("cleaning.pdf", text_loader("cleaning"))
+
+    assert writes.count("save_invoice_result") == 1
+    assert processor.repository.load_invoice_result(result.document_id).timings.total_ms > 0
+
+
+def test_slowest_documents_orders_by_total_and_filters_by_window(tmp_path, text_loader):
+    processor = _processor(tmp_path)
+    results = [
+        processor.process_text(f"{name}.pdf", text_loader(name))
+        for name in ("clean_under_1000", "cleaning", "invalid_abn")
+    ]
+
+    slowest = processor.repository.slowest_documents(limit=2)
+
+    stored = {item.document_id: processor.repository.load_invoice_result(item.document_id) for item in results}
+    expected = sorted(results, key=lambda item: stored[item.document_id].timings.total_ms, reverse=True)[:2]
+    assert [item.document_id for item in slowest] == [item.document_id for item in expected]
+    assert slowest[0].supplier_name == expected[0].extraction.supplier_name
+    future = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
+    assert processor.repository.slowest_documents(since=future) == []
+    assert len(processor.repository.slowest_documents(until=future)) == 3
+
+
+def test_slowest_endpoint_is_not_shadowed_by_document_lookup(tmp_path, text_loader):
+    processor = _processor(tmp_path)
+    processor.process_text("cleaning.pdf", text_loader("cleaning"))
+    app.dependency_overrides[get_repository] = lambda: processor.repository
+    try:
+        response = TestClient(app).get("/invoices/slowest", params={"limit": 5, "since": "2020-01-01T00:00:00"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body) == 1
+        assert body[0]["timings"]["total_ms"] > 0
+    finally:
+        app.dependency_overrides.clear()
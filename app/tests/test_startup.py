@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app.engine import project_env
+from app.engine.profiling import RequestProfiler
+from app.engine.warmup import warmup_enabled
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_api_entry_point_does_not_import_llm_or_ocr_dependencies():
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys; import api.main; "
+            "print(json.dumps(sorted(name for name in "
+            "('requests', 'dotenv', 'PyPDF2', 'pdf2image', 'pytesseract', 'langchain_groq', 'numpy') "
+            "if name in sys.modules)))",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
+
+
+def test_startup_settings_apply_when_only_set_in_dotenv(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("INVOICE_WARMUP", raising=False)
+    monkeypatch.delenv("INVOICE_PROFILING", raising=False)
+    monkeypatch.setattr(project_env, "load_dotenv", lambda: False)
+    monkeypatch.setattr(project_env, "_project_env_loaded", False)
+    (tmp_path / ".env").write_text("INVOICE_WARMUP=1\nINVOICE_PROFILING=all\n", encoding="utf-8")
+
+    assert warmup_enabled() is True
+    assert RequestProfiler.from_env().mode == "all"
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app.engine import project_env, tracing
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.main import app
+from app.persistence.repositories import InMemoryInvoiceRepository
+
+
+def _records(path) -> list[dict]:
+    tracing.shutdown_tracing()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_document_stages_share_request_and_document_ids(tmp_path, text_loader):
+    trace_path = tmp_path / "trace.jsonl"
+    tracing.configure_tracing(trace_path)
+    processor = InvoiceProcessor(
+        repository=InMemoryInvoiceRepository(),
+        parser=InvoiceParser(use_llm=False),
+    )
+
+    with tracing.bind(request_id="req-1"):
+        result = processor.process_text("invalid_abn.pdf", text_loader("invalid_abn"), batch_id="batch_1")
+
+    records = _records(trace_path)
+    spans = {record["span"]: record for record in records if "span" in record}
+    assert {"process_document", "parse", "validate", "map", "payload", "persist"} <= set(spans)
+    for record in spans.values():
+        assert record["request_id"] == "req-1"
+        assert record["document_id"] == result.document_id
+        assert record["batch_id"] == "batch_1"
+        assert record["status"] == "ok"
+    assert spans["process_document"]["duration_ms"] >= spans["parse"]["duration_ms"]
+
+
+def test_llm_attempt_spans_record_status_latency_and_retry_reason(tmp_path, text_loader, monkeypatch):
+    trace_path = tmp_path / "trace.jsonl"
+    tracing.configure_tracing(trace_path)
+    parser = InvoiceParser(use_llm=True, max_attempts=2)
+    text = text_loader("clean_under_1000")
+    valid_json = parser._parse_deterministically(text, "doc_llm").extraction.model_dump_json()
+    outputs = iter(["not json", valid_json])
+    monkeypatch.setattr(parser, "_call_llm", lambda prompt: next(outputs))
+
+    assert parser.parse(text, "doc_llm").status.value == "success"
+
+    attempts = [record for record in _records(trace_path) if record.get("span") == "llm_attempt"]
+    assert [record["outcome"] for record in attempts] == ["invalid", "valid"]
+    assert attempts[0]["retry_reason"].startswith("Invalid JSON")
+    assert attempts[1]["repair"] is True
+    assert all(record["status_code"] == 200 and "latency_ms" in record for record in attempts)
+
+
+def test_request_id_is_echoed_or_generated_and_tracing_is_noop_when_disabled(monkeypatch):
+    monkeypatch.delenv(tracing.TRACE_FILE_ENV, raising=False)
+    tracing.shutdown_tracing()
+    client = TestClient(app)
+
+    echoed = client.get("/health", headers={tracing.REQUEST_ID_HEADER: "req-abc"})
+    generated = client.get("/health")
+
+    assert echoed.headers[tracing.REQUEST_ID_HEADER] == "req-abc"
+    assert len(generated.headers[tracing.REQUEST_ID_HEADER]) == 16
+    assert tracing.tracing_enabled() is False
+    assert tracing.span("parse") is tracing.span("validate")
+
+
+def test_trace_file_set_only_in_dotenv_enables_tracing(monkeypatch, tmp_path):
+    trace_path = tmp_path / "trace.jsonl"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(tracing.TRACE_FILE_ENV, raising=False)
+    monkeypatch.setattr(project_env, "load_dotenv", lambda: False)
+    monkeypatch.setattr(project_env, "_project_env_loaded", False)
+    (tmp_path / ".env").write_text(f"{tracing.TRACE_FILE_ENV}={trace_path.as_posix()}\n", encoding="utf-8")
+    tracing.shutdown_tracing()
+    try:
+        assert tracing.tracing_enabled() is True
+    finally:
+        tracing.shutdown_tracing()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from app.engine.schemas import InvoiceExtraction
+from app.engine.validator import InvoiceValidator
+from app.tests.conftest import OCR_TEXT_ROOT
+
+
+def _edge_case_extractions() -> list[InvoiceExtraction]:
+    base = {
+        "supplier_name": "Metro Coffee Roasters Pty Ltd",
+        "supplier_abn": "51 824 753 556",
+        "invoice_number": "EDGE-1",
+        "invoice_date": "2026-05-12",
+        "currency": "AUD",
+    }
+    payloads = [
+        {"total": "110.00", "gst": "10.05"},
+        {"total": "110.00", "gst": "10.06"},
+        {"total": "-110.00", "gst": "-10.00", "subtotal": "-100.00"},
+        {"total": "1000.00", "gst": "90.91", "subtotal": "909.09"},
+        {"total": "1000.00", "gst": "90.91", "buyer_abn": "12 345 678 901"},
+        {"total": "82.50", "gst": "7.50", "supplier_abn": None},
+        {"total": "330.00", "gst": None, "subtotal": "300.00"},
+        {
+            "total": "330.00",
+            "gst": "30.00",
+            "line_items": [{"amount": "100.00"}, {"amount": None}],
+        },
+        {
+            "total": "330.00",
+            "gst": "30.00",
+            "line_items": [{"amount": "150.00"}, {"amount": "150.03"}],
+        },
+        {"total": None, "gst": None, "line_items": [{"amount": "10.00"}]},
+        {"total": "330.00", "gst": "30.00", "currency": "USD", "invoice_date": "soon"},
+    ]
+    return [
+        InvoiceExtraction.model_validate(
+            {**base, "document_id": f"doc_edge_{index}", **payload}
+        )
+        for index, payload in enumerate(payloads)
+    ]
+
+
+def test_validate_many_matches_per_invoice_validation(parser):
+    extractions = [
+        parser.parse(path.read_text(encoding="utf-8"), f"doc_{path.stem}").extraction
+        for path in sorted(OCR_TEXT_ROOT.glob("*.txt"))
+    ]
+    extractions = [extraction for extraction in extractions if extraction is not None]
+    extractions.extend(_edge_case_extractions())
+    validator = InvoiceValidator()
+
+    def seen_before(supplier_abn: str, invoice_number: str, document_id: str) -> bool:
+        return invoice_number == "EDGE-1" and document_id != "doc_edge_0"
+
+    expected = [validator.validate(item, seen_before) for item in extractions]
+    actual = validator.validate_many(extractions, seen_before)
+
+    assert [result.model_dump() for result in actual] == [
+        result.model_dump() for result in expected
+    ]
+
+
+def test_validate_many_handles_empty_batch():
+    assert InvoiceValidator().validate_many([]) == []
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.api.dependencies import _build_once
+from app.engine.warmup import (
+    WARMUP_STATE,
+    WarmupState,
+    retry_warmup_if_due,
+    run_warmup,
+    start_warmup,
+    warmup_enabled,
+)
+from app.main import app
+from app.persistence.repositories import InMemoryInvoiceRepository
+
+
+def _processor() -> InvoiceProcessor:
+    return InvoiceProcessor(
+        repository=InMemoryInvoiceRepository(),
+        parser=InvoiceParser(use_llm=False),
+    )
+
+
+def test_warmup_primes_parser_rules_and_repository_in_background():
+    state = WarmupState()
+
+    start_warmup(_processor, state).join(timeout=10)
+
+    snapshot = state.snapshot()
+    assert snapshot["status"] == "ready"
+    assert {"processor", "ocr_imports", "tesseract", "parser", "validator", "mapper", "repository"} <= set(
+        snapshot["steps_ms"]
+    )
+
+
+def test_warmup_failure_keeps_worker_not_ready():
+    def broken_processor() -> InvoiceProcessor:
+        raise RuntimeError("rules file unreadable")
+
+    state = run_warmup(broken_processor, WarmupState())
+
+    assert state.ready is False
+    assert state.snapshot()["error"] == "RuntimeError: rules file unreadable"
+
+
+def test_failed_warmup_is_retried_after_a_growing_backoff():
+    now = [0.0]
+    state = WarmupState(clock=lambda: now[0])
+
+    def broken_processor() -> InvoiceProcessor:
+        raise RuntimeError("rules file unreadable")
+
+    run_warmup(broken_processor, state)
+    assert retry_warmup_if_due(_processor, state) is None
+    assert state.snapshot()["retry_in_seconds"] == 2.0
+
+    now[0] = 2.0
+    retry_warmup_if_due(broken_processor, state).join(timeout=10)
+    assert state.failures == 2 and state.snapshot()["retry_in_seconds"] == 4.0
+
+    now[0] = 6.0
+    retry_warmup_if_due(_processor, state).join(timeout=10)
+    assert state.ready is True and state.failures == 0
+    assert retry_warmup_if_due(_processor, state) is None
+
+
+def test_concurrent_first_requests_build_cached_dependencies_once():
+    builds: list[int] = []
+
+    @_build_once
+    def get_thing() -> object:
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results: list[object] = []
+    threads = [threading.Thread(target=lambda: results.append(get_thing())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(builds) == 1
+    assert len({id(item) for item in results}) == 1
+
+
+def test_ready_endpoint_reports_warmup_separately_from_health(monkeypatch):
+    monkeypatch.delenv("INVOICE_WARMUP", raising=False)
+    client = TestClient(app)
+    assert warmup_enabled() is False
+    try:
+        WARMUP_STATE.start()
+        assert client.get("/health").status_code == 200
+        warming = client.get("/ready")
+        assert warming.status_code == 503
+        assert warming.json()["status"] == "warming"
+
+        WARMUP_STATE.finish()
+        assert client.get("/ready").status_code == 200
+    finally:
+        WARMUP_STATE.status = "disabled"
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine.corrections import CorrectionService
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.engine.schemas import BulkCorrectionItem, CorrectionRequest, InvoiceExtraction
+from app.engine.validator import InvoiceValidator
+from app.persistence.repositories import InMemoryInvoiceRepository, InvoiceRepository
+
+
+OCR_TEXT_ROOT = ROOT / "app" / "tests" / "fixtures" / "ocr_text"
+CORRECTIONS = [
+    ("due_date", "2026-07-01"),
+    ("buyer_name", "Luna Cafe Pty Ltd"),
+    ("supplier_abn", "51 824 753 556"),
+    ("invoice_date", "2026-05-12"),
+    ("account_code_suggestion.suggested_account_code", "429"),
+]
+
+
+class FullRebuildProcessor(InvoiceProcessor):
+    def rebuild_result(self, existing, extraction, changed_fields=None, persist=True):
+        return super().rebuild_result(existing, extraction, persist=persist)
+
+
+def _fixture_extractions() -> list[InvoiceExtraction]:
+    parser = InvoiceParser(use_llm=False)
+    extractions = []
+    for path in sorted(OCR_TEXT_ROOT.glob("*.txt")):
+        result = parser.parse(path.read_text(encoding="utf-8"), f"doc_{path.stem}")
+        if result.extraction is not None:
+            extractions.append(result.extraction)
+    return extractions
+
+
+def _scaled_extractions(count: int) -> list[InvoiceExtraction]:
+    templates = _fixture_extractions()
+    return [
+        templates[index % len(templates)].model_copy(
+            update={"document_id": f"doc_bench_{index}"},
+        )
+        for index in range(count)
+    ]
+
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 1) if seconds else float("inf")
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _latency_summary(samples_ms: list[float]) -> dict[str, float]:
+    return {
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(_percentile(samples_ms, 50), 3),
+        "p95_ms": round(_percentile(samples_ms, 95), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def _repository(kind: str, directory: str, name: str):
+    if kind == "sqlite":
+        return InvoiceRepository(Path(directory) / f"{name}.sqlite3")
+    return InMemoryInvoiceRepository()
+
+
+def _correction_latencies(processor: InvoiceProcessor, count: int) -> list[float]:
+    texts = sorted(OCR_TEXT_ROOT.glob("*.txt"))
+    document_ids = []
+    for index in range(count):
+        path = texts[index % len(texts)]
+        result = processor.process_text(path.name, path.read_text(encoding="utf-8"))
+        if result.extraction is not None:
+            document_ids.append(result.document_id)
+
+    service = CorrectionService(processor)
+    samples_ms = []
+    for index, document_id in enumerate(document_ids):
+        field, value = CORRECTIONS[index % len(CORRECTIONS)]
+        started = time.perf_counter()
+        service.apply(document_id, CorrectionRequest(field=field, value=value))
+        samples_ms.append((time.perf_counter() - started) * 1000)
+    return samples_ms, document_ids
+
+
+def _event_bytes(repository, document_ids: list[str]) -> float:
+    sizes = [
+        len(event.model_dump_json())
+        for document_id in document_ids
+        for event in repository.load_correction_events(document_id)
+    ]
+    return round(statistics.fmean(sizes), 1) if sizes else 0.0
+
+
+def benchmark_corrections(count: int, repository_kind: str) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="invoice_bench_") as directory:
+        full, _ = _correction_latencies(
+            FullRebuildProcessor(
+                repository=_repository(repository_kind, directory, "full"),
+                parser=InvoiceParser(use_llm=False),
+            ),
+            count,
+        )
+        processor = InvoiceProcessor(
+            repository=_repository(repository_kind, directory, "incremental"),
+            parser=InvoiceParser(use_llm=False),
+        )
+        incremental, document_ids = _correction_latencies(processor, count)
+        snapshot_bytes = statistics.fmean(
+            len(processor.repository.load_invoice_result(document_id).model_dump_json())
+            for document_id in document_ids
+        )
+        event_bytes = _event_bytes(processor.repository, document_ids)
+    return {
+        "benchmark": "corrections",
+        "repository": repository_kind,
+        "invoices": count,
+        "corrections": len(incremental),
+        "full_rebuild": _latency_summary(full),
+        "incremental": _latency_summary(incremental),
+        "mean_event_bytes": event_bytes,
+        "mean_snapshot_bytes": round(snapshot_bytes, 1),
+    }
+
+
+def _processed_documents(processor: InvoiceProcessor, count: int) -> list[str]:
+    text = (OCR_TEXT_ROOT / "unmapped_ready.txt").read_text(encoding="utf-8")
+    return [processor.process_text("unmapped_ready.pdf", text).document_id for _ in range(count)]
+
+
+def benchmark_bulk_corrections(count: int) -> dict[str, Any]:
+    field = "account_code_suggestion.suggested_account_code"
+    with tempfile.TemporaryDirectory(prefix="invoice_bench_") as directory:
+        processor = InvoiceProcessor(
+            repository=InvoiceRepository(Path(directory) / "one_by_one.sqlite3"),
+            parser=InvoiceParser(use_llm=False),
+        )
+        document_ids = _processed_documents(processor, count)
+        service = CorrectionService(processor)
+        started = time.perf_counter()
+        for document_id in document_ids:
+            service.apply(document_id, CorrectionRequest(field=field, value="429"))
+        one_by_one_seconds = time.perf_counter() - started
+
+        processor = InvoiceProcessor(
+            repository=InvoiceRepository(Path(directory) / "bulk.sqlite3"),
+            parser=InvoiceParser(use_llm=False),
+        )
+        document_ids = _processed_documents(processor, count)
+        service = CorrectionService(processor)
+        items = [
+            BulkCorrectionItem(document_id=document_id, field=field, value="429")
+            for document_id in document_ids
+        ]
+        started = time.perf_counter()
+        response = service.apply_many(items)
+        bulk_seconds = time.perf_counter() - started
+
+    return {
+        "benchmark": "bulk_corrections",
+        "invoices": count,
+        "applied": response.applied,
+        "one_by_one_seconds": round(one_by_one_seconds, 4),
+        "bulk_seconds": round(bulk_seconds, 4),
+        "one_by_one_corrections_per_second": _rate(count, one_by_one_seconds),
+        "bulk_corrections_per_second": _rate(count, bulk_seconds),
+        "speedup": round(one_by_one_seconds / bulk_seconds, 2) if bulk_seconds else None,
+    }
+
+
+def benchmark_validator(count: int) -> dict[str, Any]:
+    extractions = _scaled_extractions(count)
+    validator = InvoiceValidator()
+
+    started = time.perf_counter()
+    per_invoice = [validator.validate(extraction) for extraction in extractions]
+    per_invoice_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = validator.validate_many(extractions)
+    batched_seconds = time.perf_counter() - started
+
+    return {
+        "benchmark": "validator",
+        "invoices": count,
+        "per_invoice_seconds": round(per_invoice_seconds, 4),
+        "validate_many_seconds": round(batched_seconds, 4),
+        "per_invoice_docs_per_second": _rate(count, per_invoice_seconds),
+        "validate_many_docs_per_second": _rate(count, batched_seconds),
+        "speedup": round(per_invoice_seconds / batched_seconds, 2) if batched_seconds else None,
+        "results_match": [item.model_dump() for item in per_invoice]
+        == [item.model_dump() for item in batched],
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Micro-benchmarks for invoice engine components.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    validator_command = commands.add_parser("validator", help="Compare validate() with validate_many().")
+    validator_command.add_argument("--count", type=int, default=20000, help="Number of invoices to validate.")
+    corrections_command = commands.add_parser(
+        "corrections",
+        help="Per-correction latency for incremental revalidation versus a full rebuild.",
+    )
+    corrections_command.add_argument("--count", type=int, default=200, help="Number of invoices to correct.")
+    corrections_command.add_argument(
+        "--repository",
+        choices=("sqlite", "memory"),
+        default="sqlite",
+        help="Repository backing the processor.",
+    )
+    bulk_command = commands.add_parser(
+        "bulk-corrections",
+        help="Apply the same account code correction one request at a time versus in one bulk call.",
+    )
+    bulk_command.add_argument("--count", type=int, default=500, help="Number of invoices to correct.")
+    args = arg_parser.parse_args()
+
+    if args.command == "validator":
+        report = benchmark_validator(args.count)
+    elif args.command == "corrections":
+        report = benchmark_corrections(args.count, args.repository)
+    elif args.command == "bulk-corrections":
+        report = benchmark_bulk_corrections(args.count)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine.batch import BatchProcessor
+from app.engine.parser import InvoiceParser
+from app.engine.processor import InvoiceProcessor
+from app.engine.schemas import InvoiceResult
+from app.persistence.repositories import InMemoryInvoiceRepository, InvoiceRepository
+from scripts.generate_invoice_corpus import load_corpus
+
+
+FIXTURE_ROOT = ROOT / "app" / "tests" / "fixtures"
+PDF_ROOT = FIXTURE_ROOT / "invoices"
+OCR_TEXT_ROOT = FIXTURE_ROOT / "ocr_text"
+BASELINE_PATH = ROOT / "benchmarks" / "baseline.json"
+STAGE_FIELDS = ("ocr_ms", "llm_ms", "parse_ms", "validation_ms", "mapping_ms", "persistence_ms", "total_ms")
+WORKLOADS = ("pdf", "text")
+DEFAULT_SCALE = 200
+DEFAULT_REPEATS = 5
+# Differences below these are run-to-run noise, whatever the relative change.
+NOISE_FLOOR_MS = 1.0
+NOISE_FLOOR_MB = 1.0
+
+
+class StubLLMParser(InvoiceParser):
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__(use_llm=True, max_attempts=3)
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _call_llm(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        text = prompt.rsplit("Invoice text:\n", 1)[-1]
+        extraction = self._parse_deterministically(text, "doc_stub").extraction
+        if extraction is None:
+            return "{}"
+        return extraction.model_dump_json(exclude={"document_id", "field_sources", "original_extracted_values"})
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _stage_summary(results: list[InvoiceResult]) -> dict[str, dict[str, float]]:
+    summary = {}
+    for field in STAGE_FIELDS:
+        values = [getattr(result.timings, field) for result in results if result.timings is not None]
+        if not values:
+            continue
+        summary[field] = {
+            "p50": round(_percentile(values, 50), 3),
+            "p95": round(_percentile(values, 95), 3),
+            "p99": round(_percentile(values, 99), 3),
+            "mean": round(statistics.fmean(values), 3),
+        }
+    return summary
+
+
+def load_corpus_specs(corpus: Path, scale: int | None) -> list[tuple[str, str | None, bytes | str]]:
+    specs = []
+    for row in load_corpus(corpus, scale):
+        path = corpus / row["path"]
+        if path.suffix == ".txt":
+            specs.append((f"{path.stem}.pdf", None, path.read_text(encoding="utf-8")))
+        else:
+            specs.append((path.name, "application/pdf", path.read_bytes()))
+    return specs
+
+
+def load_specs(workload: str, scale: int | None, corpus: Path | None = None) -> list[tuple[str, str | None, bytes | str]]:
+    if workload == "corpus":
+        return load_corpus_specs(corpus, scale)
+    scale = scale or DEFAULT_SCALE
+    if workload == "pdf":
+        templates = [(path.name, "application/pdf", path.read_bytes()) for path in sorted(PDF_ROOT.glob("*.pdf"))]
+    else:
+        templates = [
+            (f"{path.stem}.pdf", None, path.read_text(encoding="utf-8"))
+            for path in sorted(OCR_TEXT_ROOT.glob("*.txt"))
+        ]
+    count = max(scale, len(templates))
+    return [templates[index % len(templates)] for index in range(count)]
+
+
+def _batch_processor(
+    repository_kind: str,
+    directory: str,
+    llm_latency_ms: float,
+    llm_base_url: str | None = None,
+) -> BatchProcessor:
+    repository = (
+        InvoiceRepository(Path(directory) / "benchmark.sqlite3")
+        if repository_kind == "sqlite"
+        else InMemoryInvoiceRepository()
+    )
+    parser = (
+        InvoiceParser(use_llm=True, max_attempts=3, base_url=llm_base_url)
+        if llm_base_url
+        else StubLLMParser(llm_latency_ms)
+    )
+    processor = InvoiceProcessor(repository=repository, parser=parser)
+    return BatchProcessor(processor)
+
+
+def _run_batch(batch_processor: BatchProcessor, specs: list) -> list[InvoiceResult]:
+    pdfs = [spec for spec in specs if spec[1] is not None]
+    texts = [(filename, text) for filename, content_type, text in specs if content_type is None]
+    results = []
+    if pdfs:
+        results.extend(batch_processor.process_pdfs(pdfs).results)
+    if texts:
+        results.extend(batch_processor.process_texts(texts).results)
+    return results
+
+
+def _median_stages(summaries: list[dict[str, dict[str, float]]]) -> dict[str, dict[str, float]]:
+    stages = {}
+    for field in summaries[0]:
+        stages[field] = {
+            stat: round(statistics.median(summary[field][stat] for summary in summaries), 3)
+            for stat in summaries[0][field]
+        }
+    return stages
+
+
+def run_workload(
+    workload: str,
+    scale: int | None,
+    repository_kind: str,
+    llm_latency_ms: float,
+    measure_memory: bool = True,
+    corpus: Path | None = None,
+    llm_base_url: str | None = None,
+    repeats: int = DEFAULT_REPEATS,
+) -> dict[str, Any]:
+    specs = load_specs(workload, scale, corpus)
+    rates = []
+    summaries = []
+    for _ in range(max(1, repeats)):
+        with tempfile.TemporaryDirectory(prefix="invoice_pipeline_bench_") as directory:
+            batch_processor = _batch_processor(repository_kind, directory, llm_latency_ms, llm_base_url)
+            _run_batch(batch_processor, specs[:2])
+            gc.collect()
+            started = time.perf_counter()
+            results = _run_batch(batch_processor, specs)
+            elapsed = time.perf_counter() - started
+        rates.append(len(results) / elapsed)
+        summaries.append(_stage_summary(results))
+    p95s = [summary["total_ms"]["p95"] for summary in summaries if "total_ms" in summary]
+
+    peak_memory_mb = None
+    if measure_memory:
+        with tempfile.TemporaryDirectory(prefix="invoice_pipeline_bench_") as directory:
+            batch_processor = _batch_processor(repository_kind, directory, llm_latency_ms, llm_base_url)
+            _run_batch(batch_processor, specs[:2])
+            gc.collect()
+            tracemalloc.start()
+            _run_batch(batch_processor, specs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        peak_memory_mb = round(peak / (1024 * 1024), 2)
+
+    statuses: dict[str, int] = {}
+    for result in results:
+        statuses[result.status.value] = statuses.get(result.status.value, 0) + 1
+    return {
+        "documents": len(results),
+        "repeats": len(rates),
+        "docs_per_second": round(statistics.median(rates), 2),
+        "docs_per_second_range": [round(min(rates), 2), round(max(rates), 2)],
+        "stages_ms": _median_stages(summaries),
+        "total_p95_ms_range": [min(p95s), max(p95s)] if p95s else None,
+        "peak_memory_mb": peak_memory_mb,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def configuration(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "scale": args.scale if args.corpus is not None else args.scale or DEFAULT_SCALE,
+        "corpus": str(args.corpus) if args.corpus is not None else None,
+        "repository": args.repository,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_base_url": args.llm_base_url,
+    }
+
+
+def find_baseline(baselines: list[dict[str, Any]], config: dict[str, Any]) -> dict[str, Any] | None:
+    for entry in baselines:
+        if entry.get("configuration") == config:
+            return entry
+    return None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    # Passes on a shared machine drift together, so a regression is only reported when even the
+    # best current pass is worse than the worst baseline pass by the threshold and the noise floor.
+    regressions = []
+    for workload, run in current.items():
+        reference = baseline.get(workload)
+        if not reference:
+            continue
+        best_rate = run["docs_per_second_range"][1]
+        worst_baseline_rate = reference["docs_per_second_range"][0]
+        if (
+            best_rate < worst_baseline_rate * (1 - threshold)
+            and 1000 / best_rate - 1000 / worst_baseline_rate > NOISE_FLOOR_MS
+        ):
+            regressions.append(
+                f"{workload}: docs/sec {run['docs_per_second']} (best {best_rate}) "
+                f"< baseline {reference['docs_per_second']} (worst {worst_baseline_rate})"
+            )
+        if run["total_p95_ms_range"] and reference.get("total_p95_ms_range"):
+            best_p95 = run["total_p95_ms_range"][0]
+            worst_baseline_p95 = reference["total_p95_ms_range"][1]
+            if best_p95 > worst_baseline_p95 * (1 + threshold) and best_p95 - worst_baseline_p95 > NOISE_FLOOR_MS:
+                regressions.append(
+                    f"{workload}: p95 total_ms {run['stages_ms']['total_ms']['p95']} (best {best_p95}) "
+                    f"> baseline {reference['stages_ms']['total_ms']['p95']} (worst {worst_baseline_p95})"
+                )
+        current_memory = run.get("peak_memory_mb")
+        baseline_memory = reference.get("peak_memory_mb")
+        if (
+            current_memory is not None
+            and baseline_memory
+            and current_memory > baseline_memory * (1 + threshold)
+            and current_memory - baseline_memory > NOISE_FLOOR_MB
+        ):
+            regressions.append(f"{workload}: peak memory {current_memory}MB > baseline {baseline_memory}MB")
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description="End-to-end pipeline benchmark with a stubbed LLM and stored baselines.",
+    )
+    arg_parser.add_argument("--workload", choices=(*WORKLOADS, "all"), default="all")
+    arg_parser.add_argument(
+        "--scale",
+        type=int,
+        default=None,
+        help=f"Documents per workload; fixtures are repeated (default {DEFAULT_SCALE}), corpora are truncated.",
+    )
+    arg_parser.add_argument(
+        "--corpus",
+        type=Path,
+        default=None,
+        help="Benchmark a corpus from scripts/generate_invoice_corpus.py instead of the fixtures.",
+    )
+    arg_parser.add_argument("--repository", choices=("sqlite", "memory"), default="sqlite")
+    arg_parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated stub LLM latency per call.")
+    arg_parser.add_argument(
+        "--llm-base-url",
+        default=None,
+        help="Send LLM calls over HTTP to this base URL (e.g. scripts/llm_stub_server.py) instead of in-process.",
+    )
+    arg_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=DEFAULT_REPEATS,
+        help="Timed passes per workload; throughput and stage timings are the median across passes.",
+    )
+    arg_parser.add_argument("--skip-memory", action="store_true", help="Skip the tracemalloc pass.")
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%).")
+    arg_parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store this run as the baseline for its configuration (scale, corpus, repository, LLM settings).",
+    )
+    args = arg_parser.parse_args()
+
+    if args.llm_base_url:
+        # The stub server ignores the key, but the parser refuses to call out without one.
+        os.environ.setdefault("GROQ_API_KEY", "local-stub-key")
+    if args.corpus is not None:
+        workloads = ("corpus",)
+    else:
+        workloads = WORKLOADS if args.workload == "all" else (args.workload,)
+    runs = {
+        workload: run_workload(
+            workload,
+            args.scale,
+            args.repository,
+            args.llm_latency_ms,
+            measure_memory=not args.skip_memory,
+            corpus=args.corpus,
+            llm_base_url=args.llm_base_url,
+            repeats=args.repeats,
+        )
+        for workload in workloads
+    }
+    config = configuration(args)
+    report: dict[str, Any] = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "configuration": config,
+        "workloads": runs,
+    }
+    baselines = []
+    if args.baseline.exists():
+        baselines = json.loads(args.baseline.read_text(encoding="utf-8")).get("configurations", [])
+    stored = find_baseline(baselines, config)
+
+    if args.update_baseline:
+        entry = dict(report, workloads={**(stored or {}).get("workloads", {}), **runs})
+        baselines = [item for item in baselines if item is not stored] + [entry]
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"configurations": baselines}, indent=2) + "\n", encoding="utf-8")
+        report["baseline"] = "updated"
+        print(json.dumps(report, indent=2))
+        return
+
+    # Only a baseline recorded with the same configuration is comparable; anything else is reported, not judged.
+    regressions = compare(runs, stored["workloads"], args.threshold) if stored else []
+    if stored:
+        report["baseline"] = str(args.baseline.relative_to(ROOT) if args.baseline.is_relative_to(ROOT) else args.baseline)
+    else:
+        report["baseline"] = None
+    report["regressions"] = regressions
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
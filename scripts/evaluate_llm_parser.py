@@ -3,8 +3,12 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import statistics
 import sys
+import threading
+import time
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
 from decimal import Decimal
 from pathlib import Path
@@ -14,15 +18,19 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 from app.engine.batch import BatchProcessor
+from app.engine.llm_cassette import CASSETTE_MODES, LLMCassette
+from app.engine.llm_usage import estimate_cost_usd
 from app.engine.parser import InvoiceParser, JSON_SCHEMA_HINT
 from app.engine.processor import InvoiceProcessor
-from app.engine.schemas import InvoiceExtraction, InvoiceResult, LineItem
+from app.engine.project_env import ensure_project_env
+from app.engine.schemas import InvoiceExtraction, InvoiceResult, LineItem, ParserResult
 from app.persistence.repositories import InMemoryInvoiceRepository
 
 
 CASES_PATH = ROOT / "app" / "tests" / "fixtures" / "expected" / "llm_noisy_invoice_cases.json"
 RESULTS_PATH = ROOT / "LLM_EVALUATION_RESULTS.json"
 REPORT_PATH = ROOT / "LLM_EVALUATION_REPORT.md"
+CASSETTE_DIR = ROOT / "app" / "tests" / "fixtures" / "cassettes" / "llm_evaluation"
 FIELDS = [
     "supplier_name",
     "supplier_abn",
@@ -39,6 +47,12 @@ FIELDS = [
 
 
 class LegacyPromptParser(InvoiceParser):
+    def _system_prompt(self) -> str:
+        return (
+            "You extract invoice data into strict JSON only. "
+            "You do not decide approval, readiness, validation, or account codes."
+        )
+
     def _build_prompt(self, text: str, previous_output: str | None) -> str:
         repair = ""
         if previous_output:
@@ -90,6 +104,66 @@ class LegacyPromptParser(InvoiceParser):
         return extraction
 
 
+class PrecomputedParser:
+    # Replays parser results computed concurrently, so the pipeline (and duplicate detection)
+    # still sees cases in their original order.
+    def __init__(self, parser: InvoiceParser, results: dict[str, ParserResult]):
+        self.parser = parser
+        self.use_llm = parser.use_llm
+        self.results = results
+
+    def parse(self, text: str, document_id: str) -> ParserResult:
+        result = self.results[text]
+        if result.extraction is None:
+            return result
+        return result.model_copy(
+            update={"extraction": result.extraction.model_copy(update={"document_id": document_id})}
+        )
+
+
+def _percentile(values: list[float], percentile: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(percentile / 100 * (len(ordered) - 1)))]
+
+
+def _parse_cases(
+    parser: InvoiceParser,
+    cases: list[dict[str, Any]],
+    concurrency: int,
+) -> tuple[dict[str, ParserResult], dict[str, float]]:
+    def timed_parse(case: dict[str, Any]) -> tuple[ParserResult, float]:
+        started = time.perf_counter()
+        result = parser.parse(case["text"], f"doc_eval_{case['name']}")
+        return result, (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        outcomes = list(executor.map(timed_parse, cases))
+    results = {case["text"]: result for case, (result, _) in zip(cases, outcomes)}
+    wall_ms = {case["name"]: wall for case, (_, wall) in zip(cases, outcomes)}
+    return results, wall_ms
+
+
+def _tier_summary(results) -> dict[str, dict[str, Any]]:
+    tiers: dict[str, dict[str, Any]] = {}
+    for result in results:
+        if result.llm_usage is None:
+            continue
+        for attempt in result.llm_usage.attempts:
+            tier = tiers.setdefault(attempt.model or "unknown", {"attempts": 0, "tokens": 0, "latency_ms": []})
+            tier["attempts"] += 1
+            tier["tokens"] += attempt.total_tokens
+            tier["latency_ms"].append(attempt.latency_ms)
+    for tier in tiers.values():
+        latencies = tier.pop("latency_ms")
+        tier["latency_ms"] = {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+        }
+    return tiers
+
+
 def _normalize(value: Any) -> str | None:
     if value is None:
         return None
@@ -128,14 +202,21 @@ def _result_sources(result: InvoiceResult) -> dict[str, int]:
     return dict(sorted(counts.items()))
 
 
-def evaluate(label: str, legacy: bool) -> dict[str, Any]:
+def evaluate(
+    label: str,
+    legacy: bool,
+    cassette: LLMCassette | None = None,
+    concurrency: int = 1,
+    prices: tuple[float, float] | None = None,
+) -> dict[str, Any]:
     cases = json.loads(CASES_PATH.read_text(encoding="utf-8"))
-    parser = LegacyPromptParser() if legacy else InvoiceParser()
+    parser_class = LegacyPromptParser if legacy else InvoiceParser
+    parser = parser_class(cassette=cassette)
     run: dict[str, Any] = {
         "label": label,
         "timestamp": datetime.now(UTC).isoformat(),
         "llm_enabled": parser.use_llm,
-        "model": os.getenv("GROQ_MODEL", "llama-3.1-8b-instant") if parser.use_llm else None,
+        "model": ",".join(parser.model_tiers) if parser.use_llm else None,
         "prompt_version": "legacy" if legacy else getattr(__import__("app.engine.parser", fromlist=["PROMPT_VERSION"]), "PROMPT_VERSION", "unknown"),
         "cases": len(cases),
         "field_accuracy": {},
@@ -145,6 +226,18 @@ def evaluate(label: str, legacy: bool) -> dict[str, Any]:
         "review_rate": None,
         "parser_failures": 0,
         "llm_calls": 0,
+        "concurrency": concurrency,
+        "latency_ms": None,
+        "tokens": None,
+        "cost_usd": None,
+        "cassette": None,
+        "response_format": parser.response_format if parser.use_llm else None,
+        "llm_mode": parser.llm_mode,
+        "repair_attempts": 0,
+        "escalations": 0,
+        "tiers": {},
+        "prompt_compaction": {"token_budget": parser.prompt_token_budget} if parser.prompt_compaction else None,
+        "seconds": None,
         "legacy_prompt": legacy,
         "case_results": [],
     }
@@ -153,17 +246,23 @@ def evaluate(label: str, legacy: bool) -> dict[str, Any]:
         run["skipped_reason"] = "GROQ_API_KEY was not available or was placeholder-like."
         return run
 
+    started = time.perf_counter()
+
     original_call_llm = parser._call_llm
+    calls_lock = threading.Lock()
 
     def counted_call_llm(prompt: str) -> str:
-        run["llm_calls"] += 1
+        with calls_lock:
+            run["llm_calls"] += 1
         return original_call_llm(prompt)
 
     parser._call_llm = counted_call_llm  # type: ignore[method-assign]
 
+    parser_results, parse_wall_ms = _parse_cases(parser, cases, concurrency)
+    run["response_format"] = parser.response_format
     processor = InvoiceProcessor(
         repository=InMemoryInvoiceRepository(),
-        parser=parser,
+        parser=PrecomputedParser(parser, parser_results),
     )
     batch = BatchProcessor(processor).process_texts(
         [(f"{case['name']}.pdf", case["text"]) for case in cases]
@@ -196,9 +295,17 @@ def evaluate(label: str, legacy: bool) -> dict[str, Any]:
         items_match = _line_items_match(result, expected_items)
         line_item_correct += int(items_match)
         issues = [issue.code for issue in result.validation.issues]
+        usage = parser_results[case["text"]].llm_usage
+        timings = result.timings
         run["case_results"].append(
             {
                 "name": case["name"],
+                "wall_ms": round(parse_wall_ms[case["name"]] + (timings.total_ms if timings else 0.0), 3),
+                "llm_attempts": timings.llm_attempts if timings else 0,
+                "prompt_tokens": usage.prompt_tokens if usage else 0,
+                "cached_tokens": usage.cached_tokens if usage else 0,
+                "escalations": usage.escalations if usage else [],
+                "completion_tokens": usage.completion_tokens if usage else 0,
                 "expected_status": expected_status,
                 "actual_status": actual_status,
                 "field_matches": field_matches,
@@ -219,6 +326,38 @@ def evaluate(label: str, legacy: bool) -> dict[str, Any]:
     run["status_accuracy"] = round(status_correct / len(cases), 4)
     run["line_items_accuracy"] = round(line_item_correct / len(cases), 4)
     run["review_rate"] = round(review_count / len(cases), 4)
+    run["seconds"] = round(time.perf_counter() - started, 3)
+    wall_times = [item["wall_ms"] for item in run["case_results"]]
+    run["latency_ms"] = {
+        "p50": round(_percentile(wall_times, 50), 3),
+        "p95": round(_percentile(wall_times, 95), 3),
+        "max": round(max(wall_times), 3),
+        "mean": round(statistics.fmean(wall_times), 3),
+    }
+    run["repair_attempts"] = sum(max(0, item["llm_attempts"] - 1) for item in run["case_results"])
+    run["escalations"] = sum(bool(item.get("escalations")) for item in run["case_results"])
+    run["tiers"] = _tier_summary(parser_results.values())
+    prompt_tokens = sum(item["prompt_tokens"] for item in run["case_results"])
+    completion_tokens = sum(item["completion_tokens"] for item in run["case_results"])
+    cached_tokens = sum(item.get("cached_tokens", 0) for item in run["case_results"])
+    run["tokens"] = {
+        "prompt": prompt_tokens,
+        "cached": cached_tokens,
+        "completion": completion_tokens,
+        "total": prompt_tokens + completion_tokens,
+    }
+    if prices is not None:
+        run["cost_usd"] = round((prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000, 6)
+    else:
+        costs = [
+            estimate_cost_usd(attempt.prompt_tokens, attempt.completion_tokens, attempt.model, attempt.cached_tokens)
+            for result in parser_results.values()
+            if result.llm_usage is not None
+            for attempt in result.llm_usage.attempts
+        ]
+        run["cost_usd"] = round(sum(costs), 6) if costs and None not in costs else None
+    if parser.cassette is not None:
+        run["cassette"] = {"mode": parser.cassette.mode, **parser.cassette.stats}
     return run
 
 
@@ -238,6 +377,16 @@ def _pct(value: float | None) -> str:
     return f"{value * 100:.1f}%"
 
 
+def _latency(run: dict[str, Any], key: str) -> str:
+    latency = run.get("latency_ms") or {}
+    return str(latency.get(key, "n/a"))
+
+
+def _tokens(run: dict[str, Any]) -> str:
+    tokens = run.get("tokens") or {}
+    return str(tokens.get("total", "n/a"))
+
+
 def write_report(runs: list[dict[str, Any]]) -> None:
     lines: list[str] = [
         "# LLM Evaluation Report",
@@ -261,6 +410,10 @@ def write_report(runs: list[dict[str, Any]]) -> None:
                 f"| False-ready approvals | {before.get('false_ready', 'n/a')} | {after.get('false_ready', 'n/a')} |",
                 f"| Review rate | {_pct(before.get('review_rate'))} | {_pct(after.get('review_rate'))} |",
                 f"| Parser failures | {before.get('parser_failures', 'n/a')} | {after.get('parser_failures', 'n/a')} |",
+                f"| p50 latency (ms) | {_latency(before, 'p50')} | {_latency(after, 'p50')} |",
+                f"| p95 latency (ms) | {_latency(before, 'p95')} | {_latency(after, 'p95')} |",
+                f"| Total tokens | {_tokens(before)} | {_tokens(after)} |",
+                f"| Cost (USD) | {before.get('cost_usd') or 'n/a'} | {after.get('cost_usd') or 'n/a'} |",
                 "",
             ]
         )
@@ -275,15 +428,35 @@ def write_report(runs: list[dict[str, Any]]) -> None:
                 f"- Model: `{run.get('model')}`",
                 f"- Prompt version: `{run.get('prompt_version')}`",
                 f"- Legacy prompt: `{run.get('legacy_prompt')}`",
-                f"- LLM calls attempted: `{run.get('llm_calls')}`",
+                f"- LLM calls attempted: `{run.get('llm_calls')}` "
+                f"(`{run.get('repair_attempts', 'n/a')}` repairs, response format `{run.get('response_format')}`, mode `{run.get('llm_mode', 'full')}`)",
+                f"- Run time: `{run.get('seconds')}s` at concurrency `{run.get('concurrency', 1)}`",
                 f"- Cases: `{run['cases']}`",
             ]
         )
+        if run.get("prompt_compaction"):
+            lines.append(f"- Prompt compaction: token budget `{run['prompt_compaction']['token_budget']}`")
+        cassette = run.get("cassette")
+        if cassette:
+            lines.append(
+                f"- Cassette: `{cassette['mode']}` ({cassette['hits']} replayed, {cassette['recorded']} recorded, "
+                f"{cassette['misses'] - cassette['recorded']} missing; "
+                f"{cassette['prompt_chars']} prompt chars, {cassette['response_chars']} response chars)"
+            )
         if run.get("skipped_reason"):
             lines.extend(["", f"Skipped: {run['skipped_reason']}", ""])
             continue
+        for model, tier in (run.get("tiers") or {}).items():
+            lines.append(
+                f"- Tier `{model}`: {tier['attempts']} attempts, {tier['tokens']} tokens, "
+                f"p50/p95 `{tier['latency_ms']['p50']}ms` / `{tier['latency_ms']['p95']}ms`"
+            )
+        if run.get("tiers") and len(run["tiers"]) > 1:
+            lines.append(f"- Escalated documents: `{run.get('escalations', 0)}`")
         lines.extend(
             [
+                f"- Latency p50/p95: `{_latency(run, 'p50')}ms` / `{_latency(run, 'p95')}ms`",
+                f"- Tokens: `{_tokens(run)}` total (`{(run.get('tokens') or {}).get('cached', 0)}` prompt tokens cached), cost `{run.get('cost_usd') or 'n/a'}` USD",
                 f"- Status accuracy: `{_pct(run.get('status_accuracy'))}`",
                 f"- Line item accuracy: `{_pct(run.get('line_items_accuracy'))}`",
                 f"- False-ready approvals: `{run['false_ready']}`",
@@ -300,30 +473,88 @@ def write_report(runs: list[dict[str, Any]]) -> None:
             lines.append(
                 f"| {field} | {metric['correct']} | {metric['total']} | {_pct(metric['accuracy'])} |"
             )
-        lines.extend(["", "### Case Results", "", "| Case | Expected | Actual | Issues | Sources |", "| --- | --- | --- | --- | --- |"])
+        lines.extend(
+            [
+                "",
+                "### Case Results",
+                "",
+                "| Case | Expected | Actual | Wall ms | Attempts | Tokens | Issues | Sources |",
+                "| --- | --- | --- | ---: | ---: | ---: | --- | --- |",
+            ]
+        )
         for item in run["case_results"]:
             issues = ", ".join(item["issues"]) or "-"
             sources = ", ".join(f"{key}:{value}" for key, value in item["sources"].items()) or "-"
+            tokens = item.get("prompt_tokens", 0) + item.get("completion_tokens", 0)
             lines.append(
-                f"| {item['name']} | {item['expected_status']} | {item['actual_status']} | {issues} | {sources} |"
+                f"| {item['name']} | {item['expected_status']} | {item['actual_status']} | "
+                f"{item.get('wall_ms', 'n/a')} | {item.get('llm_attempts', 'n/a')} | {tokens or 'n/a'} | {issues} | {sources} |"
             )
         lines.append("")
     REPORT_PATH.write_text("\n".join(lines), encoding="utf-8")
 
 
 def main() -> None:
+    # The argument defaults read INVOICE_LLM_* settings, so .env has to be loaded first.
+    ensure_project_env()
     arg_parser = argparse.ArgumentParser(description="Evaluate the real LLM parser on noisy synthetic invoices.")
     arg_parser.add_argument("--label", required=True, help="Run label, e.g. baseline or after_improvements.")
     arg_parser.add_argument("--reset", action="store_true", help="Discard previous saved evaluation runs.")
     arg_parser.add_argument("--legacy", action="store_true", help="Use the legacy prompt/completion behavior for a before baseline.")
+    arg_parser.add_argument(
+        "--cassette-mode",
+        choices=sorted(CASSETTE_MODES),
+        default=os.getenv("INVOICE_LLM_CASSETTE_MODE", "off"),
+        help="replay: offline from recorded outputs; record_new: only new prompts hit the API; record: re-record all.",
+    )
+    arg_parser.add_argument("--cassette-dir", type=Path, default=CASSETTE_DIR)
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="Cases parsed in parallel.")
+    arg_parser.add_argument(
+        "--prices",
+        type=float,
+        nargs=2,
+        metavar=("PROMPT", "COMPLETION"),
+        default=None,
+        help="USD per million prompt and completion tokens (default: known list price for GROQ_MODEL).",
+    )
+    arg_parser.add_argument(
+        "--response-format",
+        choices=("json_schema", "json_object", "text"),
+        default=None,
+        help="Structured-output mode requested from the provider (default: GROQ_RESPONSE_FORMAT or json_schema).",
+    )
+    arg_parser.add_argument(
+        "--model-tiers",
+        default=None,
+        help="Comma-separated models, smallest first; later tiers only see documents the earlier ones got wrong.",
+    )
+    arg_parser.add_argument(
+        "--llm-mode",
+        choices=("full", "missing_fields"),
+        default=None,
+        help="missing_fields asks the LLM only for fields the deterministic parser missed.",
+    )
+    arg_parser.add_argument("--prompt-compaction", action="store_true", help="Send only the relevant invoice regions to the LLM.")
+    arg_parser.add_argument("--prompt-token-budget", type=int, default=None, help="Estimated tokens above which invoice text is compacted.")
     args = arg_parser.parse_args()
 
+    if args.response_format:
+        os.environ["GROQ_RESPONSE_FORMAT"] = args.response_format
+    if args.llm_mode:
+        os.environ["INVOICE_LLM_MODE"] = args.llm_mode
+    if args.model_tiers:
+        os.environ["GROQ_MODEL_TIERS"] = args.model_tiers
+    if args.prompt_compaction:
+        os.environ["INVOICE_PROMPT_COMPACTION"] = "1"
+    if args.prompt_token_budget is not None:
+        os.environ["INVOICE_PROMPT_TOKEN_BUDGET"] = str(args.prompt_token_budget)
+    cassette = None if args.cassette_mode == "off" else LLMCassette(args.cassette_dir, args.cassette_mode)
     runs = [] if args.reset else load_runs()
-    run = evaluate(args.label, args.legacy)
+    run = evaluate(args.label, args.legacy, cassette, args.concurrency, tuple(args.prices) if args.prices else None)
     runs.append(run)
     save_runs(runs)
     write_report(runs)
-    print(json.dumps({key: run.get(key) for key in ("label", "llm_enabled", "status_accuracy", "line_items_accuracy", "false_ready", "review_rate", "parser_failures", "skipped_reason")}, indent=2))
+    print(json.dumps({key: run.get(key) for key in ("label", "llm_enabled", "status_accuracy", "line_items_accuracy", "false_ready", "review_rate", "parser_failures", "llm_calls", "repair_attempts", "escalations", "tiers", "response_format", "llm_mode", "concurrency", "seconds", "latency_ms", "tokens", "cost_usd", "cassette", "prompt_compaction", "skipped_reason")}, indent=2))
     print(f"Report written to {REPORT_PATH}")
 
 
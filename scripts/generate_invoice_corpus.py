@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine.validator import ABN_WEIGHTS
+
+
+KINDS = ("text_pdf", "scanned_pdf", "ocr_text", "multipage_pdf", "long_table_pdf")
+DEFAULT_MIX = "text_pdf=0.4,scanned_pdf=0.1,ocr_text=0.2,multipage_pdf=0.15,long_table_pdf=0.15"
+LINES_PER_PAGE = 48
+MANIFEST_NAME = "ground_truth.jsonl"
+SUMMARY_NAME = "corpus.json"
+
+SUPPLIER_PREFIXES = (
+    "Metro", "Harbour", "Fresh", "City", "Coastal", "Southern", "Bean", "Summit", "Northside",
+    "Golden", "Urban", "Riverside", "Outback", "Bayside", "Central", "Evergreen",
+)
+SUPPLIER_NOUNS = (
+    "Coffee Roasters", "Farms Produce", "Utilities", "Cleaning Services", "Office Supplies",
+    "Dairy Co", "Bakery", "Logistics", "IT Services", "Packaging", "Plumbing", "Print House",
+)
+BUYERS = ("Luna Cafe Pty Ltd", "Sunrise Bistro Pty Ltd", "Copper Kettle Pty Ltd", "Blue Door Eatery")
+ITEMS = (
+    ("Espresso beans 1kg", 18, 45), ("Milk crate", 20, 60), ("Vegetables", 30, 120),
+    ("Fruit boxes", 40, 110), ("Electricity supply", 150, 900), ("Cleaning service", 80, 400),
+    ("Paper towels", 10, 40), ("Printer toner", 60, 180), ("Delivery fee", 10, 35),
+    ("Software subscription", 20, 150), ("Grinder parts", 25, 220), ("Takeaway cups", 15, 70),
+)
+# OCR confusions the deterministic parser and the LLM prompt are expected to survive.
+NOISE_SUBSTITUTIONS = (
+    ("GST:", "G5T:"),
+    ("Total:", "T0tal due:"),
+    ("Invoice Number:", "lnvoice Number:"),
+    ("Subtotal:", "Sub total:"),
+    ("Supplier ABN:", "Supplier A8N:"),
+    ("Pty Ltd", "Pty Lld"),
+)
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def generate_abn(rng: random.Random) -> str:
+    body = [rng.randint(0, 9) for _ in range(9)]
+    remainder = sum(weight * digit for weight, digit in zip(ABN_WEIGHTS[2:], body)) % 89
+    # 10 * (first - 1) + second covers 0..89, so exactly one prefix balances the checksum.
+    prefix = (89 - remainder) % 89
+    digits = [prefix // 10 + 1, prefix % 10, *body]
+    text = "".join(str(digit) for digit in digits)
+    return f"{text[:2]} {text[2:5]} {text[5:8]} {text[8:]}"
+
+
+def _line_items(rng: random.Random, count: int) -> list[dict[str, Any]]:
+    items = []
+    for _ in range(count):
+        description, low, high = rng.choice(ITEMS)
+        quantity = rng.randint(1, 6)
+        unit_price = _money(Decimal(rng.randint(low * 100, high * 100)) / 100)
+        amount = _money(unit_price * quantity)
+        items.append(
+            {
+                "description": description,
+                "quantity": quantity,
+                "unit_price": str(unit_price),
+                "amount": str(amount),
+                "gst": str(_money(amount / 10)),
+            }
+        )
+    return items
+
+
+def build_invoice(index: int, kind: str, seed: int, noise_rate: float) -> dict[str, Any]:
+    rng = random.Random(seed * 1_000_003 + index)
+    item_count = rng.randint(40, 200) if kind == "long_table_pdf" else rng.randint(1, 8)
+    items = _line_items(rng, item_count)
+    subtotal = _money(sum(Decimal(item["amount"]) for item in items))
+    gst = _money(subtotal / 10)
+    # Per-line rounding drifts on long tables; the last line absorbs it so the invoice stays consistent.
+    drift = gst - sum(Decimal(item["gst"]) for item in items)
+    items[-1]["gst"] = str(Decimal(items[-1]["gst"]) + drift)
+    supplier = f"{rng.choice(SUPPLIER_PREFIXES)} {rng.choice(SUPPLIER_NOUNS)} Pty Ltd"
+    initials = "".join(word[0] for word in supplier.split()[:2]).upper()
+    invoice_date = date(2026, 1, 1) + timedelta(days=rng.randint(0, 270))
+    truth = {
+        "supplier_name": supplier,
+        "supplier_abn": generate_abn(rng),
+        "invoice_number": f"{initials}-{index:07d}",
+        "invoice_date": invoice_date.isoformat(),
+        "due_date": (invoice_date + timedelta(days=rng.choice((7, 14, 30)))).isoformat(),
+        "buyer_name": rng.choice(BUYERS),
+        "subtotal": str(subtotal),
+        "gst": str(gst),
+        "total": str(subtotal + gst),
+        "currency": "AUD",
+        "line_items": items,
+    }
+    noise = []
+    if rng.random() < noise_rate:
+        noise = [pair for pair in NOISE_SUBSTITUTIONS if rng.random() < 0.5] or [rng.choice(NOISE_SUBSTITUTIONS)]
+    return {"index": index, "kind": kind, "truth": truth, "noise": [original for original, _ in noise], "_noise": noise}
+
+
+def render_pages(invoice: dict[str, Any]) -> list[list[str]]:
+    truth = invoice["truth"]
+    header = [
+        "Tax Invoice",
+        f"Supplier: {truth['supplier_name']}",
+        f"Supplier ABN: {truth['supplier_abn']}",
+        f"Invoice Number: {truth['invoice_number']}",
+        f"Invoice Date: {truth['invoice_date']}",
+        f"Due Date: {truth['due_date']}",
+        f"Buyer: {truth['buyer_name']}",
+    ]
+    items = ["Line Items:"] + [
+        f"{item['description']} | {item['quantity']} | {item['unit_price']} | {item['amount']} | {item['gst']}"
+        for item in truth["line_items"]
+    ]
+    totals = [
+        f"Subtotal: ${truth['subtotal']}",
+        f"GST: ${truth['gst']}",
+        f"Total: ${truth['total']}",
+        f"Currency: {truth['currency']}",
+    ]
+    if invoice["kind"] == "multipage_pdf":
+        statement = [
+            "Statement of Account",
+            f"Account: {truth['buyer_name']}",
+            "Previous balance paid with thanks.",
+            "Payment terms: see due date above.",
+        ]
+        pages = [header + totals + items, statement]
+    else:
+        lines = header + totals + items
+        pages = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)]
+    for original, replacement in invoice["_noise"]:
+        pages = [[line.replace(original, replacement) for line in page] for page in pages]
+    return pages
+
+
+def _escape_pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_text_pdf(pages: list[list[str]]) -> bytes:
+    page_count = len(pages)
+    font_id = 3 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{3 + 2 * page} 0 R" for page in range(page_count))
+            + f"] /Count {page_count} >>"
+        ).encode("ascii"),
+    ]
+    for page_index, lines in enumerate(pages):
+        content_lines = ["BT", "/F1 9 Tf", "50 790 Td", "13 TL"]
+        for line in lines[:LINES_PER_PAGE]:
+            content_lines.append(f"({_escape_pdf_text(line)}) Tj")
+            content_lines.append("T*")
+        content_lines.append("ET")
+        content = "\n".join(content_lines).encode("latin-1", errors="replace")
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * page_index} 0 R >>"
+            ).encode("ascii")
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode("ascii") + content + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf.extend(f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+    xref_offset = len(pdf)
+    pdf.extend(f"xref\n0 {len(objects) + 1}\n".encode("ascii"))
+    pdf.extend(b"0000000000 65535 f \n")
+    for offset in offsets:
+        pdf.extend(f"{offset:010d} 00000 n \n".encode("ascii"))
+    pdf.extend(
+        (
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        ).encode("ascii")
+    )
+    return bytes(pdf)
+
+
+def build_scanned_pdf(pages: list[list[str]], rng: random.Random) -> bytes:
+    from PIL import Image, ImageDraw, ImageFilter
+
+    images = []
+    for lines in pages:
+        image = Image.new("L", (827, 1169), color=255)
+        draw = ImageDraw.Draw(image)
+        for line_index, line in enumerate(lines[:LINES_PER_PAGE]):
+            draw.text((60 + rng.randint(-2, 2), 60 + line_index * 22), line, fill=rng.randint(0, 60))
+        for _ in range(rng.randint(200, 800)):
+            draw.point((rng.randrange(827), rng.randrange(1169)), fill=rng.randint(0, 200))
+        image = image.rotate(rng.uniform(-1.5, 1.5), fillcolor=255)
+        if rng.random() < 0.5:
+            image = image.filter(ImageFilter.GaussianBlur(0.6))
+        images.append(image)
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=100.0, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def _kind_schedule(count: int, mix: dict[str, float], seed: int) -> list[str]:
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    return rng.choices(kinds, weights=weights, k=count)
+
+
+def write_shard(
+    output: str,
+    shard: int,
+    indexes: list[int],
+    kinds: list[str],
+    seed: int,
+    noise_rate: float,
+) -> int:
+    shard_name = f"shard_{shard:04d}"
+    directory = Path(output) / shard_name
+    directory.mkdir(parents=True, exist_ok=True)
+    # Rows are streamed to the shard's own manifest, so a worker holds one invoice at a time.
+    with (directory / MANIFEST_NAME).open("w", encoding="utf-8") as manifest:
+        for index, kind in zip(indexes, kinds):
+            row = _write_invoice(directory, shard_name, index, kind, seed, noise_rate)
+            manifest.write(json.dumps(row, separators=(",", ":")) + "\n")
+    return len(indexes)
+
+
+def _write_invoice(
+    directory: Path,
+    shard_name: str,
+    index: int,
+    kind: str,
+    seed: int,
+    noise_rate: float,
+) -> dict[str, Any]:
+    invoice = build_invoice(index, kind, seed, noise_rate)
+    pages = render_pages(invoice)
+    stem = f"invoice_{index:07d}"
+    if kind == "ocr_text":
+        filename = f"{stem}.txt"
+        (directory / filename).write_text("\n".join(line for page in pages for line in page) + "\n", encoding="utf-8")
+    elif kind == "scanned_pdf":
+        filename = f"{stem}.pdf"
+        (directory / filename).write_bytes(build_scanned_pdf(pages, random.Random(seed + index)))
+    else:
+        filename = f"{stem}.pdf"
+        (directory / filename).write_bytes(build_text_pdf(pages))
+    invoice.pop("_noise")
+    return {**invoice, "path": f"{shard_name}/{filename}", "pages": len(pages)}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown kind {kind!r}; expected one of {', '.join(KINDS)}.")
+        mix[kind] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one positive weight.")
+    return mix
+
+
+def _pil_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_corpus(directory: Path, limit: int | None = None) -> list[dict[str, Any]]:
+    rows = []
+    with (directory / MANIFEST_NAME).open(encoding="utf-8") as manifest:
+        for line in manifest:
+            rows.append(json.loads(line))
+            if limit is not None and len(rows) >= limit:
+                break
+    return rows
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic invoice corpus with ground truth.")
+    arg_parser.add_argument("output", type=Path, help="Directory to write shards and ground_truth.jsonl into.")
+    arg_parser.add_argument("--count", type=int, default=10_000)
+    arg_parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    arg_parser.add_argument("--noise-rate", type=float, default=0.2, help="Share of invoices with OCR substitutions.")
+    arg_parser.add_argument("--shard-size", type=int, default=1000)
+    arg_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    mix = dict(args.mix)
+    skipped = []
+    if mix.get("scanned_pdf") and not _pil_available():
+        mix.pop("scanned_pdf")
+        skipped.append("scanned_pdf (Pillow is not installed)")
+        if not mix:
+            arg_parser.error("scanned_pdf needs Pillow; install it or choose other kinds.")
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    kinds = _kind_schedule(args.count, mix, args.seed)
+    shard_size = max(1, args.shard_size)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(
+                write_shard,
+                str(args.output),
+                shard,
+                list(range(start, min(start + shard_size, args.count))),
+                kinds[start:start + shard_size],
+                args.seed,
+                args.noise_rate,
+            )
+            for shard, start in enumerate(range(0, args.count, shard_size))
+        ]
+        written = sum(future.result() for future in as_completed(futures))
+    # Shards cover consecutive index ranges, so concatenating them in shard order keeps the manifest sorted.
+    with (args.output / MANIFEST_NAME).open("w", encoding="utf-8") as manifest:
+        for shard in range(len(futures)):
+            with (args.output / f"shard_{shard:04d}" / MANIFEST_NAME).open(encoding="utf-8") as shard_manifest:
+                shutil.copyfileobj(shard_manifest, manifest)
+    elapsed = time.perf_counter() - started
+
+    counts: dict[str, int] = {}
+    for kind in kinds:
+        counts[kind] = counts.get(kind, 0) + 1
+    summary = {
+        "count": written,
+        "seed": args.seed,
+        "noise_rate": args.noise_rate,
+        "shards": len(futures),
+        "kinds": dict(sorted(counts.items())),
+        "skipped_kinds": skipped,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(args.count / elapsed, 1) if elapsed else None,
+    }
+    (args.output / SUMMARY_NAME).write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
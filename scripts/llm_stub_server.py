@@ -0,0 +1,520 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.engine.parser import InvoiceParser
+
+
+INVOICE_TEXT_MARKER = "Invoice text:\n"
+REQUESTED_FIELDS_MARKER = "Requested fields: "
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+MALFORMED_KINDS = ("truncated", "markdown", "prose", "wrong_types")
+# Providers cache prompt prefixes in fixed-size token blocks; 4 characters approximate a token here.
+CACHE_BLOCK_CHARS = 128 * 4
+# Streamed deltas carry roughly four tokens each, like a real provider's SSE chunks.
+STREAM_CHUNK_CHARS = 16
+TRAILING_PROSE = "Note: amounts were copied from the invoice text and GST was checked against the total. "
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, _, rest = spec.partition(":")
+    values = [float(value) for value in rest.split(":") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(max(values[0], 0.001)), values[1])
+    raise argparse.ArgumentTypeError(
+        f"Invalid latency {spec!r}; use fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD or lognormal:MEDIAN:SIGMA."
+    )
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _requested_fields(request: dict[str, Any], prompt: str) -> list[str] | None:
+    json_schema = (request.get("response_format") or {}).get("json_schema") or {}
+    if json_schema.get("name") == "invoice_missing_fields":
+        return list(json_schema["schema"]["properties"])
+    if prompt.startswith(REQUESTED_FIELDS_MARKER):
+        return list(json.loads(prompt[len(REQUESTED_FIELDS_MARKER) :].split("\n", 1)[0]))
+    return None
+
+
+@dataclass
+class ModelProfile:
+    latency: Callable[[random.Random], float]
+    malformed_rate: float = 0.0
+    misread_rate: float = 0.0
+
+
+def parse_model_profile(spec: str) -> tuple[str, ModelProfile]:
+    model, _, rest = spec.partition("=")
+    parts = rest.split(",")
+    if not model or not parts[0]:
+        raise argparse.ArgumentTypeError(f"Invalid model profile {spec!r}; use MODEL=LATENCY[,MALFORMED[,MISREAD]].")
+    rates = [float(value) for value in parts[1:3]]
+    return model, ModelProfile(parse_latency(parts[0]), *rates)
+
+
+@dataclass
+class StubConfig:
+    latency: Callable[[random.Random], float] = field(default=lambda rng: 0.0)
+    error_rate: float = 0.0
+    error_codes: tuple[int, ...] = (429, 500, 503)
+    malformed_rate: float = 0.0
+    misread_rate: float = 0.0
+    requests_per_minute: int | None = None
+    retry_after_seconds: float = 1.0
+    canned: dict[str, str] = field(default_factory=dict)
+    model: str = DEFAULT_MODEL
+    seed: int = 7
+    prefix_cache: bool = False
+    prefill_ms_per_1k_tokens: float = 0.0
+    unsupported_response_formats: tuple[str, ...] = ()
+    model_profiles: dict[str, ModelProfile] = field(default_factory=dict)
+    decode_ms_per_token: float = 0.0
+    trailing_tokens: int = 0
+
+    def profile_for(self, model: str | None) -> ModelProfile:
+        profile = self.model_profiles.get(model or "")
+        return profile or ModelProfile(self.latency, self.malformed_rate, self.misread_rate)
+
+
+class StubState:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.parser = InvoiceParser(use_llm=False)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._window_started = time.monotonic()
+        self._window_count = 0
+        self._prefix_blocks: set[str] = set()
+        self.stats: dict[str, Any] = {
+            "requests": 0,
+            "status": {},
+            "malformed": 0,
+            "latency_ms_total": 0.0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+        }
+
+    def draw(self, profile: ModelProfile) -> tuple[float, float, float, float]:
+        with self._lock:
+            return profile.latency(self._rng), self._rng.random(), self._rng.random(), self._rng.random()
+
+    def choice(self, options):
+        with self._lock:
+            return self._rng.choice(options)
+
+    def take_request_slot(self) -> tuple[bool, int, float]:
+        limit = self.config.requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_started >= 60:
+                self._window_started = now
+                self._window_count = 0
+            reset = 60 - (now - self._window_started)
+            if limit is None:
+                return True, 0, reset
+            if self._window_count >= limit:
+                return False, 0, reset
+            self._window_count += 1
+            return True, limit - self._window_count, reset
+
+    def cached_prefix_chars(self, messages: list[dict[str, Any]]) -> int:
+        if not self.config.prefix_cache:
+            return 0
+        serialized = "".join(f"<|{message.get('role')}|>{message.get('content', '')}" for message in messages)
+        cached = 0
+        with self._lock:
+            for end in range(CACHE_BLOCK_CHARS, len(serialized) + 1, CACHE_BLOCK_CHARS):
+                block = hashlib.sha256(serialized[:end].encode("utf-8")).hexdigest()
+                if block in self._prefix_blocks and cached == end - CACHE_BLOCK_CHARS:
+                    cached = end
+                self._prefix_blocks.add(block)
+        return cached
+
+    def record(
+        self,
+        status: int,
+        latency_ms: float,
+        malformed: bool = False,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["cached_tokens"] += cached_tokens
+            self.stats["status"][str(status)] = self.stats["status"].get(str(status), 0) + 1
+            self.stats["latency_ms_total"] += latency_ms
+            if malformed:
+                self.stats["malformed"] += 1
+
+    def content_for(self, prompt: str, fields: list[str] | None = None) -> str:
+        text = prompt.rsplit(INVOICE_TEXT_MARKER, 1)[-1]
+        canned = self.config.canned.get(hashlib.sha256(text.encode("utf-8")).hexdigest())
+        if canned is not None:
+            return canned
+        extraction = self.parser._parse_deterministically(text, "doc_stub").extraction
+        if extraction is None:
+            return "{}"
+        if fields:
+            return extraction.model_dump_json(include=set(fields))
+        return extraction.model_dump_json(exclude={"document_id", "field_sources", "original_extracted_values"})
+
+    def malform(self, content: str, json_only: bool = False) -> str:
+        kind = "wrong_types" if json_only else self.choice(MALFORMED_KINDS)
+        if kind == "truncated":
+            return content[: max(1, len(content) // 2)]
+        if kind == "markdown":
+            return f"```json\n{content}\n```"
+        if kind == "prose":
+            return "I could not read this invoice clearly, but here is my best attempt."
+        payload = json.loads(content)
+        payload["total"] = "about three hundred dollars"
+        payload["line_items"] = "see attached"
+        return json.dumps(payload)
+
+
+    def misread(self, content: str) -> str:
+        # Well-formed and schema-valid, but with the GST amount misread, as a weaker model might.
+        payload = json.loads(content)
+        if payload.get("gst") not in (None, "", "0", "0.00"):
+            payload["gst"] = str(Decimal(str(payload["gst"])) * 2)
+        return json.dumps(payload)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "InvoiceLLMStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.stats)
+        elif self.path.rstrip("/").endswith("/health"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = next(
+                message["content"] for message in reversed(request["messages"]) if message.get("role") == "user"
+            )
+        except (json.JSONDecodeError, KeyError, StopIteration, TypeError):
+            self.state.record(400, 0.0)
+            self._send_json(400, {"error": {"message": "Request must contain a user message.", "type": "invalid_request_error"}})
+            return
+
+        config = self.state.config
+        response_format = (request.get("response_format") or {}).get("type", "text")
+        if response_format in config.unsupported_response_formats:
+            self.state.record(400, 0.0)
+            self._send_json(
+                400,
+                {
+                    "error": {
+                        "message": f"response_format `{response_format}` is not supported with this model",
+                        "type": "invalid_request_error",
+                    }
+                },
+            )
+            return
+        profile = config.profile_for(request.get("model"))
+        latency_ms, error_roll, malformed_roll, misread_roll = self.state.draw(profile)
+        allowed, remaining, reset = self.state.take_request_slot()
+        headers = {
+            "x-ratelimit-limit-requests": str(config.requests_per_minute or 0),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+        }
+        if not allowed:
+            headers["retry-after"] = str(math.ceil(reset))
+            self.state.record(429, 0.0)
+            self._send_json(429, {"error": {"message": "Rate limit reached.", "type": "rate_limit_exceeded"}}, headers)
+            return
+
+        prompt_tokens = sum(_estimate_tokens(str(message.get("content", ""))) for message in request["messages"])
+        cached_tokens = min(prompt_tokens, self.state.cached_prefix_chars(request["messages"]) // 4)
+        latency_ms += config.prefill_ms_per_1k_tokens * (prompt_tokens - cached_tokens) / 1000
+        time.sleep(latency_ms / 1000)
+        if error_roll < config.error_rate:
+            status = self.state.choice(config.error_codes)
+            if status == 429:
+                headers["retry-after"] = f"{config.retry_after_seconds:g}"
+            self.state.record(status, latency_ms)
+            self._send_json(status, {"error": {"message": f"Injected {status} error.", "type": "stub_error"}}, headers)
+            return
+
+        content = self.state.content_for(prompt, _requested_fields(request, prompt))
+        # Schema-constrained decoding never drifts; JSON mode keeps the syntax but not the types.
+        malformed = malformed_roll < profile.malformed_rate and response_format != "json_schema"
+        if malformed:
+            content = self.state.malform(content, json_only=response_format == "json_object")
+        elif misread_roll < profile.misread_rate:
+            content = self.state.misread(content)
+        if config.trailing_tokens and response_format == "text":
+            # Unconstrained models often keep talking after the closing brace.
+            prose = TRAILING_PROSE * (config.trailing_tokens * 4 // len(TRAILING_PROSE) + 1)
+            content = f"{content}\n\n{prose[: config.trailing_tokens * 4]}"
+        completion_tokens = _estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            "queue_time": 0.0,
+            "total_time": round((latency_ms + completion_tokens * config.decode_ms_per_token) / 1000, 4),
+        }
+        model = request.get("model") or config.model
+        if request.get("stream"):
+            self.state.record(200, latency_ms, malformed, prompt_tokens, cached_tokens)
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            self._send_stream(model, content, usage if include_usage else None, headers)
+            return
+        time.sleep(completion_tokens * config.decode_ms_per_token / 1000)
+        self.state.record(200, latency_ms, malformed, prompt_tokens, cached_tokens)
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            },
+            headers,
+        )
+
+    def _send_stream(
+        self,
+        model: str,
+        content: str,
+        usage: dict[str, Any] | None,
+        headers: dict[str, str],
+    ) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+        }
+        try:
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                piece = content[start : start + STREAM_CHUNK_CHARS]
+                time.sleep(_estimate_tokens(piece) * self.state.config.decode_ms_per_token / 1000)
+                self._write_event({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            self._write_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if usage is not None:
+                self._write_event({**base, "choices": [], "usage": usage})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading once it had the whole JSON object.
+            self.close_connection = True
+
+    def _write_event(self, payload: dict[str, Any]) -> None:
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LLMStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops concurrent connects, which clients then retry after ~1s.
+    request_queue_size = 256
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), StubHandler)
+        self.state = StubState(config)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    def start(self) -> "LLMStubServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="llm-stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "LLMStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def load_canned(path: Path | None) -> dict[str, str]:
+    if path is None:
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    return {key: value if isinstance(value, str) else json.dumps(value) for key, value in payload.items()}
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description="Local OpenAI-compatible chat-completions stand-in for the Groq invoice parser.",
+    )
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8089)
+    arg_parser.add_argument(
+        "--latency",
+        type=parse_latency,
+        default=parse_latency("fixed:0"),
+        help="Milliseconds: fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD or lognormal:MEDIAN:SIGMA.",
+    )
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error.")
+    arg_parser.add_argument("--error-codes", default="429,500,503")
+    arg_parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of answers with broken JSON.")
+    arg_parser.add_argument("--rpm", type=int, default=None, help="Requests per minute before real 429s.")
+    arg_parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s.")
+    arg_parser.add_argument(
+        "--canned",
+        type=Path,
+        default=None,
+        help="JSON object mapping sha256(invoice text) to the response content to return.",
+    )
+    arg_parser.add_argument("--model", default=DEFAULT_MODEL)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    arg_parser.add_argument(
+        "--prefix-cache",
+        action="store_true",
+        help="Simulate provider prefix caching: repeated prompt prefixes are reported as cached tokens.",
+    )
+    arg_parser.add_argument(
+        "--prefill-ms-per-1k",
+        type=float,
+        default=0.0,
+        help="Extra latency per 1000 uncached prompt tokens.",
+    )
+    arg_parser.add_argument(
+        "--misread-rate",
+        type=float,
+        default=0.0,
+        help="Share of well-formed answers with a misread GST amount.",
+    )
+    arg_parser.add_argument(
+        "--model-profile",
+        type=parse_model_profile,
+        action="append",
+        default=[],
+        help="Per-model behaviour, repeatable: MODEL=LATENCY[,MALFORMED_RATE[,MISREAD_RATE]].",
+    )
+    arg_parser.add_argument(
+        "--unsupported-response-formats",
+        default="",
+        help="Comma-separated response_format types (json_schema, json_object) answered with HTTP 400.",
+    )
+    arg_parser.add_argument(
+        "--decode-ms-per-token",
+        type=float,
+        default=0.0,
+        help="Generation time per completion token; streamed answers are paced by it, others are delayed by the total.",
+    )
+    arg_parser.add_argument(
+        "--trailing-tokens",
+        type=int,
+        default=0,
+        help="Prose tokens appended after the JSON object to text-format answers.",
+    )
+    args = arg_parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_codes=tuple(int(code) for code in args.error_codes.split(",") if code.strip()),
+        malformed_rate=args.malformed_rate,
+        misread_rate=args.misread_rate,
+        requests_per_minute=args.rpm,
+        retry_after_seconds=args.retry_after,
+        canned=load_canned(args.canned),
+        model=args.model,
+        seed=args.seed,
+        prefix_cache=args.prefix_cache,
+        prefill_ms_per_1k_tokens=args.prefill_ms_per_1k,
+        model_profiles=dict(args.model_profile),
+        decode_ms_per_token=args.decode_ms_per_token,
+        trailing_tokens=args.trailing_tokens,
+        unsupported_response_formats=tuple(
+            value.strip() for value in args.unsupported_response_formats.split(",") if value.strip()
+        ),
+    )
+    server = LLMStubServer(config, args.host, args.port)
+    print(json.dumps({"base_url": server.base_url, "env": {"GROQ_BASE_URL": server.base_url}}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
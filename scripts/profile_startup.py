@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ("requests", "dotenv", "PyPDF2", "pdf2image", "pytesseract", "langchain_groq", "numpy")
+
+FIRST_HEALTH_SCRIPT = """
+import asyncio
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from {entry} import app
+imported = time.perf_counter()
+
+async def first_health():
+    messages = []
+
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {{
+        "type": "http",
+        "asgi": {{"version": "3.0"}},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }}
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(first_health())
+answered = time.perf_counter()
+print(json.dumps({{
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_health_ms": (answered - started) * 1000,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def _environment() -> dict[str, str]:
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), environment.get("PYTHONPATH")]))
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    return environment
+
+
+def import_times(entry: str) -> list[tuple[str, int, int]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=ROOT,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def first_health(entry: str) -> dict[str, Any]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", FIRST_HEALTH_SCRIPT.format(entry=entry, heavy=HEAVY_MODULES)],
+        cwd=ROOT,
+        env=_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    report["process_ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+
+def profile(entry: str, runs: int, top: int) -> dict[str, Any]:
+    rows = import_times(entry)
+    totals = {name: cumulative for name, _, cumulative in rows}
+    app_modules = [row for row in rows if row[0].split(".")[0] in {"app", "api"}]
+    samples = [first_health(entry) for _ in range(runs)]
+    return {
+        "entry": entry,
+        "import_total_ms": round(totals.get(entry, 0) / 1000, 1),
+        "app_self_ms": round(sum(self_us for _, self_us, _ in app_modules) / 1000, 1),
+        "slowest_imports": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+        ],
+        "heavy_modules_loaded": samples[-1]["heavy_modules"],
+        "health_status": samples[-1]["status"],
+        "import_ms_median": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+        "first_health_ms_median": round(statistics.median(sample["first_health_ms"] for sample in samples), 1),
+        "process_ms_median": round(statistics.median(sample["process_ms"] for sample in samples), 1),
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Profile API cold start: import time and first /health response.")
+    arg_parser.add_argument("--entry", default="api.main", help="Module exposing the ASGI app (default: the Vercel entry).")
+    arg_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs for the /health timing.")
+    arg_parser.add_argument("--top", type=int, default=15, help="Number of slowest imports (self time) to list.")
+    args = arg_parser.parse_args()
+    print(json.dumps(profile(args.entry, args.runs, args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -248,6 +248,13 @@ def api_get_json(endpoint: str, timeout: int = 5) -> dict[str, Any]:
     return response.json()
 
 
+def invoice_response_text(result: dict[str, Any]) -> str:
+    try:
+        return api_get_json(f"/invoices/{result['document_id']}/response").get("response") or ""
+    except requests.RequestException:
+        return ""
+
+
 def money_text(value: Any) -> str:
     if value in (None, ""):
         return ""
@@ -781,7 +788,7 @@ def render_review_workspace(result: dict[str, Any]) -> None:
     with st.expander("Extracted Fields And Line Items"):
         render_fields_table(result)
     with st.expander("Explanation"):
-        st.markdown(result.get("response") or "")
+        st.markdown(invoice_response_text(result))
     st.markdown("### Original Invoice")
     render_original_pdf(result)
 